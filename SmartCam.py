@@ -1,11 +1,24 @@
 # smartcam.py
-import cv2, serial, time, os, json, csv, smtplib, requests
+import cv2, serial, time, os, json, csv, smtplib, requests, base64
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
-import threading
+import threading, argparse, signal, queue
+from collections import deque
+from detectors import create_detector
+from motion import create_motion
+from zones import ZoneMap
+from remote import RemoteRecognizer, UNAVAILABLE
+from model_watch import ModelWatcher, load_model
+from synthetic import open_source
+from preview import PreviewServer
+from metrics import REGISTRY, MetricsServer
+from tracing import TRACER, SamplingProfiler
+from spool import NotificationSpool, SPOOL_DEFAULTS
+from logrotate import LogRotator, LOG_DEFAULTS, SNAPSHOT_PATTERN
 PORT="COM3"; BAUD=115200   # change port if needed
+PUSHOVER_API_URL="https://api.pushover.net/1/messages.json"
 
 # Import notification configuration from secure config file
 try:
@@ -16,22 +29,215 @@ except ImportError:
     print("   Copy config_template.py to config.py and add your credentials")
     # Default configuration with no real credentials
     NOTIFICATION_CONFIG = {
-        "email": {"enabled": False, "smtp_server": "smtp.gmail.com", "smtp_port": 587, "sender_email": "", "sender_password": "", "recipient_email": ""},
+        "email": {"enabled": False, "smtp_server": "smtp.gmail.com", "smtp_port": 587, "use_tls": True, "sender_email": "", "sender_password": "", "recipient_email": ""},
         "webhook": {"enabled": False, "url": "", "headers": {"Content-Type": "application/json"}},
         "discord": {"enabled": False, "webhook_url": ""},
-        "pushover": {"enabled": False, "user_key": "", "api_token": ""}
+        "pushover": {"enabled": False, "user_key": "", "api_token": "", "api_url": PUSHOVER_API_URL}
     }
-face=cv2.CascadeClassifier(cv2.data.haarcascades+'haarcascade_frontalface_default.xml')
-rec=cv2.face.LBPHFaceRecognizer_create(); rec.read("models/lbph.yml")
-labels=open("models/labels.txt").read().splitlines()
-cap=cv2.VideoCapture(0)
 
+# Outbound notification spool (see spool.py) - notifications are written to disk before sending
+try:
+    from config import SPOOL_CONFIG
+except ImportError:
+    SPOOL_CONFIG = {}
+SPOOL_CONFIG = {**SPOOL_DEFAULTS, **SPOOL_CONFIG}
+
+# Log rotation, compression and retention (see logrotate.py)
+try:
+    from config import LOG_CONFIG
+except ImportError:
+    LOG_CONFIG = {}
+LOG_CONFIG = {**LOG_DEFAULTS, **LOG_CONFIG}
+
+# Snapshot attachment per channel - override any key with an "attachment" dict in that
+# channel's NOTIFICATION_CONFIG entry. Each distinct profile is encoded once per incident.
+ATTACHMENT_DEFAULTS = {
+    "email":    {"enabled": True,  "crop": False, "margin": 0.5, "max_dim": 1280, "quality": 85},
+    "discord":  {"enabled": True,  "crop": True,  "margin": 0.5, "max_dim": 480,  "quality": 75},
+    "pushover": {"enabled": True,  "crop": True,  "margin": 0.5, "max_dim": 320,  "quality": 75},
+    "webhook":  {"enabled": False, "crop": True,  "margin": 0.5, "max_dim": 320,  "quality": 75}  # base64 in the JSON body
+}
+
+class IncidentImage:
+    """The snapshot of one incident; each distinct crop/size/quality is encoded once and shared by all channels"""
+    def __init__(self, image_path=None, box=None):
+        self.image_path = image_path
+        self.box = box
+        self.frame = None
+        self.encoded = {}   # (region, size, quality) -> JPEG bytes
+    
+    def jpeg(self, profile):
+        """JPEG bytes for an attachment profile, or None when there is no image or the profile is off"""
+        if not profile.get("enabled") or not self.image_path:
+            return None
+        if self.frame is None:
+            self.frame = cv2.imread(self.image_path)
+            if self.frame is None:
+                return None
+        H, W = self.frame.shape[:2]
+        x0, y0, x1, y1 = 0, 0, W, H
+        if profile["crop"] and self.box:
+            # Face plus a margin on every side, clipped to the frame
+            x, y, w, h = self.box
+            m = int(max(w, h) * profile["margin"])
+            x0, y0, x1, y1 = max(0, x - m), max(0, y - m), min(W, x + w + m), min(H, y + h + m)
+        w, h = x1 - x0, y1 - y0
+        s = min(1.0, profile["max_dim"] / max(w, h)) if profile["max_dim"] else 1.0
+        size = (max(1, int(w * s)), max(1, int(h * s)))
+        # Profiles that come out as the same pixels share one encode
+        key = ((x0, y0, x1, y1), size, int(profile["quality"]))
+        if key in self.encoded:
+            return self.encoded[key]
+        img = self.frame[y0:y1, x0:x1]
+        if size != (w, h):
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, key[2]])
+        self.encoded[key] = buf.tobytes() if ok else None
+        REGISTRY.counter("smartcam_attachment_encodes_total", "Snapshot attachments JPEG-encoded").inc()
+        return self.encoded[key]
+
+# Per-camera settings - CAMERAS in config.py lists one dict per camera,
+# any key left out falls back to these defaults
+CAMERA_DEFAULTS = {
+    "source": 0,                  # cv2.VideoCapture index, video file, stream URL or "synthetic:..." scene (see synthetic.py)
+    "location": "Front Camera",   # shown in notifications and logs
+    "motion_min_fraction": 0.002, # trigger floor: fraction of the frame area that changed
+    "motion_sigmas": 4.0,         # trigger at noise mean + this many standard deviations
+    "motion_release": 0.6,        # hysteresis: stay triggered down to this fraction of the trigger level
+    "motion_adapt": 0.01,         # how fast the noise statistics follow the scene (EWMA weight)
+    "motion_backend": "gate",     # motion engine: "gate", "mog2" or "knn" (see motion.py)
+    "motion_scale": 1.0,          # downscale the gray frame by this factor before motion scoring
+    "motion_learning_rate": None, # background update rate, None = backend default (see motion.MOTION_DEFAULTS)
+    "zones": None,                # polygons to watch or ignore, in frame pixels (see zones.py); None = whole frame
+    "recognition_server": None,   # "host:port" or "unix:/path" of remote.py to recognize faces centrally, None = local model
+    "confidence_threshold": 70,
+    "detector": "haar",           # face detector backend: "haar", "dnn" or "yunet" (see DETECTOR_CONFIG)
+    "min_face": 80,               # smallest face to detect, in pixels
+    "detect_mode": "full",        # haar only: "full" or "pyramid" (coarse-to-fine on a downscaled frame)
+    "detect_scale": None,         # haar pyramid downscale factor, None = native window / min_face
+    "idle_after": 300,            # seconds of quiet before idle mode (0 = never idle)
+    "idle_fraction": 0.25,        # "quiet" = motion below this fraction of the trigger level
+    "idle_every": 5               # in idle mode analyze every Nth frame, only grab the rest
+}
+try:
+    from config import CAMERAS
+except ImportError:
+    CAMERAS = [{}]
+CAMERAS = [{**CAMERA_DEFAULTS, **cam} for cam in CAMERAS]
+
+# Face detector backend settings (threads, input size, model paths) - see detectors.DETECTOR_DEFAULTS
+try:
+    from config import DETECTOR_CONFIG
+except ImportError:
+    DETECTOR_CONFIG = {}
+
+# Alarm decision - wall-clock based, so frame rate, dropped frames and idle mode don't change it
+ALARM_DEFAULTS = {
+    "trigger_sightings": 1,    # unknown-face frames needed to turn the alarm on...
+    "trigger_window": 2.0,     # ...within this many seconds
+    "hold_seconds": 2.0        # alarm stays on until no unknown face was seen for this long
+}
+try:
+    from config import ALARM_CONFIG
+except ImportError:
+    ALARM_CONFIG = {}
+ALARM_CONFIG = {**ALARM_DEFAULTS, **ALARM_CONFIG}
 class NotificationManager:
-    def __init__(self, config):
+    def __init__(self, config, spool_config=None, workers=4, queue_size=100):
         self.config = config
+        # With a spool, notifications are persisted and delivered by its drainer thread with retries
+        self.spool = None
+        if spool_config and spool_config.get("enabled"):
+            self.spool = NotificationSpool(**spool_config).start(self.deliver, lambda channel: self.config[channel]["enabled"])
         self.last_notification_time = {}
         self.notification_cooldown = 30  # seconds between notifications
+        self.threads_gauge = REGISTRY.gauge("smartcam_notification_threads", "Notification threads currently sending")
+        self.dropped = REGISTRY.counter("smartcam_notifications_dropped_total", "Alerts dropped because the send queue was full")
+        # A fixed set of sender threads behind a bounded queue, instead of a new thread per alert:
+        # slow or hanging endpoints can no longer pile up threads (and sockets) without limit
+        self.outbox = queue.Queue(maxsize=queue_size)
+        self.workers = [threading.Thread(target=self._work, name=f"notify-{i}", daemon=True) for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
         
+    def _record(self, channel, t0, ok):
+        """Record delivery latency and outcome for a channel; returns ok"""
+        REGISTRY.histogram("smartcam_notification_seconds", "Notification delivery latency in seconds",
+                           channel=channel).observe(time.perf_counter() - t0)
+        REGISTRY.counter("smartcam_notifications_total", "Notifications by channel and result",
+                         channel=channel, result="sent" if ok else "failed").inc()
+        TRACER.complete(f"notify.{channel}", t0, cat="notify", ok=ok)
+        return ok
+    
+    def _sent_bytes(self, channel, size):
+        """Count an uploaded attachment of size JPEG bytes (before any base64 encoding)"""
+        REGISTRY.counter("smartcam_notification_attachment_bytes_total", "Attachment bytes uploaded per channel",
+                         channel=channel).inc(size)
+    
+    def _dispatch(self, channel, **kwargs):
+        """Spool a send_<channel>(**kwargs) call, or make it right away without a spool"""
+        if self.spool is None:
+            return getattr(self, f"send_{channel}")(**kwargs)
+        if isinstance(kwargs.get("image"), bytes):
+            kwargs["image"] = base64.b64encode(kwargs["image"]).decode()
+        self.spool.put(channel, kwargs)
+    
+    def deliver(self, channel, kwargs):
+        """Spool drainer callback: one delivery attempt, True on success"""
+        kwargs = dict(kwargs)
+        if kwargs.get("image"):
+            kwargs["image"] = base64.b64decode(kwargs["image"])
+        self.threads_gauge.inc()   # the drainer is sending too
+        try:
+            return getattr(self, f"send_{channel}")(**kwargs)
+        finally:
+            self.threads_gauge.dec()
+    
+    def close(self, timeout=5.0):
+        """Give queued alerts and the spool a few seconds to go out; the spool keeps the rest on disk"""
+        deadline = time.time() + timeout
+        for _ in self.workers:
+            try:
+                self.outbox.put_nowait(None)
+            except queue.Full:
+                break  # workers are daemons; what is still queued is lost with the process
+        for worker in self.workers:
+            worker.join(max(0.0, deadline - time.time()))
+        if self.spool is not None:
+            self.spool.stop(max(0.0, deadline - time.time()))
+    
+    def attachment_profile(self, channel):
+        return {**ATTACHMENT_DEFAULTS[channel], **self.config[channel].get("attachment", {})}
+    
+    def _run_tracked(self, target, *args):
+        self.threads_gauge.inc()
+        try:
+            with TRACER.span(target.__name__.strip("_"), cat="notify"):
+                target(*args)
+        finally:
+            self.threads_gauge.dec()
+    
+    def _submit(self, target, *args):
+        """Queue an alert for the sender threads; dropped (and counted) when the queue is full"""
+        try:
+            self.outbox.put_nowait((target, args))
+        except queue.Full:
+            self.dropped.inc()
+            print(f"⚠️  Notification queue full ({self.outbox.maxsize}) - alert dropped")
+    
+    def _work(self):
+        while True:
+            item = self.outbox.get()
+            try:
+                if item is None:
+                    return
+                target, args = item
+                self._run_tracked(target, *args)
+            except Exception as e:
+                print(f"Notification failed: {e}")
+            finally:
+                self.outbox.task_done()
+    
     def should_send_notification(self, event_type):
         """Check if enough time has passed since last notification of this type"""
         now = time.time()
@@ -41,11 +247,12 @@ class NotificationManager:
         self.last_notification_time[event_type] = now
         return True
     
-    def send_email(self, subject, body, image_path=None):
-        """Send email notification"""
+    def send_email(self, subject, body, image_path=None, image=None):
+        """Send email notification; image is JPEG bytes (image_path attaches the file as is)"""
         if not self.config["email"]["enabled"]:
             return False
             
+        t0 = time.perf_counter()
         try:
             msg = MIMEMultipart()
             msg['From'] = self.config["email"]["sender_email"]
@@ -55,28 +262,34 @@ class NotificationManager:
             msg.attach(MIMEText(body, 'plain'))
             
             # Attach image if provided
-            if image_path and os.path.exists(image_path):
+            if image is None and image_path and os.path.exists(image_path):
                 with open(image_path, 'rb') as f:
-                    img_data = f.read()
-                    image = MIMEImage(img_data)
-                    image.add_header('Content-Disposition', 'attachment', filename='detection.jpg')
-                    msg.attach(image)
+                    image = f.read()
+            if image:
+                part = MIMEImage(image)
+                part.add_header('Content-Disposition', 'attachment', filename='detection.jpg')
+                msg.attach(part)
             
-            server = smtplib.SMTP(self.config["email"]["smtp_server"], self.config["email"]["smtp_port"])
-            server.starttls()
-            server.login(self.config["email"]["sender_email"], self.config["email"]["sender_password"])
+            server = smtplib.SMTP(self.config["email"]["smtp_server"], self.config["email"]["smtp_port"], timeout=10)
+            if self.config["email"].get("use_tls", True):
+                server.starttls()
+            if self.config["email"]["sender_password"]:
+                server.login(self.config["email"]["sender_email"], self.config["email"]["sender_password"])
             server.send_message(msg)
             server.quit()
-            return True
+            if image:
+                self._sent_bytes("email", len(image))
+            return self._record("email", t0, True)
         except Exception as e:
             print(f"Email notification failed: {e}")
-            return False
+            return self._record("email", t0, False)
     
     def send_webhook(self, event_type, data):
         """Send webhook notification"""
         if not self.config["webhook"]["enabled"]:
             return False
             
+        t0 = time.perf_counter()
         try:
             payload = {
                 "event_type": event_type,
@@ -90,16 +303,21 @@ class NotificationManager:
                 headers=self.config["webhook"]["headers"],
                 timeout=10
             )
-            return response.status_code == 200
+            ok = response.status_code == 200
+            if ok and data.get("image_jpeg"):
+                encoded = data["image_jpeg"]  # base64: 4 characters per 3 JPEG bytes, minus the padding
+                self._sent_bytes("webhook", len(encoded) * 3 // 4 - encoded.count("=", -2))
+            return self._record("webhook", t0, ok)
         except Exception as e:
             print(f"Webhook notification failed: {e}")
-            return False
+            return self._record("webhook", t0, False)
     
-    def send_discord(self, message, embed_data=None):
+    def send_discord(self, message, embed_data=None, image=None):
         """Send Discord notification"""
         if not self.config["discord"]["enabled"]:
             return False
             
+        t0 = time.perf_counter()
         try:
             payload = {"content": message}
             
@@ -112,17 +330,27 @@ class NotificationManager:
                     "fields": embed_data.get("fields", [])
                 }]
             
-            response = requests.post(self.config["discord"]["webhook_url"], json=payload, timeout=10)
-            return response.status_code == 204
+            if image:
+                if "embeds" in payload:
+                    payload["embeds"][0]["image"] = {"url": "attachment://detection.jpg"}
+                response = requests.post(self.config["discord"]["webhook_url"], data={"payload_json": json.dumps(payload)},
+                                         files={"file": ("detection.jpg", image, "image/jpeg")}, timeout=10)
+            else:
+                response = requests.post(self.config["discord"]["webhook_url"], json=payload, timeout=10)
+            ok = response.status_code in (200, 204)
+            if ok and image:
+                self._sent_bytes("discord", len(image))
+            return self._record("discord", t0, ok)
         except Exception as e:
             print(f"Discord notification failed: {e}")
-            return False
+            return self._record("discord", t0, False)
     
-    def send_pushover(self, message, title="SmartCam Alert", priority=0):
+    def send_pushover(self, message, title="SmartCam Alert", priority=0, image=None):
         """Send Pushover notification"""
         if not self.config["pushover"]["enabled"]:
             return False
             
+        t0 = time.perf_counter()
         try:
             data = {
                 "token": self.config["pushover"]["api_token"],
@@ -132,24 +360,28 @@ class NotificationManager:
                 "priority": priority
             }
             
-            response = requests.post("https://api.pushover.net/1/messages.json", data=data, timeout=10)
-            return response.status_code == 200
+            files = {"attachment": ("detection.jpg", image, "image/jpeg")} if image else None
+            response = requests.post(self.config["pushover"].get("api_url", PUSHOVER_API_URL), data=data, files=files, timeout=10)
+            ok = response.status_code == 200
+            if ok and image:
+                self._sent_bytes("pushover", len(image))
+            return self._record("pushover", t0, ok)
         except Exception as e:
             print(f"Pushover notification failed: {e}")
-            return False
+            return self._record("pushover", t0, False)
     
-    def notify_unknown_person(self, confidence, image_path=None):
-        """Send notification for unknown person detection"""
-        if not self.should_send_notification("unknown_person"):
+    def notify_unknown_person(self, confidence, image_path=None, location="Front Camera", box=None):
+        """Send notification for unknown person detection (box = face in the snapshot, for cropped attachments)"""
+        if not self.should_send_notification(f"unknown_person:{location}"):
             return
             
-        # Run notifications in separate thread to avoid blocking
-        threading.Thread(target=self._send_unknown_person_notifications, 
-                        args=(confidence, image_path), daemon=True).start()
+        # Sent by the worker threads so the camera loop never blocks
+        self._submit(self._send_unknown_person_notifications, confidence, image_path, location, box)
     
-    def _send_unknown_person_notifications(self, confidence, image_path):
+    def _send_unknown_person_notifications(self, confidence, image_path, location, box=None):
         """Internal method to send all unknown person notifications"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        incident = IncidentImage(image_path, box)
         
         # Email notification
         if self.config["email"]["enabled"]:
@@ -159,7 +391,7 @@ SECURITY ALERT: Unknown person detected by SmartCam
 
 Time: {timestamp}
 Confidence Score: {confidence:.1f}
-Location: Front Camera
+Location: {location}
 
 This is an automated security notification from your SmartCam system.
 Please check the attached image and verify if this person is authorized.
@@ -167,7 +399,7 @@ Please check the attached image and verify if this person is authorized.
 Best regards,
 SmartCam Security System
             """
-            self.send_email(subject, body, image_path)
+            self._dispatch("email", subject=subject, body=body, image=incident.jpeg(self.attachment_profile("email")))
         
         # Discord notification
         if self.config["discord"]["enabled"]:
@@ -178,32 +410,35 @@ SmartCam Security System
                 "fields": [
                     {"name": "Time", "value": timestamp, "inline": True},
                     {"name": "Confidence", "value": f"{confidence:.1f}", "inline": True},
-                    {"name": "Location", "value": "Front Camera", "inline": True}
+                    {"name": "Location", "value": location, "inline": True}
                 ]
             }
-            self.send_discord("🚨 **SECURITY ALERT** - Unknown person detected!", embed_data)
+            self._dispatch("discord", message="🚨 **SECURITY ALERT** - Unknown person detected!", embed_data=embed_data,
+                           image=incident.jpeg(self.attachment_profile("discord")))
         
         # Webhook notification
         if self.config["webhook"]["enabled"]:
             data = {
                 "confidence": confidence,
-                "location": "front_camera",
+                "location": location.lower().replace(" ", "_"),
                 "image_path": image_path
             }
-            self.send_webhook("unknown_person", data)
+            image = incident.jpeg(self.attachment_profile("webhook"))
+            if image:
+                data["image_jpeg"] = base64.b64encode(image).decode()
+            self._dispatch("webhook", event_type="unknown_person", data=data)
         
         # Pushover notification
         if self.config["pushover"]["enabled"]:
-            message = f"Unknown person detected at {timestamp} (confidence: {confidence:.1f})"
-            self.send_pushover(message, priority=1)  # High priority
+            message = f"Unknown person detected by {location} at {timestamp} (confidence: {confidence:.1f})"
+            self._dispatch("pushover", message=message, priority=1, image=incident.jpeg(self.attachment_profile("pushover")))  # High priority
     
     def notify_alarm_state(self, state, reason=""):
         """Send notification for alarm state changes"""
         if not self.should_send_notification(f"alarm_{state.lower()}"):
             return
             
-        threading.Thread(target=self._send_alarm_notifications, 
-                        args=(state, reason), daemon=True).start()
+        self._submit(self._send_alarm_notifications, state, reason)
     
     def _send_alarm_notifications(self, state, reason):
         """Internal method to send alarm state notifications"""
@@ -225,7 +460,7 @@ Your security system alarm has been {'activated' if state == 'ON' else 'deactiva
 Best regards,
 SmartCam Security System
             """
-            self.send_email(subject, body)
+            self._dispatch("email", subject=subject, body=body)
         
         # Discord notification
         if self.config["discord"]["enabled"]:
@@ -242,7 +477,7 @@ SmartCam Security System
             if reason:
                 embed_data["fields"].append({"name": "Reason", "value": reason, "inline": False})
             
-            self.send_discord(f"{emoji} **Alarm {state}**", embed_data)
+            self._dispatch("discord", message=f"{emoji} **Alarm {state}**", embed_data=embed_data)
         
         # Pushover notification
         if self.config["pushover"]["enabled"]:
@@ -250,30 +485,38 @@ SmartCam Security System
             message = f"Security alarm {state} at {timestamp}"
             if reason:
                 message += f" - {reason}"
-            self.send_pushover(message, priority=priority)
+            self._dispatch("pushover", message=message, priority=priority)
 
 class DataLogger:
-    def __init__(self):
+    def __init__(self, log_config=None):
         self.log_dir = "logs"
         if not os.path.exists(self.log_dir):
             os.makedirs(self.log_dir)
+        settings = dict(log_config or {})
+        self.max_bytes = settings.pop("max_bytes", 0)
+        session_events = settings.pop("session_events", 0) or None
+        snapshot_days = settings.pop("snapshot_retention_days", 0)
+        snapshot_bytes = settings.pop("snapshot_retention_bytes", 0)
         
-        # CSV file for structured data
-        self.csv_file = os.path.join(self.log_dir, f"smartcam_log_{datetime.now().strftime('%Y%m%d')}.csv")
-        self.init_csv()
+        # CSV file for structured data - a new one every day and every max_bytes
+        self.csv_day = None
+        self.roll_csv()
         
         # JSON file for session data
         self.session_file = os.path.join(self.log_dir, f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        # Only the newest session_events of each kind stay in memory - a camera that runs
+        # for weeks would otherwise keep every event it ever saw (the CSV has them all)
         self.session_data = {
             "start_time": datetime.now().isoformat(),
-            "detections": [],
-            "motion_events": [],
-            "alarm_events": []
+            "detections": deque(maxlen=session_events),
+            "motion_events": deque(maxlen=session_events),
+            "alarm_events": deque(maxlen=session_events)
         }
         
         # Statistics
         self.stats = {
             "total_frames": 0,
+            "total_events": 0,
             "motion_frames": 0,
             "face_detections": 0,
             "unknown_detections": 0,
@@ -281,23 +524,52 @@ class DataLogger:
             "alarm_triggers": 0
         }
     
+        # Compress closed logs and enforce the retention budget in the background
+        self.rotator = None
+        self.snapshot_rotator = None
+        if log_config:
+            self.rotator = LogRotator(self.log_dir, active=lambda: (self.csv_file, self.session_file), **settings).start()
+            if snapshot_days or snapshot_bytes:
+                os.makedirs("snapshots", exist_ok=True)
+                self.snapshot_rotator = LogRotator("snapshots", compression=None, retention_days=snapshot_days,
+                                                   retention_bytes=snapshot_bytes, interval=settings.get("interval", 60),
+                                                   pattern=SNAPSHOT_PATTERN).start()
+    
+    def roll_csv(self):
+        """Switch to today's CSV, or to the next part once the current one reached max_bytes"""
+        day = datetime.now().strftime('%Y%m%d')
+        part = 0 if day != self.csv_day else self.csv_part + 1
+        while True:
+            name = f"smartcam_log_{day}.csv" if part == 0 else f"smartcam_log_{day}_{part}.csv"
+            path = os.path.join(self.log_dir, name)
+            taken = os.path.exists(path + ".gz") or os.path.exists(path + ".zst")
+            if not taken and not (self.max_bytes and os.path.exists(path) and os.path.getsize(path) >= self.max_bytes):
+                break
+            part += 1
+        self.csv_day, self.csv_part, self.csv_file = day, part, path
+        self.init_csv()
+        self.csv_bytes = os.path.getsize(self.csv_file)
+    
     def init_csv(self):
         if not os.path.exists(self.csv_file):
             with open(self.csv_file, 'w', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow(['timestamp', 'event_type', 'label', 'confidence', 'motion_score', 'alarm_state'])
+                writer.writerow(['timestamp', 'event_type', 'label', 'confidence', 'motion_score', 'alarm_state', 'camera'])
     
-    def log_event(self, event_type, label="none", confidence=0, motion_score=0, alarm_state=False):
+    def log_event(self, event_type, label="none", confidence=0, motion_score=0, alarm_state=False, camera=""):
         timestamp = datetime.now().isoformat()
         
         # Convert numpy types to Python types for JSON serialization
-        motion_score = int(motion_score) if motion_score else 0
+        motion_score = round(float(motion_score), 6) if motion_score else 0.0
         confidence = float(confidence) if confidence else 0.0
         
         # Log to CSV
+        if timestamp[:10].replace("-", "") != self.csv_day or (self.max_bytes and self.csv_bytes >= self.max_bytes):
+            self.roll_csv()
         with open(self.csv_file, 'a', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([timestamp, event_type, label, confidence, motion_score, alarm_state])
+            writer.writerow([timestamp, event_type, label, confidence, motion_score, alarm_state, camera])
+            self.csv_bytes = f.tell()
         
         # Log to session data
         event_data = {
@@ -306,7 +578,8 @@ class DataLogger:
             "label": label,
             "confidence": confidence,
             "motion_score": motion_score,
-            "alarm_state": alarm_state
+            "alarm_state": alarm_state,
+            "camera": camera
         }
         
         if event_type == "face_detection":
@@ -319,8 +592,12 @@ class DataLogger:
         # Update statistics
         self.update_stats(event_type, label)
     
+    def count_frame(self, n=1):
+        """Count captured frames (log_event only sees frames that produced an event)"""
+        self.stats["total_frames"] += n
+    
     def update_stats(self, event_type, label):
-        self.stats["total_frames"] += 1
+        self.stats["total_events"] += 1
         
         if event_type == "motion":
             self.stats["motion_frames"] += 1
@@ -338,11 +615,17 @@ class DataLogger:
         self.session_data["statistics"] = self.stats
         
         with open(self.session_file, 'w') as f:
-            json.dump(self.session_data, f, indent=2)
+            json.dump(self.session_data, f, indent=2, default=list)  # event deques as JSON lists
+    
+    def close(self):
+        for rotator in (self.rotator, self.snapshot_rotator):
+            if rotator is not None:
+                rotator.stop()
     
     def print_stats(self):
         print("\n=== SESSION STATISTICS ===")
         print(f"Total frames processed: {self.stats['total_frames']}")
+        print(f"Events logged: {self.stats['total_events']}")
         print(f"Frames with motion: {self.stats['motion_frames']}")
         print(f"Face detections: {self.stats['face_detections']}")
         print(f"Known person detections: {self.stats['known_detections']}")
@@ -351,99 +634,459 @@ class DataLogger:
         if self.stats['total_frames'] > 0:
             print(f"Motion percentage: {(self.stats['motion_frames']/self.stats['total_frames']*100):.1f}%")
 
-class Gate:
-    def __init__(s): s.bg=None
-    def score(s,gray):
-        if s.bg is None: s.bg=gray.astype("float"); return 0
-        cv2.accumulateWeighted(gray,s.bg,0.02)
-        delta=cv2.absdiff(gray,cv2.convertScaleAbs(s.bg))
-        _,mask=cv2.threshold(delta,25,255,cv2.THRESH_BINARY)
-        return mask.sum()
-
-gate=Gate()
-logger=DataLogger()
-notifier=NotificationManager(NOTIFICATION_CONFIG)
-
-# Create snapshots directory for notification images
-snapshots_dir = "snapshots"
-if not os.path.exists(snapshots_dir):
-    os.makedirs(snapshots_dir)
-
-with serial.Serial(PORT, BAUD, timeout=1) as ser:
-    time.sleep(2)
-    ser.write(b"<ARM:1>\n"); ser.readline(); ser.readline()  # ACK + STATE
-    on=False; miss=0
-    print("SmartCam started - Press 'q' to quit")
-    print("Data logging enabled - files will be saved in 'logs' directory")
-    
-    # Check which notification methods are enabled
-    enabled_notifications = [k for k, v in NOTIFICATION_CONFIG.items() if v.get("enabled", False)]
-    if enabled_notifications:
-        print(f"Remote notifications enabled: {', '.join(enabled_notifications)}")
-    else:
-        print("Remote notifications disabled - edit NOTIFICATION_CONFIG to enable")
-    
-    try:
-        while True:
-            ok,frame=cap.read()
-            if not ok: break
+class AlarmDecision:
+    """Turns unknown-face sightings into alarm ON/OFF decisions using timestamps, not frame counts.
+
+    ON after trigger_sightings sightings within trigger_window seconds; OFF once
+    hold_seconds pass without a sighting. Feed it every frame (skipped frames
+    too, as unknown=False) or feed a synthetic stream of (timestamp, unknown).
+    """
+    def __init__(self, trigger_sightings=1, trigger_window=2.0, hold_seconds=2.0):
+        self.trigger_sightings = max(1, int(trigger_sightings))
+        self.trigger_window = trigger_window
+        self.hold_seconds = hold_seconds
+        self.sightings = deque()
+        self.on = False
+        self.last_seen = None
+    
+    def update(self, unknown, now=None):
+        """Feed one observation; returns "ON" or "OFF" when the alarm state changes, else None"""
+        now = time.time() if now is None else now
+        if unknown:
+            self.last_seen = now
+            self.sightings.append(now)
+        while self.sightings and now - self.sightings[0] > self.trigger_window:
+            self.sightings.popleft()
+        
+        if not self.on and len(self.sightings) >= self.trigger_sightings:
+            self.on = True
+            return "ON"
+        if self.on and now - self.last_seen >= self.hold_seconds:
+            self.on = False
+            self.sightings.clear()
+            return "OFF"
+        return None
+    
+    def replay(self, stream):
+        """Run (timestamp, unknown) pairs through the engine; returns [(timestamp, "ON"|"OFF"), ...]"""
+        changes = []
+        for now, unknown in stream:
+            change = self.update(unknown, now)
+            if change:
+                changes.append((now, change))
+        return changes
+
+class DutyCycle:
+    """Idle mode for quiet scenes: analyze every Nth frame until motion shows up again"""
+    def __init__(self, idle_after=300, idle_fraction=0.25, idle_every=5):
+        self.idle_after = idle_after
+        self.idle_fraction = idle_fraction
+        self.idle_every = max(1, int(idle_every))
+        self.mode = "active"
+        self.quiet_since = None
+        self.skip = 0
+        self.switches = 0
+        self.seconds = {"active": 0.0, "idle": 0.0}
+        self.cpu = {"active": 0.0, "idle": 0.0}
+        self.frames = {"active": 0, "idle": 0}
+        self.analyzed = {"active": 0, "idle": 0}
+        self.last_wall = time.time()
+        self.last_cpu = time.process_time()
+    
+    def should_analyze(self):
+        """Call once per captured frame - False means just grab the frame and move on"""
+        self._account()
+        self.frames[self.mode] += 1
+        if self.mode == "idle":
+            self.skip = (self.skip + 1) % self.idle_every
+            if self.skip:
+                return False
+        self.analyzed[self.mode] += 1
+        return True
+    
+    def update(self, score, threshold, now=None):
+        """Feed the gate score of an analyzed frame"""
+        now = time.time() if now is None else now
+        if score >= threshold * self.idle_fraction:
+            self.quiet_since = None
+            if self.mode == "idle":
+                self._switch("active")
+        elif self.quiet_since is None:
+            self.quiet_since = now
+        elif self.idle_after and self.mode == "active" and now - self.quiet_since >= self.idle_after:
+            self._switch("idle")
+    
+    def _account(self):
+        wall, cpu = time.time(), time.process_time()
+        self.seconds[self.mode] += wall - self.last_wall
+        self.cpu[self.mode] += cpu - self.last_cpu
+        self.last_wall, self.last_cpu = wall, cpu
+    
+    def _switch(self, mode):
+        self._account()
+        self.mode = mode
+        self.skip = 0
+        self.switches += 1
+    
+    def report(self):
+        """Time, frames and CPU per mode, plus the CPU idle mode saved versus full rate"""
+        self._account()
+        active_cpu_per_frame = self.cpu["active"] / self.frames["active"] if self.frames["active"] else 0.0
+        full_rate_cpu = self.cpu["active"] + self.frames["idle"] * active_cpu_per_frame
+        saved = max(0.0, full_rate_cpu - self.cpu["active"] - self.cpu["idle"])
+        return {
+            "mode": self.mode,
+            "switches": self.switches,
+            "seconds": dict(self.seconds),
+            "cpu_seconds": dict(self.cpu),
+            "frames": dict(self.frames),
+            "analyzed": dict(self.analyzed),
+            "cpu_saved_seconds": saved,
+            "cpu_saved_percent": saved / full_rate_cpu * 100 if full_rate_cpu else 0.0
+        }
+    
+    def print_report(self, title="DUTY CYCLE"):
+        r = self.report()
+        total = sum(r["seconds"].values()) or 1.0
+        print(f"\n=== {title} ===")
+        for mode in ("active", "idle"):
+            print(f"{mode.capitalize()} mode: {r['seconds'][mode]:.0f}s ({r['seconds'][mode]/total*100:.1f}%), "
+                  f"{r['frames'][mode]} frames, {r['analyzed'][mode]} analyzed, {r['cpu_seconds'][mode]:.1f}s CPU")
+        print(f"Mode switches: {r['switches']}")
+        print(f"Estimated CPU saved: {r['cpu_saved_seconds']:.1f}s ({r['cpu_saved_percent']:.1f}%)")
+
+class CameraPipeline:
+    """Motion gate, face detection and recognition for one camera"""
+    def __init__(self, camera, detector, rec, labels, watcher=None):
+        self.camera = camera
+        self.location = camera["location"]
+        self.detector = detector
+        self.rec = rec
+        self.labels = labels
+        self.watcher = watcher   # ModelWatcher: a retrained model is swapped in between frames
+        self.gate = create_motion(camera)
+        self.zones = ZoneMap(camera)   # per-zone motion triggers; one whole-frame zone when none are configured
+        self.duty = DutyCycle(camera["idle_after"], camera["idle_fraction"], camera["idle_every"])
+        
+        labels = {"camera": self.location}
+        self.timers = {stage: REGISTRY.histogram("smartcam_stage_seconds", "Per-frame stage latency in seconds", stage=stage, **labels)
+                       for stage in ("capture", "gate", "detect", "recognize")}
+        self.frames = REGISTRY.counter("smartcam_frames_total", "Frames captured", **labels)
+        self.analyzed = REGISTRY.counter("smartcam_frames_analyzed_total", "Frames run through the pipeline", **labels)
+        self.dropped = REGISTRY.counter("smartcam_frames_dropped_total", "Frames lost because the loop fell behind the camera frame rate", **labels)
+        self.motion_frames = REGISTRY.counter("smartcam_motion_frames_total", "Frames that triggered the motion gate", **labels)
+        self.faces = {kind: REGISTRY.counter("smartcam_faces_total", "Recognized faces", kind=kind, **labels) for kind in ("known", "unknown")}
+        self.trigger_gauge = REGISTRY.gauge("smartcam_motion_trigger_level", "Current self-calibrated motion trigger level", **labels)
+        self.idle_gauge = REGISTRY.gauge("smartcam_idle_mode", "1 while the camera is in idle mode", **labels)
+        self.frame_period = None
+        self.last_capture = None
+    
+    def read(self, cap):
+        """Capture the next frame; returns (ok, frame) with frame None for frames idle mode skips"""
+        now = time.time()
+        if self.frame_period is None:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            self.frame_period = 1.0 / fps if fps and fps > 0 else 0.0
+        if self.frame_period and self.last_capture is not None:
+            behind = int((now - self.last_capture) / self.frame_period - 0.5)
+            if behind > 0:
+                self.dropped.inc(behind)
+        self.last_capture = now
+        self.frames.inc()
+        self.idle_gauge.set(1 if self.duty.mode == "idle" else 0)
+        
+        if not self.duty.should_analyze():
+            with TRACER.span("grab", camera=self.location):
+                return cap.grab(), None
+        with self.timers["capture"].time(), TRACER.span("capture", camera=self.location):
+            ok, frame = cap.read()
+        return ok, frame
+    
+    def analyze(self, frame):
+        """Run one BGR frame through the pipeline and return what was seen"""
+        if self.watcher is not None:
+            update = self.watcher.take()
+            if update is not None:
+                self.rec, self.labels = update
+        self.analyzed.inc()
+        with self.timers["gate"].time(), TRACER.span("gate", camera=self.location):
             gray=cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
-            m=gate.score(gray)
-            cv2.putText(frame,f"motion:{m}",(10,25),cv2.FONT_HERSHEY_SIMPLEX,0.7,(0,255,0),2)
+            m,triggered=self.zones.score(self.gate, gray)
+        threshold=self.zones.threshold
+        self.duty.update(m, threshold)
+        self.trigger_gauge.set(threshold)
+        result = {"motion": m, "motion_threshold": threshold, "motion_event": False,
+                  "label": "none", "confidence": 0, "box": None, "zones": self.zones}
+        
+        if triggered:
+            result["motion_event"] = True
+            self.motion_frames.inc()
+            with self.timers["detect"].time(), TRACER.span("detect", camera=self.location):
+                faces=self.detect(frame, gray)
+            if len(faces):
+                x,y,w,h=max(faces,key=lambda r:r[2]*r[3])
+                with self.timers["recognize"].time(), TRACER.span("recognize", camera=self.location):
+                    roi=cv2.resize(gray[y:y+h,x:x+w],(200,200))
+                    pred,conf=self.rec.predict(roi)
+                if pred == UNAVAILABLE:
+                    return result  # recognition server down: no verdict, so no sighting either way
+                result["confidence"] = conf
+                result["label"] = self.labels[pred] if 0 <= pred < len(self.labels) and conf<self.camera["confidence_threshold"] else "unknown"
+                result["box"] = (x,y,w,h)
+                self.faces["unknown" if result["label"] == "unknown" else "known"].inc()
+        return result
+
+    def detect(self, frame, gray):
+        """Face detection limited to the zones that triggered; faces in ignore zones are dropped"""
+        x0,y0,x1,y1=self.zones.detect_region()
+        if (x0,y0,x1,y1)==(0,0,frame.shape[1],frame.shape[0]):
+            faces=self.detector.detect(frame, gray)
+        else:
+            faces=[(x+x0,y+y0,w,h) for x,y,w,h in self.detector.detect(frame[y0:y1,x0:x1], gray[y0:y1,x0:x1])]
+        return [f for f in faces if not self.zones.ignored(f)]
 
-            label="none"
-            confidence=0
+def draw_detection(frame, result):
+    """Draw the motion score, the detection zones and the recognized face onto the frame"""
+    if result.get("zones") is not None:
+        result["zones"].draw(frame)
+    cv2.putText(frame,f"motion:{result['motion']:.2%} / {result['motion_threshold']:.2%}",(10,25),cv2.FONT_HERSHEY_SIMPLEX,0.7,(0,255,0),2)
+    if result["box"] is not None:
+        x,y,w,h=result["box"]
+        cv2.rectangle(frame,(x,y),(x+w,y+h),(0,255,0),2)
+        cv2.putText(frame,f"{result['label']} {result['confidence']:.0f}",(x,y-10),cv2.FONT_HERSHEY_SIMPLEX,0.6,(0,255,0),2)
+
+def draw_stats(frame, stats):
+    """Draw the session counters onto the frame"""
+    cv2.putText(frame,f"Detections: {stats['face_detections']}",(10,50),cv2.FONT_HERSHEY_SIMPLEX,0.5,(255,255,255),1)
+    cv2.putText(frame,f"Unknown: {stats['unknown_detections']}",(10,70),cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,255),1)
+    cv2.putText(frame,f"Alarms: {stats['alarm_triggers']}",(10,90),cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,255,255),1)
+
+def load_recognizer():
+    """Load the trained LBPH model and its label list"""
+    return load_model("models/lbph.yml", "models/labels.txt")
+
+def camera_recognizer(camera):
+    """The local LBPH model, or a RemoteRecognizer when the camera has a recognition_server"""
+    if camera["recognition_server"]:
+        rec=RemoteRecognizer(camera["recognition_server"], camera["location"])
+        return rec, rec.labels
+    return load_recognizer()
+
+def save_snapshot(frame, snapshots_dir="snapshots", prefix="unknown"):
+    os.makedirs(snapshots_dir, exist_ok=True)
+    snapshot_path = os.path.join(snapshots_dir, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
+    cv2.imwrite(snapshot_path, frame)
+    return snapshot_path
+
+class AlarmController:
+    """Serial link to the Arduino alarm (protocol in Smart_Camera_Arduino.ino)"""
+    def __init__(self, ser, reply_timeout=1.0):
+        self.ser = ser
+        self.reply_timeout = reply_timeout
+        self.state = None
+        self.errors = 0
+        self.latency = REGISTRY.histogram("smartcam_serial_roundtrip_seconds", "Arduino command round-trip time in seconds")
+        self.error_counter = REGISTRY.counter("smartcam_serial_errors_total", "Serial ERR replies, garbled lines and timeouts")
+    
+    def send(self, command):
+        """Send a command such as 'ALARM:ON' and return the reported state (None on timeout)"""
+        errors = self.errors
+        with self.latency.time(), TRACER.span("serial", cat="serial", command=command):
+            state = self._exchange(command)
+        self.error_counter.inc(self.errors - errors)
+        return state
+    
+    def _exchange(self, command):
+        self.ser.write(f"<{command}>\n".encode())
+        deadline = time.time() + self.reply_timeout
+        replied = False
+        timeout = self.ser.timeout
+        try:
+            while True:
+                left = deadline - time.time()
+                if left <= 0:
+                    break
+                self.ser.timeout = left  # one readline must not run past the deadline
+                line = self.ser.readline().decode(errors="ignore").strip()
+                if not line:
+                    continue
+                if line in ("ACK", "ERR"):
+                    if line == "ERR":
+                        self.errors += 1
+                    replied = True
+                elif line.startswith("<STATE:") and line.endswith(">"):
+                    # STATE lines without a preceding ACK are button presses
+                    self.state = line[7:-1]
+                    if replied:
+                        return self.state
+                else:
+                    self.errors += 1  # garbled line
+        finally:
+            self.ser.timeout = timeout
+        self.errors += 1
+        return None
+    
+    def arm(self, on=True):
+        return self.send("ARM:1" if on else "ARM:0")
+    
+    def alarm(self, on):
+        return self.send("ALARM:ON" if on else "ALARM:OFF")
+
+def process_frame(pipeline, cap, logger, notifier, decision, alarm=None, draw=False):
+    """One pass of the main loop: capture, analyze, log, snapshot and notify, then the alarm decision
+
+    Returns (ok, frame, result, change): ok is False once the source stops delivering frames,
+    frame and result are None for frames idle mode only grabbed, change is "ON", "OFF" or None.
+    alarm: the AlarmController to switch, or None where there is no Arduino
+    draw: draw the overlays even when no snapshot is taken, because the frame will be shown
+    """
+    ok,frame=pipeline.read(cap)
+    if not ok:
+        return False, None, None, None
+    logger.count_frame()
+    result=None; m=0; label="none"
+    if frame is not None:  # None: idle mode only grabbed the frame, but the alarm hold time still runs
+        result=pipeline.analyze(frame)
+        m=result["motion"]; label=result["label"]; confidence=result["confidence"]
+        if draw or label=="unknown":
+            draw_detection(frame, result)
+        
+        # Log motion events
+        if result["motion_event"]:
+            logger.log_event("motion", motion_score=m, alarm_state=decision.on, camera=pipeline.location)
             
-            # Log motion events
-            if m>6000:
-                logger.log_event("motion", motion_score=m, alarm_state=on)
+            if result["box"] is not None:
+                # Log face detection
+                logger.log_event("face_detection", label=label, confidence=confidence, motion_score=m, alarm_state=decision.on, camera=pipeline.location)
                 
-                faces=face.detectMultiScale(gray,1.2,5,minSize=(80,80))
-                if len(faces):
-                    x,y,w,h=max(faces,key=lambda r:r[2]*r[3])
-                    roi=cv2.resize(gray[y:y+h,x:x+w],(200,200))
-                    pred,conf=rec.predict(roi)
-                    confidence=conf
-                    label = labels[pred] if conf<70 else "unknown"
-                    cv2.rectangle(frame,(x,y),(x+w,y+h),(0,255,0),2)
-                    cv2.putText(frame,f"{label} {conf:.0f}",(x,y-10),cv2.FONT_HERSHEY_SIMPLEX,0.6,(0,255,0),2)
-                    
-                    # Log face detection
-                    logger.log_event("face_detection", label=label, confidence=confidence, motion_score=m, alarm_state=on)
-                    
-                    # Save snapshot and send notification for unknown persons
-                    if label == "unknown":
-                        snapshot_path = os.path.join(snapshots_dir, f"unknown_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
-                        cv2.imwrite(snapshot_path, frame)
-                        notifier.notify_unknown_person(confidence, snapshot_path)
-
-            if label=="unknown" and not on:
-                ser.write(b"<ALARM:ON>\n"); ser.readline(); ser.readline(); on=True; miss=0
-                logger.log_event("alarm", label="ON", motion_score=m, alarm_state=True)
-                notifier.notify_alarm_state("ON", "Unknown person detected")
-            elif on and (label!="unknown"):
-                miss+=1
-                if miss>30:
-                    ser.write(b"<ALARM:OFF>\n"); ser.readline(); ser.readline(); on=False; miss=0
-                    logger.log_event("alarm", label="OFF", motion_score=m, alarm_state=False)
-                    notifier.notify_alarm_state("OFF", "No unknown persons detected")
-
-            # Display stats on frame
-            cv2.putText(frame,f"Detections: {logger.stats['face_detections']}",(10,50),cv2.FONT_HERSHEY_SIMPLEX,0.5,(255,255,255),1)
-            cv2.putText(frame,f"Unknown: {logger.stats['unknown_detections']}",(10,70),cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,255),1)
-            cv2.putText(frame,f"Alarms: {logger.stats['alarm_triggers']}",(10,90),cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,255,255),1)
-            
-            cv2.imshow("SmartCam",frame)
-            if cv2.waitKey(1)&0xFF==ord('q'): break
-            
-    except KeyboardInterrupt:
-        print("\nShutting down...")
-    finally:
-        cap.release(); cv2.destroyAllWindows()
-        ser.write(b"<ARM:0>\n"); ser.readline(); ser.readline()
+                # Save snapshot and send notification for unknown persons
+                if label == "unknown":
+                    with TRACER.span("snapshot"):
+                        snapshot_path = save_snapshot(frame)
+                    notifier.notify_unknown_person(confidence, snapshot_path, pipeline.location, result["box"])
+
+    change=decision.update(label=="unknown")
+    if change:
+        if alarm is not None:
+            alarm.alarm(change=="ON")
+        logger.log_event("alarm", label=change, motion_score=m, alarm_state=change=="ON", camera=pipeline.location)
+        notifier.notify_alarm_state(change, "Unknown person detected" if change=="ON" else "No unknown persons detected")
+    return True, frame, result, change
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SmartCam security camera")
+    parser.add_argument("--headless", action="store_true", help="no cv2.imshow window (no display needed)")
+    parser.add_argument("--preview-port", type=int, default=0, help="serve an MJPEG preview on this local port (0 = off)")
+    parser.add_argument("--preview-host", default="127.0.0.1", help="address for the preview server")
+    parser.add_argument("--preview-fps", type=float, default=5, help="preview frame-rate cap")
+    parser.add_argument("--preview-width", type=int, default=640, help="preview frames are downscaled to this width")
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics on this local port (0 = off)")
+    parser.add_argument("--trace", metavar="FILE", help="record per-frame stage timings and write Chrome trace JSON to FILE on exit (and on SIGUSR1)")
+    parser.add_argument("--trace-buffer", type=int, default=200000, help="trace ring buffer size in events (oldest are overwritten)")
+    parser.add_argument("--model-watch", type=float, default=2.0, metavar="SECONDS", help="check models/lbph.yml this often and swap in a retrained model (0 = off)")
+    parser.add_argument("--profile-ms", type=float, default=0, help="with --trace, also sample Python stacks every N ms (0 = off)")
+    return parser.parse_args()
+
+def main():
+    args=parse_args()
+    show=not args.headless
+    preview=None
+    if args.preview_port:
+        preview=PreviewServer(args.preview_host, args.preview_port, args.preview_fps, args.preview_width).start()
+        print(f"Live preview at {preview.url}")
+    metrics_server=None
+    if args.metrics_port:
+        metrics_server=MetricsServer(REGISTRY, port=args.metrics_port).start()
+        print(f"Metrics at {metrics_server.url}")
+    alarm_gauge=REGISTRY.gauge("smartcam_alarm_on", "1 while the Arduino alarm is on")
+    profiler=None
+    if args.trace:
+        TRACER.enable(args.trace_buffer)
+        if args.profile_ms > 0:
+            profiler=SamplingProfiler(TRACER, args.profile_ms / 1000).start()
+        if hasattr(signal, "SIGUSR1"):
+            # kill -USR1 <pid> writes the trace so far without stopping
+            signal.signal(signal.SIGUSR1, lambda *_: print(f"Trace: {TRACER.dump(args.trace)} events written to {args.trace}"))
+        print(f"Tracing enabled - trace will be written to {args.trace}")
+
+    camera=CAMERAS[0]
+    rec,labels=camera_recognizer(camera)
+    watcher=None
+    if args.model_watch and not camera["recognition_server"]:
+        watcher=ModelWatcher(interval=args.model_watch).start()
+    pipeline=CameraPipeline(camera, create_detector(camera, DETECTOR_CONFIG), rec, labels, watcher)
+    cap=open_source(camera["source"])
+
+    logger=DataLogger(LOG_CONFIG)
+    notifier=NotificationManager(NOTIFICATION_CONFIG, SPOOL_CONFIG)
+
+    with serial.Serial(PORT, BAUD, timeout=1) as ser:
+        time.sleep(2)
+        alarm=AlarmController(ser)
+        alarm.arm(True)
+        decision=AlarmDecision(**ALARM_CONFIG)
+
+        print("SmartCam started - Press 'q' to quit" if show else "SmartCam started headless - Ctrl+C to quit")
+        print("Data logging enabled - files will be saved in 'logs' directory")
+        
+        # Check which notification methods are enabled
+        enabled_notifications = [k for k, v in NOTIFICATION_CONFIG.items() if v.get("enabled", False)]
+        if enabled_notifications:
+            print(f"Remote notifications enabled: {', '.join(enabled_notifications)}")
+        else:
+            print("Remote notifications disabled - edit NOTIFICATION_CONFIG to enable")
         
-        # Save session data and print statistics
-        logger.save_session()
-        logger.print_stats()
-        print(f"Session data saved to: {logger.session_file}")
-        print(f"CSV log saved to: {logger.csv_file}")
\ No newline at end of file
+        try:
+            while True:
+                t_frame=time.perf_counter()
+                # Overlays cost time on every frame - only draw them when someone will see them
+                send_preview=preview is not None and preview.wants_frame()
+                render=show or send_preview
+                ok,frame,_,change=process_frame(pipeline, cap, logger, notifier, decision, alarm, draw=render)
+                if not ok: break
+                if change:
+                    alarm_gauge.set(1 if change=="ON" else 0)
+                if frame is None:
+                    # Idle mode: frame was only grabbed, keep the window responsive
+                    if show and cv2.waitKey(1)&0xFF==ord('q'): break
+                    continue
+
+                # Display stats on frame
+                if render:
+                    with TRACER.span("render"):
+                        draw_stats(frame, logger.stats)
+                        if send_preview:
+                            preview.publish(frame)
+                        if show:
+                            cv2.imshow("SmartCam",frame)
+                TRACER.complete("frame", t_frame, cat="frame", camera=pipeline.location)
+                if show and cv2.waitKey(1)&0xFF==ord('q'): break
+                
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+        finally:
+            cap.release()
+            if show: cv2.destroyAllWindows()
+            if preview is not None: preview.stop()
+            if metrics_server is not None: metrics_server.stop()
+            if watcher is not None: watcher.stop()
+            if decision.on: alarm.alarm(False)
+            alarm.arm(False)
+            notifier.close()
+            if args.trace:
+                if profiler is not None:
+                    profiler.stop()
+                    profiler.print_report()
+                print(f"Trace: {TRACER.dump(args.trace)} events written to {args.trace} (open in https://ui.perfetto.dev)")
+            
+            # Save session data and print statistics
+            logger.session_data["duty_cycle"] = pipeline.duty.report()
+            logger.save_session()
+            logger.close()
+            logger.print_stats()
+            pipeline.duty.print_report()
+            print(f"Session data saved to: {logger.session_file}")
+            print(f"CSV log saved to: {logger.csv_file}")
+
+if __name__ == "__main__":
+    main()
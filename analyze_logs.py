@@ -1,12 +1,62 @@
 # analyze_logs.py - Data Analysis Tool for SmartCam Logs
-import json, csv, os
+#
+#   python analyze_logs.py                      # charts shown in a window (if there is a display)
+#   python analyze_logs.py --headless --html    # Agg backend, PNG + self-contained HTML report
+#   python analyze_logs.py --max-points 2000 --downsample lttb --dpi 150
+import json, csv, os, io, sys, base64, argparse
 from datetime import datetime
-import matplotlib.pyplot as plt
 from collections import defaultdict, Counter
+from logrotate import open_log, log_files
+
+MOTION_MIN_FRACTION = 0.002  # default motion_min_fraction in SmartCam.CAMERA_DEFAULTS
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: keep `threshold` of the (x, y) points that preserve the shape of the line"""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        start, end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x = sum(p[0] for p in points[start:end]) / (end - start)
+        avg_y = sum(p[1] for p in points[start:end]) / (end - start)
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+def bucket_max(points, buckets):
+    """Split the time range into equal buckets and keep each bucket's peak (x, y)"""
+    if len(points) <= buckets:
+        return list(points)
+    x0, x1 = points[0][0], points[-1][0]
+    width = (x1 - x0) / buckets or 1
+    peaks = {}
+    for x, y in points:
+        b = min(buckets - 1, int((x - x0) / width))
+        if b not in peaks or y > peaks[b][1]:
+            peaks[b] = (x, y)
+    return [peaks[b] for b in sorted(peaks)]
+
+DOWNSAMPLERS = {"lttb": lttb, "bucket": bucket_max}
 
 class LogAnalyzer:
-    def __init__(self, logs_dir="logs"):
+    def __init__(self, logs_dir="logs", headless=False, dpi=150, max_points=2000, downsample="lttb"):
         self.logs_dir = logs_dir
+        self.headless = headless
+        self.dpi = dpi
+        self.max_points = max_points
+        self.downsample = downsample
         self.sessions = []
         self.csv_data = []
         
@@ -16,18 +66,16 @@ class LogAnalyzer:
             print(f"Logs directory '{self.logs_dir}' not found!")
             return
             
-        # Load JSON session files
-        for file in os.listdir(self.logs_dir):
-            if file.startswith("session_") and file.endswith(".json"):
-                with open(os.path.join(self.logs_dir, file), 'r') as f:
-                    self.sessions.append(json.load(f))
+        # Load JSON session files (plain, .gz or .zst - compressed ones are streamed, never unpacked to disk)
+        for path in log_files(self.logs_dir, "session_", ".json"):
+            with open_log(path) as f:
+                self.sessions.append(json.load(f))
         
         # Load CSV files
-        for file in os.listdir(self.logs_dir):
-            if file.startswith("smartcam_log_") and file.endswith(".csv"):
-                with open(os.path.join(self.logs_dir, file), 'r') as f:
-                    reader = csv.DictReader(f)
-                    self.csv_data.extend(list(reader))
+        for path in log_files(self.logs_dir, "smartcam_log_", ".csv"):
+            with open_log(path) as f:
+                reader = csv.DictReader(f)
+                self.csv_data.extend(reader)
                     
         print(f"Loaded {len(self.sessions)} sessions and {len(self.csv_data)} CSV records")
     
@@ -83,9 +131,9 @@ class LogAnalyzer:
             min_motion = min(motion_scores)
             
             print(f"Total motion events: {len(motion_events)}")
-            print(f"Average motion score: {avg_motion:.1f}")
-            print(f"Max motion score: {max_motion:.1f}")
-            print(f"Min motion score: {min_motion:.1f}")
+            print(f"Average motion score: {avg_motion:.4f} (fraction of frame changed)")
+            print(f"Max motion score: {max_motion:.4f}")
+            print(f"Min motion score: {min_motion:.4f}")
             
         return motion_scores
     
@@ -119,9 +167,23 @@ class LogAnalyzer:
             
         return alarm_on_events, durations
     
+    def motion_series(self):
+        """(time, score) points for the motion chart, downsampled to max_points"""
+        points = sorted((datetime.fromisoformat(r['timestamp']).timestamp(), float(r['motion_score']))
+                        for r in self.csv_data if r['event_type'] == 'motion' and float(r['motion_score']) > 0)
+        if self.max_points and len(points) > self.max_points:
+            points = DOWNSAMPLERS[self.downsample](points, self.max_points)
+        return points
+    
     def create_visualizations(self):
-        """Create visualization charts"""
+        """Create visualization charts; returns the PNG bytes (None without matplotlib)"""
         try:
+            import matplotlib
+            if self.headless:
+                matplotlib.use("Agg")  # no display needed, nothing blocks
+            import matplotlib.pyplot as plt
+            import matplotlib.dates as mdates
+            
             detection_by_hour, confidence_scores = self.analyze_detections()
             motion_scores = self.analyze_motion()
             alarm_events, durations = self.analyze_alarms()
@@ -147,13 +209,18 @@ class LogAnalyzer:
                 ax2.axvline(x=70, color='red', linestyle='--', label='Threshold (70)')
                 ax2.legend()
             
-            # 3. Motion scores over time
+            # 3. Motion scores over time (downsampled - months of events are millions of points)
             if motion_scores:
-                ax3.plot(motion_scores, color='orange', alpha=0.7)
-                ax3.set_title('Motion Scores Over Time')
-                ax3.set_xlabel('Event Number')
-                ax3.set_ylabel('Motion Score')
-                ax3.axhline(y=6000, color='red', linestyle='--', label='Motion Threshold')
+                series = self.motion_series()
+                ax3.plot([datetime.fromtimestamp(x) for x, _ in series], [y for _, y in series], color='orange', alpha=0.7)
+                ax3.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax3.xaxis.get_major_locator()))
+                title = 'Motion Scores Over Time'
+                if len(series) < len(motion_scores):
+                    title += f' ({len(series)} of {len(motion_scores)} points, {self.downsample})'
+                ax3.set_title(title)
+                ax3.set_xlabel('Time')
+                ax3.set_ylabel('Motion Score (fraction of frame)')
+                ax3.axhline(y=MOTION_MIN_FRACTION, color='red', linestyle='--', label='Minimum Trigger Level')
                 ax3.legend()
             
             # 4. Alarm duration distribution
@@ -164,12 +231,22 @@ class LogAnalyzer:
                 ax4.set_ylabel('Frequency')
             
             plt.tight_layout()
-            plt.savefig(os.path.join(self.logs_dir, 'analysis_charts.png'), dpi=300, bbox_inches='tight')
-            print(f"\nVisualization saved to: {os.path.join(self.logs_dir, 'analysis_charts.png')}")
-            plt.show()
+            buf = io.BytesIO()
+            fig.savefig(buf, format='png', dpi=self.dpi, bbox_inches='tight')
+            png = buf.getvalue()
+            chart_file = os.path.join(self.logs_dir, 'analysis_charts.png')
+            with open(chart_file, 'wb') as f:
+                f.write(png)
+            print(f"\nVisualization saved to: {chart_file}")
+            if self.headless:
+                plt.close(fig)
+            else:
+                plt.show()
+            return png
             
         except ImportError:
             print("\nNote: Install matplotlib for visualizations: pip install matplotlib")
+            return None
     
     def generate_report(self):
         """Generate comprehensive analysis report"""
@@ -202,9 +279,47 @@ class LogAnalyzer:
             f.write(f"ALARM ACTIVATIONS: {len(alarms)}\n")
             
         print(f"Analysis report saved to: {report_file}")
+        return report_file
+    
+    def generate_html_report(self, png=None):
+        """Self-contained HTML report: summary numbers plus the charts embedded as a data URI"""
+        html_file = os.path.join(self.logs_dir, f"analysis_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
+        counts = Counter(r['event_type'] for r in self.csv_data)
+        labels = Counter(r['label'] for r in self.csv_data if r['event_type'] == 'face_detection')
+        alarms = sum(1 for r in self.csv_data if r['event_type'] == 'alarm' and r['label'] == 'ON')
+        rows = [("Sessions analyzed", len(self.sessions)), ("CSV records", len(self.csv_data)),
+                ("Face detections", counts['face_detection']),
+                ("Known persons", sum(v for k, v in labels.items() if k not in ('unknown', 'none'))),
+                ("Unknown persons", labels['unknown']), ("Motion events", counts['motion']),
+                ("Alarm activations", alarms)]
+        table = "".join(f"<tr><td>{name}</td><td>{value}</td></tr>" for name, value in rows)
+        chart = (f"<img alt='charts' style='max-width:100%' src='data:image/png;base64,{base64.b64encode(png).decode()}'>"
+                 if png else "<p>Charts need matplotlib.</p>")
+        with open(html_file, 'w') as f:
+            f.write(f"""<html><head><meta charset="utf-8"><title>SmartCam analysis</title>
+<style>body{{font-family:sans-serif;margin:24px}} td{{border:1px solid #ccc;padding:4px 10px}} table{{border-collapse:collapse}}</style>
+</head><body><h1>SmartCam Data Analysis</h1>
+<p>Generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+<table>{table}</table>
+<h2>Charts</h2>{chart}
+</body></html>""")
+        print(f"HTML report saved to: {html_file}")
+        return html_file
 
 def main():
-    analyzer = LogAnalyzer()
+    parser = argparse.ArgumentParser(description="Analyze SmartCam logs")
+    parser.add_argument("--logs-dir", default="logs")
+    parser.add_argument("--headless", action="store_true", help="render with the Agg backend and don't open a window")
+    parser.add_argument("--html", action="store_true", help="also write a self-contained HTML report")
+    parser.add_argument("--dpi", type=int, default=150, help="chart resolution")
+    parser.add_argument("--max-points", type=int, default=2000, help="downsample the motion chart to this many points (0 = all)")
+    parser.add_argument("--downsample", choices=sorted(DOWNSAMPLERS), default="lttb",
+                        help="lttb keeps the line's shape, bucket keeps the peak of each time bucket")
+    args = parser.parse_args()
+    # No display on a Linux server - don't try to open a window
+    headless = args.headless or (sys.platform.startswith("linux") and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"))
+    
+    analyzer = LogAnalyzer(args.logs_dir, headless, args.dpi, args.max_points, args.downsample)
     analyzer.load_data()
     
     if not analyzer.csv_data and not analyzer.sessions:
@@ -214,8 +329,10 @@ def main():
     analyzer.analyze_detections()
     analyzer.analyze_motion() 
     analyzer.analyze_alarms()
-    analyzer.create_visualizations()
+    png = analyzer.create_visualizations()
     analyzer.generate_report()
+    if args.html:
+        analyzer.generate_html_report(png)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,191 @@
+# arduino_emulator.py - Pseudo-terminal emulator of Smart_Camera_Arduino.ino
+#
+# Serves the Arduino alarm state machine on a pty so SmartCam / Serial_Tester
+# can be exercised on a plain Linux box:
+#
+#   python arduino_emulator.py --delay 0.005 --drop 0.01 --button-every 30
+#   -> Arduino emulator listening on /dev/pts/7
+#
+# Point PORT at the printed device (or use serial_bench.py, which starts one).
+import os, sys, time, random, threading, argparse
+
+DISARMED, ARMED, ALARM = "DISARMED", "ARMED", "ALARM"
+RX_LIMIT = 120  # same safety limit as the sketch
+
+class ArduinoEmulator:
+    def __init__(self, reply_delay=0.0, drop_rate=0.0, garble_rate=0.0,
+                 button_every=0.0, baud=115200, seed=None):
+        self.reply_delay = reply_delay    # seconds before each reply (loop latency)
+        self.drop_rate = drop_rate        # probability a line (either direction) is lost
+        self.garble_rate = garble_rate    # probability a line (either direction) is corrupted
+        self.button_every = button_every  # mean seconds between button presses (0 = never)
+        self.baud = baud                  # paces output like the real UART (0 = unpaced)
+        self.random = random.Random(seed)
+        self.state = DISARMED
+        self.rx = ""
+        self.master = None
+        self.slave = None
+        self.port = None
+        self.running = False
+        self.write_lock = threading.Lock()
+        self.state_lock = threading.Lock()  # reader and button threads share the state
+        self.stats = {"commands": 0, "replies": 0, "dropped": 0, "garbled": 0, "errors": 0, "button_presses": 0}
+
+    # ----------------- state machine (mirrors handleLine) -----------------
+    def handle_line(self, line):
+        """Handle one received line and return the reply lines"""
+        line = line.strip()
+        if not line:
+            return []
+        line = "".join(c for c in line if c not in " \t\r").upper()
+        self.stats["commands"] += 1
+
+        if not (line.startswith("<") and line.endswith(">")):
+            self.stats["errors"] += 1
+            return ["ERR", self.state_line()]
+
+        key, _, val = line[1:-1].partition(":")
+        on = val in ("1", "ON", "TRUE")
+
+        if key == "STATUS":
+            return ["ACK", self.state_line()]
+        if key == "ARM":
+            self.state = ARMED if on else DISARMED
+            return ["ACK", self.state_line()]
+        if key == "ALARM":
+            # Ignored while DISARMED, but still ACK + state
+            if self.state != DISARMED:
+                self.state = ALARM if on else ARMED
+            return ["ACK", self.state_line()]
+
+        self.stats["errors"] += 1
+        return ["ERR", self.state_line()]
+
+    def state_line(self):
+        return f"<STATE:{self.state}>"
+
+    def press_button(self):
+        """Short button press: DISARMED <-> ARMED (ALARM goes to DISARMED), echoes state"""
+        with self.state_lock:
+            self.state = ARMED if self.state == DISARMED else DISARMED
+            self.stats["button_presses"] += 1
+            line = self.state_line()
+        self.emit([line])
+
+    # ----------------- line faults -----------------
+    def corrupt(self, line):
+        """Return the line after applying drop/garble faults (None if dropped)"""
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.stats["dropped"] += 1
+            return None
+        if self.garble_rate and line and self.random.random() < self.garble_rate:
+            self.stats["garbled"] += 1
+            chars = list(line)
+            for _ in range(max(1, len(chars) // 4)):
+                chars[self.random.randrange(len(chars))] = chr(self.random.randint(33, 126))
+            return "".join(chars)
+        return line
+
+    # ----------------- pty transport -----------------
+    def emit(self, lines):
+        """Write reply lines to the host, println-style"""
+        if self.master is None:
+            return
+        out = []
+        for line in lines:
+            line = self.corrupt(line)
+            if line is not None:
+                out.append(line + "\r\n")
+        if not out:
+            return
+        data = "".join(out).encode()
+        with self.write_lock:
+            if self.baud:
+                time.sleep(len(data) * 10 / self.baud)  # 8N1 = 10 bits per byte
+            os.write(self.master, data)
+        self.stats["replies"] += len(out)
+
+    def feed(self, data):
+        """Feed raw bytes from the host through the sketch's line buffer"""
+        for ch in data.decode(errors="ignore"):
+            if ch == "\n":
+                line = self.corrupt(self.rx)
+                self.rx = ""
+                if line is None:
+                    continue
+                with self.state_lock:
+                    replies = self.handle_line(line)
+                if replies:
+                    if self.reply_delay:
+                        time.sleep(self.reply_delay)
+                    self.emit(replies)
+            elif ch != "\r":
+                self.rx += ch
+                if len(self.rx) > RX_LIMIT:
+                    self.rx = ""
+
+    def start(self):
+        """Open the pty and start serving; returns the device path for the host"""
+        import pty, tty
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # no echo or newline translation, like a USB CDC port
+        self.port = os.ttyname(self.slave)
+        self.running = True
+        threading.Thread(target=self._reader, daemon=True).start()
+        if self.button_every > 0:
+            threading.Thread(target=self._button_presser, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        for fd in (self.master, self.slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.master = self.slave = None
+
+    def _reader(self):
+        while self.running:
+            try:
+                data = os.read(self.master, 1024)
+            except (OSError, TypeError):
+                break
+            if not data:
+                break
+            self.feed(data)
+
+    def _button_presser(self):
+        while self.running:
+            time.sleep(self.random.expovariate(1.0 / self.button_every))
+            if self.running:
+                self.press_button()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the SmartCam Arduino protocol on a pseudo-terminal")
+    parser.add_argument("--delay", type=float, default=0.0, help="reply delay in seconds")
+    parser.add_argument("--drop", type=float, default=0.0, help="probability of dropping a line")
+    parser.add_argument("--garble", type=float, default=0.0, help="probability of garbling a line")
+    parser.add_argument("--button-every", type=float, default=0.0, help="mean seconds between button presses")
+    parser.add_argument("--baud", type=int, default=115200, help="pace output at this baud rate (0 = unpaced)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if not sys.platform.startswith("linux") and sys.platform != "darwin":
+        print("The pty emulator needs Linux or macOS")
+        return
+
+    emu = ArduinoEmulator(args.delay, args.drop, args.garble, args.button_every, args.baud, args.seed)
+    print(f"Arduino emulator listening on {emu.start()} - Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.stop()
+        print(f"\nEmulator stats: {emu.stats}")
+
+if __name__ == "__main__":
+    main()
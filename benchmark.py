@@ -0,0 +1,387 @@
+# benchmark.py - Performance benchmarks for SmartCam components
+#
+#   python benchmark.py transport [--frames 300] [--resolutions 480p,720p,1080p]
+#   python benchmark.py detect --video clip.mp4 [--scales auto,0.5,0.4,0.3]
+#   python benchmark.py detectors --images faces/ [--annotations boxes.json] [--backends haar,dnn,yunet]
+#   python benchmark.py motion --video clip.mp4 [--active active.json] [--backends gate,mog2,knn] [--scale 0.5]
+#   python benchmark.py remote [--edges 8] [--requests 200] [--address unix:/tmp/smartcam.sock] [--restart]
+import os, glob, json, time, argparse, threading, statistics
+import multiprocessing as mp
+import numpy as np
+import cv2
+from frame_ring import FrameRing
+from detectors import HaarDetector, create_detector, iou
+from motion import MotionTrigger, create_motion
+from remote import RecognitionServer, RemoteRecognizer, UNAVAILABLE
+from model_watch import load_model
+
+try:
+    from config import DETECTOR_CONFIG
+except ImportError:
+    DETECTOR_CONFIG = {}
+
+RESOLUTIONS = {"480p": (480, 640), "720p": (720, 1280), "1080p": (1080, 1920)}
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def parse_resolutions(text):
+    return [(name, RESOLUTIONS[name]) for name in text.split(",")]
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+def load_frames(args):
+    """(key, frame) pairs from --video (key = frame index) or --images (key = file name)"""
+    frames = []
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        while len(frames) < args.frames:
+            ok, frame = cap.read()
+            if not ok: break
+            frames.append((str(len(frames)), frame))
+        cap.release()
+    elif args.images:
+        for fn in sorted(glob.glob(os.path.join(args.images, "*")))[:args.frames]:
+            frame = cv2.imread(fn)
+            if frame is not None:
+                frames.append((os.path.basename(fn), frame))
+    if not frames:
+        raise SystemExit("No frames loaded - pass --video FILE or --images DIR")
+    return frames
+
+def add_source_args(p, frames=200):
+    p.add_argument("--video", help="video file to read frames from")
+    p.add_argument("--images", help="directory of still images")
+    p.add_argument("--frames", type=int, default=frames, help="maximum frames to use")
+
+def match_boxes(reference, found, overlap=0.5):
+    """How many reference boxes have a match in found (IoU >= overlap)"""
+    return sum(1 for r in reference if any(iou(r, f) >= overlap for f in found))
+
+def time_detector(detect, frames, grays):
+    """Run detect over every frame; returns (ms per frame list, detections per frame)"""
+    times, results = [], []
+    for frame, gray in zip(frames, grays):
+        t0 = time.perf_counter()
+        results.append(detect(frame, gray))
+        times.append((time.perf_counter() - t0) * 1000)
+    return times, results
+
+# ----------------- face detection -----------------
+def bench_detect(args):
+    """Full-resolution Haar vs coarse-to-fine pyramid at several downscale factors"""
+    cv2.setNumThreads(args.threads)
+    frames = [f for _, f in load_frames(args)]
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+    h, w = grays[0].shape
+    full = HaarDetector(min_size=args.min_face)
+    base_times, reference = time_detector(full.detect, frames, grays)
+    total = sum(len(r) for r in reference)
+    base_ms = statistics.mean(base_times)
+    rows = [["full", "1.00", f"{base_ms:.1f}", f"{percentile(base_times, 95):.1f}", "1.0x", total, "-", "-"]]
+
+    for scale in args.scales.split(","):
+        det = HaarDetector(min_size=args.min_face, pyramid=True, refine=not args.no_refine,
+                           coarse_scale=None if scale == "auto" else float(scale))
+        times, found = time_detector(det.detect, frames, grays)
+        kept = sum(match_boxes(r, f) for r, f in zip(reference, found))
+        extra = sum(len(f) for f in found) - kept
+        ms = statistics.mean(times)
+        rows.append([f"pyramid ({scale})", f"{det.coarse_scale:.2f}", f"{ms:.1f}", f"{percentile(times, 95):.1f}",
+                     f"{base_ms / ms:.1f}x" if ms else "-", kept,
+                     f"{total - kept} ({(total - kept) / total * 100:.1f}%)" if total else "0", extra])
+
+    print(f"\n=== FACE DETECTION ({len(grays)} frames, {w}x{h}, min face {args.min_face}px) ===")
+    print_table(["mode", "scale", "mean ms", "p95 ms", "speedup", "detections", "lost vs full", "extra"], rows)
+
+def bench_backends(args):
+    """Latency and accuracy per detector backend, against annotations or the Haar baseline"""
+    items = load_frames(args)
+    frames = [f for _, f in items]
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames]
+    if args.annotations:
+        # {"<image name or frame index>": [[x, y, w, h], ...], ...}
+        truth = json.load(open(args.annotations))
+        reference = [[tuple(b) for b in truth.get(key, [])] for key, _ in items]
+        against = "annotations"
+    else:
+        reference = None  # filled from the first backend's results
+        against = "haar (full resolution)"
+
+    rows = []
+    for backend in args.backends.split(","):
+        camera = {"detector": backend, "min_face": args.min_face, "detect_mode": "full", "detect_scale": None}
+        config = {backend: dict(DETECTOR_CONFIG.get(backend, {}))}
+        if args.threads is not None:
+            config[backend]["threads"] = args.threads
+        try:
+            det = create_detector(camera, config)
+        except (FileNotFoundError, RuntimeError, cv2.error) as e:
+            rows.append([backend, "-", "-", "-", "-", "-", "-", f"skipped: {e}"])
+            continue
+        time_detector(det.detect, frames[:3], grays[:3])  # warm-up (model init, allocations)
+        times, found = time_detector(det.detect, frames, grays)
+        if reference is None:
+            reference = found
+        tp = sum(match_boxes(r, f) for r, f in zip(reference, found))
+        n_found, n_ref = sum(len(f) for f in found), sum(len(r) for r in reference)
+        precision = tp / n_found if n_found else 0.0
+        recall = tp / n_ref if n_ref else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        rows.append([backend, f"{statistics.mean(times):.1f}", f"{percentile(times, 95):.1f}", n_found,
+                     f"{precision:.2f}", f"{recall:.2f}", f"{f1:.2f}", ""])
+
+    h, w = grays[0].shape
+    print(f"\n=== DETECTOR BACKENDS ({len(frames)} frames, {w}x{h}, accuracy vs {against}) ===")
+    print_table(["backend", "mean ms", "p95 ms", "faces", "precision", "recall", "F1", "note"], rows)
+
+# ----------------- frame transport -----------------
+def _touch(frame):
+    """Stand-in for analysis: reads a sparse grid so every page of the frame is visited"""
+    return int(frame[::16, ::64].sum())
+
+def _ring_producer(handle, frames, done, start):
+    ring = FrameRing.attach(**handle)
+    image = np.random.randint(0, 255, ring.shape, dtype=np.uint8)
+    start.value = time.time()
+    for i in range(frames):
+        image[0, 0] = i & 0xFF
+        while ring.write(image) is None:
+            time.sleep(0)  # every slot leased - wait for a reader
+    done.set()
+    ring.close()
+
+def _ring_consumer(handle, results, done):
+    ring = FrameRing.attach(**handle)
+    latencies, seen, last, end = [], 0, -1, 0.0
+    while True:
+        lease = ring.acquire(last)
+        if lease is None:
+            if done.is_set() and ring.latest_seq <= last:
+                break
+            time.sleep(0)
+            continue
+        slot, last, stamp = lease
+        _touch(ring.frame(slot))
+        ring.release(slot)
+        end = time.time()
+        latencies.append(end - stamp)
+        seen += 1
+    results.put((seen, latencies, end))
+    ring.close()
+
+def _queue_producer(q, frames, shape, start):
+    image = np.random.randint(0, 255, shape, dtype=np.uint8)
+    start.value = time.time()
+    for i in range(frames):
+        image[0, 0] = i & 0xFF
+        q.put((time.time(), image))
+    q.put(None)
+
+def _queue_consumer(q, results):
+    latencies, seen, end = [], 0, 0.0
+    while True:
+        item = q.get()
+        if item is None:
+            break
+        stamp, frame = item
+        _touch(frame)
+        end = time.time()
+        latencies.append(end - stamp)
+        seen += 1
+    results.put((seen, latencies, end))
+
+# Both transports are timed from the producer's first frame to the last frame the consumer handled
+def run_ring(shape, frames, slots):
+    ring = FrameRing(shape, slots=slots)
+    done, results, start = mp.Event(), mp.Queue(), mp.Value("d", 0.0)
+    consumer = mp.Process(target=_ring_consumer, args=(ring.handle(), results, done))
+    producer = mp.Process(target=_ring_producer, args=(ring.handle(), frames, done, start))
+    consumer.start()
+    producer.start()
+    producer.join()
+    seen, latencies, end = results.get()
+    consumer.join()
+    ring.close()
+    return end - start.value, seen, latencies
+
+def run_queue(shape, frames, slots):
+    q, results, start = mp.Queue(maxsize=slots), mp.Queue(), mp.Value("d", 0.0)
+    consumer = mp.Process(target=_queue_consumer, args=(q, results))
+    producer = mp.Process(target=_queue_producer, args=(q, frames, shape, start))
+    consumer.start()
+    producer.start()
+    producer.join()
+    seen, latencies, end = results.get()
+    consumer.join()
+    return end - start.value, seen, latencies
+
+def bench_transport(args):
+    """Shared-memory FrameRing vs multiprocessing.Queue (pickled frames) between two processes"""
+    rows = []
+    for name, (h, w) in parse_resolutions(args.resolutions):
+        shape = (h, w, 3)
+        for transport, runner in (("queue/pickle", run_queue), ("shm ring", run_ring)):
+            elapsed, seen, latencies = runner(shape, args.frames, args.slots)
+            ms = [l * 1000 for l in latencies]
+            rows.append([name, transport, f"{args.frames / elapsed:.0f}", f"{seen / elapsed:.0f}",
+                         args.frames - seen, f"{statistics.mean(ms):.2f}" if ms else "-",
+                         f"{percentile(ms, 95):.2f}" if ms else "-"])
+    print(f"\n=== FRAME TRANSPORT ({args.frames} frames, {args.slots} slots/queue depth) ===")
+    print_table(["res", "transport", "published/s", "delivered/s", "skipped", "mean ms", "p95 ms"], rows)
+    print("\nqueue/pickle delivers every frame; the ring always hands readers the newest frame and skips stale ones.")
+
+# ----------------- motion engines -----------------
+def bench_motion(args):
+    """Cost per frame and false-trigger rate per motion backend on a recorded clip"""
+    grays = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for _, f in load_frames(args)]
+    active = [False] * len(grays)
+    if args.active:
+        # {"active": [[first frame, last frame], ...]} - frames where something really moves
+        for first, last in json.load(open(args.active))["active"]:
+            for i in range(first, min(last, len(grays) - 1) + 1):
+                active[i] = True
+    quiet = active.count(False)
+    fps = cv2.VideoCapture(args.video).get(cv2.CAP_PROP_FPS) if args.video else 0
+    minutes = quiet / (fps or 15) / 60  # stills have no frame rate; assume 15 fps
+
+    rows = []
+    for backend in args.backends.split(","):
+        engine = create_motion({"motion_backend": backend, "motion_scale": args.scale,
+                                "motion_learning_rate": args.learning_rate})
+        trigger = MotionTrigger()
+        times, triggered = [], []
+        for gray in grays:
+            t0 = time.perf_counter()
+            score = engine.score(gray)
+            times.append((time.perf_counter() - t0) * 1000)
+            triggered.append(trigger.update(score))
+        false_frames = sum(1 for t, a in zip(triggered, active) if t and not a)
+        # A false trigger = the trigger switching on during a quiet stretch
+        false_events = sum(1 for i, t in enumerate(triggered) if t and not active[i] and (i == 0 or not triggered[i - 1]))
+        hit = sum(1 for t, a in zip(triggered, active) if t and a)
+        n_active = len(grays) - quiet
+        rows.append([backend, f"{statistics.mean(times):.2f}", f"{percentile(times, 95):.2f}", sum(triggered),
+                     f"{false_frames / quiet * 100:.1f}%" if quiet else "-", false_events,
+                     f"{false_events / minutes:.1f}" if minutes else "-",
+                     f"{hit / n_active * 100:.1f}%" if n_active else "-"])
+
+    h, w = grays[0].shape
+    print(f"\n=== MOTION BACKENDS ({len(grays)} frames, {w}x{h}, scale {args.scale}, {quiet} quiet frames) ===")
+    if not args.active:
+        print("No --active ranges given: every triggered frame counts as a false trigger")
+    print_table(["backend", "mean ms", "p95 ms", "triggered", "false frames", "false triggers", "per minute", "active caught"], rows)
+
+# ----------------- remote recognition -----------------
+def _remote_model(people=10, crops=20, seed=0):
+    """models/lbph.yml when present, else an LBPH model trained on random crops"""
+    if os.path.exists("models/lbph.yml"):
+        return load_model("models/lbph.yml", "models/labels.txt")
+    rng = np.random.default_rng(seed)
+    images = [rng.integers(0, 256, (200, 200), dtype=np.uint8) for _ in range(people * crops)]
+    rec = cv2.face.LBPHFaceRecognizer_create()
+    rec.train(images, np.repeat(np.arange(people), crops))
+    return rec, [f"person{i}" for i in range(people)]
+
+def _edge(address, name, crops, results):
+    client = RemoteRecognizer(address, name, reconnect_delay=0.25)
+    for crop in crops:
+        t0 = time.perf_counter()
+        pred, conf = client.predict(crop)
+        ok = pred != UNAVAILABLE
+        results.append(((time.perf_counter() - t0) * 1000, ok))
+        if not ok:
+            time.sleep(0.05)  # a camera would move on to its next frame
+    client.close()
+
+def bench_remote(args):
+    """Edges and recognition server on one box: throughput, latency, batching and reconnects"""
+    rec, labels = _remote_model()
+    make = lambda address: RecognitionServer(address, rec, labels, batch_size=args.batch_size,
+                                             max_wait=args.max_wait_ms / 1000, queue_size=args.queue_size).start()
+    server = make(args.address)
+    rng = np.random.default_rng(1)
+    crops = [rng.integers(0, 256, (200, 200), dtype=np.uint8) for _ in range(32)]
+    results = [[] for _ in range(args.edges)]
+    threads = [threading.Thread(target=_edge, args=(server.address, f"edge{i}", [crops[(i + k) % len(crops)] for k in range(args.requests)], results[i]))
+               for i in range(args.edges)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    if args.restart:
+        time.sleep(0.5)
+        server.stop()   # edges see the connection drop and back off
+        time.sleep(1.0)
+        server = make(server.address)
+        print(f"Server restarted on {server.address}")
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    server.stop()
+
+    times = [ms for r in results for ms, ok in r if ok]
+    failed = sum(1 for r in results for _, ok in r if not ok)
+    batches = server.batches
+    print(f"\n=== REMOTE RECOGNITION ({args.edges} edges x {args.requests} crops via {server.address}, {len(labels)} labels) ===")
+    print_table(["answered", "failed/busy", "crops/s", "mean ms", "p50 ms", "p95 ms", "p99 ms", "mean batch"],
+                [[len(times), failed, f"{len(times) / elapsed:.0f}", f"{statistics.mean(times):.2f}" if times else "-",
+                  f"{percentile(times, 50):.2f}", f"{percentile(times, 95):.2f}", f"{percentile(times, 99):.2f}",
+                  f"{batches.sum / batches.count:.1f}" if batches.count else "-"]])
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartCam performance benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("transport", help="shared-memory frame ring vs queue/pickle transport")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--slots", type=int, default=4)
+    p.add_argument("--resolutions", default="480p,720p,1080p")
+    p.set_defaults(func=bench_transport)
+
+    p = sub.add_parser("detect", help="full-resolution vs coarse-to-fine face detection")
+    add_source_args(p)
+    p.add_argument("--scales", default="auto,0.5,0.4,0.3", help="comma-separated downscale factors ('auto' = native window / min face)")
+    p.add_argument("--min-face", type=int, default=80)
+    p.add_argument("--no-refine", action="store_true", help="keep coarse hits without full-resolution refinement")
+    p.add_argument("--threads", type=int, default=1, help="cv2.setNumThreads for the run")
+    p.set_defaults(func=bench_detect)
+
+    p = sub.add_parser("detectors", help="latency and accuracy per face detector backend")
+    add_source_args(p)
+    p.add_argument("--backends", default="haar,dnn,yunet", help="comma-separated backends; the first is the baseline without --annotations")
+    p.add_argument("--annotations", help='JSON {"<image name or frame index>": [[x, y, w, h], ...]}')
+    p.add_argument("--min-face", type=int, default=80)
+    p.add_argument("--threads", type=int, default=None, help="override the backend thread setting")
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("motion", help="cost per frame and false-trigger rate per motion backend")
+    add_source_args(p, frames=3000)
+    p.add_argument("--backends", default="gate,mog2,knn", help="comma-separated motion backends")
+    p.add_argument("--active", help='JSON {"active": [[first, last], ...]} frame ranges with real motion')
+    p.add_argument("--scale", type=float, default=1.0, help="downscale factor before scoring")
+    p.add_argument("--learning-rate", type=float, default=None, help="background learning rate (default: per backend)")
+    p.set_defaults(func=bench_motion)
+
+    p = sub.add_parser("remote", help="edge-to-server recognition round trips on localhost")
+    p.add_argument("--address", default="127.0.0.1:0", help="host:port (0 = any free port) or unix:/path")
+    p.add_argument("--edges", type=int, default=8, help="concurrent edge connections")
+    p.add_argument("--requests", type=int, default=200, help="crops per edge")
+    p.add_argument("--batch-size", type=int, default=16)
+    p.add_argument("--max-wait-ms", type=float, default=5)
+    p.add_argument("--queue-size", type=int, default=64)
+    p.add_argument("--restart", action="store_true", help="restart the server mid-run to exercise reconnects")
+    p.set_defaults(func=bench_remote)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ NOTIFICATION_CONFIG = {
         "enabled": False,
         "smtp_server": "smtp.gmail.com",
         "smtp_port": 587,
+        "use_tls": True,              # STARTTLS; False for a local relay or notification_emulator.py
         "sender_email": "your_email@gmail.com",
         "sender_password": "your_16_character_app_password",
         "recipient_email": "recipient@gmail.com"
@@ -18,11 +19,95 @@ NOTIFICATION_CONFIG = {
     },
     "discord": {
         "enabled": False,
-        "webhook_url": "https://discord.com/api/webhooks/YOUR_WEBHOOK_ID/YOUR_WEBHOOK_TOKEN"
+        "webhook_url": "https://discord.com/api/webhooks/YOUR_WEBHOOK_ID/YOUR_WEBHOOK_TOKEN",
+        # Optional per-channel snapshot attachment (defaults in SmartCam.ATTACHMENT_DEFAULTS)
+        "attachment": {"enabled": True, "crop": True, "margin": 0.5, "max_dim": 480, "quality": 75}
     },
     "pushover": {
         "enabled": False,
         "user_key": "your_pushover_user_key",
-        "api_token": "your_pushover_api_token"
+        "api_token": "your_pushover_api_token",
+        "api_url": "https://api.pushover.net/1/messages.json"
     }
 }
+
+# Cameras - one dict per camera; multicam.py runs each in its own process,
+# SmartCam.py uses the first. Keys left out use the defaults in SmartCam.py.
+CAMERAS = [
+    {
+        "source": 0,                  # VideoCapture index, video file, rtsp:// URL or "synthetic:1280x720@15,faces=3" test scene
+        "location": "Front Camera",   # shown in notifications and logs
+        "motion_min_fraction": 0.002, # never trigger below 0.2% of the frame changing
+        "motion_sigmas": 4.0,         # trigger at noise mean + 4 standard deviations
+        "motion_backend": "gate",     # "gate" (running average), "mog2" or "knn" - compare with benchmark.py motion
+        "motion_scale": 1.0,          # e.g. 0.5 scores motion on a quarter of the pixels
+        "confidence_threshold": 70,
+        "idle_after": 300,            # seconds of quiet before analyzing only every Nth frame
+        "idle_every": 5,
+        # "recognition_server": "central:7070",  # recognize faces on a remote.py server instead of locally
+        # Optional polygons in frame pixels; motion and face detection only run inside watch zones
+        # "zones": [
+        #     {"name": "porch", "points": [[100, 200], [600, 200], [600, 720], [100, 720]]},
+        #     {"name": "gate", "points": [[700, 300], [900, 300], [900, 500], [700, 500]], "schedule": ["22:00-06:00"]},
+        #     {"name": "tv", "points": [[1000, 100], [1250, 100], [1250, 300], [1000, 300]], "ignore": True},
+        # ],
+    },
+    # {"source": 1, "location": "Back Door", "motion_backend": "mog2", "motion_scale": 0.5},
+]
+
+# Face detector backends - a camera picks one with "detector" in CAMERAS.
+# Keys left out use detectors.DETECTOR_DEFAULTS; "threads" 0 keeps OpenCV's default.
+# Models are loaded from local files, e.g.
+#   res10 SSD: deploy.prototxt + res10_300x300_ssd_iter_140000.caffemodel (OpenCV samples)
+#   YuNet:     face_detection_yunet_2023mar.onnx (OpenCV model zoo)
+DETECTOR_CONFIG = {
+    "haar": {"threads": 0},
+    "dnn": {
+        "model": "models/res10_300x300_ssd_iter_140000.caffemodel",
+        "config": "models/deploy.prototxt",
+        "input_size": [300, 300],
+        "score_threshold": 0.6,
+        "threads": 2
+    },
+    "yunet": {
+        "model": "models/face_detection_yunet_2023mar.onnx",
+        "input_size": [320, 320],
+        "score_threshold": 0.7,
+        "threads": 2
+    }
+}
+
+# Alarm decision - based on wall-clock time, so it behaves the same at any frame rate
+ALARM_CONFIG = {
+    "trigger_sightings": 1,    # unknown-face frames needed to sound the alarm...
+    "trigger_window": 2.0,     # ...within this many seconds (e.g. 3 within 2.0 to ignore one-off misreads)
+    "hold_seconds": 2.0        # alarm clears after this many seconds without an unknown face
+}
+
+# Notification spool - alerts are written to disk first and delivered with retries,
+# so they survive network outages and restarts. Off by default (alerts are sent
+# directly); keys left out use spool.SPOOL_DEFAULTS.
+SPOOL_CONFIG = {
+    "enabled": False,      # True to spool
+    "directory": "spool",
+    "rate": 10.0,          # deliveries per second at most
+    "max_attempts": 10,    # then moved to spool/failed
+    "backoff": 5.0         # first retry delay in seconds, doubled each attempt (max_backoff caps it)
+}
+
+# Log files - a new CSV per day (and per max_bytes); closed logs are compressed in the
+# background and the oldest deleted to stay within the retention budget
+LOG_CONFIG = {
+    "max_bytes": 50 * 1024 * 1024,
+    "compression": "gzip",           # or "zstd" (pip install zstandard), None to keep plain files
+    "retention_days": 90,
+    "retention_bytes": 2 * 1024 ** 3,
+    "session_events": 1000,              # newest events of each kind kept in the session JSON
+    "snapshot_retention_days": 30,       # snapshots/ is pruned the same way
+    "snapshot_retention_bytes": 1024 ** 3
+}
+
+# Soak test limits (soak.py) - largest upward trend per hour before the run fails
+# SOAK_CONFIG = {
+#     "limits": {"rss_mb": 10, "traced_mb": 5, "threads": 0.5, "fds": 1, "disk_mb": 20, "session_events": 100}
+# }
@@ -0,0 +1,218 @@
+# detectors.py - Face detector backends for SmartCam
+#
+# Every backend has detect(frame, gray) -> [(x, y, w, h), ...] in frame
+# coordinates. Backend settings live in DETECTOR_CONFIG (config.py), keyed by
+# backend name; each camera picks a backend with "detector" in CAMERAS.
+import os
+import cv2
+
+HAAR_CASCADE = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+# Per-backend defaults; DETECTOR_CONFIG entries override these key by key
+DETECTOR_DEFAULTS = {
+    "haar": {"cascade": HAAR_CASCADE, "scale_factor": 1.2, "min_neighbors": 5, "threads": 0},
+    "dnn": {  # OpenCV res10 SSD (Caffe) or any single-output SSD cv2.dnn can read
+        "model": "models/res10_300x300_ssd_iter_140000.caffemodel",
+        "config": "models/deploy.prototxt",
+        "input_size": [300, 300],
+        "mean": [104.0, 177.0, 123.0],
+        "score_threshold": 0.6,
+        "threads": 0
+    },
+    "yunet": {  # cv2.FaceDetectorYN, OpenCV >= 4.5.4
+        "model": "models/face_detection_yunet_2023mar.onnx",
+        "input_size": [320, 320],       # frames are scaled to fit inside this
+        "score_threshold": 0.7,
+        "nms_threshold": 0.3,
+        "top_k": 50,
+        "threads": 0
+    }
+}
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = a; bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+def merge_boxes(boxes, overlap=0.5):
+    """Drop boxes that overlap a larger box already kept"""
+    kept = []
+    for box in sorted(boxes, key=lambda r: r[2] * r[3], reverse=True):
+        if all(iou(box, k) < overlap for k in kept):
+            kept.append(box)
+    return kept
+
+class FaceDetector:
+    """Base class: runs the backend with its own OpenCV thread count"""
+    name = "base"
+    
+    def __init__(self, min_size=80, threads=0):
+        self.min_size = min_size
+        self.threads = threads  # 0 = leave cv2.setNumThreads alone
+    
+    def detect(self, frame, gray=None):
+        """Return face boxes (x, y, w, h) in full-resolution frame coordinates"""
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if not self.threads:
+            return self._detect(frame, gray)
+        previous = cv2.getNumThreads()
+        cv2.setNumThreads(self.threads)
+        try:
+            return self._detect(frame, gray)
+        finally:
+            cv2.setNumThreads(previous)
+    
+    def _detect(self, frame, gray):
+        raise NotImplementedError
+    
+    def _keep(self, boxes, width, height):
+        """Clip boxes to the frame and drop the ones smaller than min_size"""
+        kept = []
+        for x, y, w, h in boxes:
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1, y1 = min(width, int(x + w)), min(height, int(y + h))
+            if x1 - x0 >= self.min_size and y1 - y0 >= self.min_size:
+                kept.append((x0, y0, x1 - x0, y1 - y0))
+        return kept
+
+def _require_file(path, backend):
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"{backend} detector model not found: {path!r} - set it in DETECTOR_CONFIG")
+
+class HaarDetector(FaceDetector):
+    """Haar cascade face detector with an optional coarse-to-fine mode.
+
+    Coarse-to-fine scans a downscaled copy of the frame, sized so the smallest
+    face we care about (min_size) maps onto the cascade's native window, then
+    re-runs the cascade at full resolution only in a small region around each hit.
+    """
+    name = "haar"
+    
+    def __init__(self, cascade=HAAR_CASCADE, scale_factor=1.2, min_neighbors=5, min_size=80,
+                 pyramid=False, coarse_scale=None, refine=True, refine_margin=0.3, threads=0):
+        super().__init__(min_size, threads)
+        self.cascade = cv2.CascadeClassifier(cascade)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.pyramid = pyramid
+        self.refine = refine
+        self.refine_margin = refine_margin
+        try:
+            self.window = tuple(int(v) for v in self.cascade.getOriginalWindowSize())
+        except (AttributeError, cv2.error):
+            self.window = (24, 24)
+        # "auto": the minimum face becomes exactly one native window in the coarse image
+        self.coarse_scale = coarse_scale or max(self.window) / float(min_size)
+        if not 0 < self.coarse_scale <= 1:
+            raise ValueError(f"coarse_scale must be in (0, 1], got {self.coarse_scale}")
+
+    def _detect(self, frame, gray):
+        if self.pyramid:
+            return self.detect_coarse_to_fine(gray)
+        return self.detect_full(gray)
+
+    def detect_full(self, gray):
+        faces = self.cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors,
+                                              minSize=(self.min_size, self.min_size))
+        return [tuple(int(v) for v in f) for f in faces]
+
+    def detect_coarse_to_fine(self, gray):
+        s = self.coarse_scale
+        small = cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+        hits = self.cascade.detectMultiScale(small, self.scale_factor, self.min_neighbors, minSize=self.window)
+        H, W = gray.shape[:2]
+        faces = []
+        for (x, y, w, h) in hits:
+            # Map the coarse hit back to full resolution
+            x, y, w, h = int(x / s), int(y / s), int(w / s), int(h / s)
+            if not self.refine:
+                faces.append((x, y, w, h))
+                continue
+            m = int(max(w, h) * self.refine_margin)
+            x0, y0 = max(0, x - m), max(0, y - m)
+            x1, y1 = min(W, x + w + m), min(H, y + h + m)
+            if x1 - x0 < self.min_size or y1 - y0 < self.min_size:
+                continue
+            refined = self.cascade.detectMultiScale(gray[y0:y1, x0:x1], self.scale_factor, self.min_neighbors,
+                                                    minSize=(self.min_size, self.min_size))
+            if len(refined):
+                rx, ry, rw, rh = max(refined, key=lambda r: r[2] * r[3])
+                faces.append((int(rx) + x0, int(ry) + y0, int(rw), int(rh)))
+        return merge_boxes(faces)
+
+class DnnDetector(FaceDetector):
+    """SSD face detector through cv2.dnn on the CPU"""
+    name = "dnn"
+    
+    def __init__(self, model, config=None, input_size=(300, 300), mean=(104.0, 177.0, 123.0),
+                 score_threshold=0.6, min_size=80, threads=0):
+        super().__init__(min_size, threads)
+        _require_file(model, self.name)
+        self.net = cv2.dnn.readNet(model, config or "")
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.input_size = tuple(int(v) for v in input_size)
+        self.mean = tuple(mean)
+        self.score_threshold = score_threshold
+    
+    def _detect(self, frame, gray):
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, self.input_size, self.mean, swapRB=False, crop=False)
+        self.net.setInput(blob)
+        out = self.net.forward()  # (1, 1, N, 7): image_id, label, score, x0, y0, x1, y1 (relative)
+        boxes = []
+        for det in out.reshape(-1, 7):
+            if det[2] < self.score_threshold:
+                continue
+            x0, y0, x1, y1 = det[3] * w, det[4] * h, det[5] * w, det[6] * h
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return self._keep(boxes, w, h)
+
+class YuNetDetector(FaceDetector):
+    """cv2.FaceDetectorYN (YuNet) on the CPU; frames are scaled to fit input_size"""
+    name = "yunet"
+    
+    def __init__(self, model, input_size=(320, 320), score_threshold=0.7, nms_threshold=0.3, top_k=50,
+                 min_size=80, threads=0):
+        super().__init__(min_size, threads)
+        _require_file(model, self.name)
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise RuntimeError("cv2.FaceDetectorYN needs OpenCV 4.5.4 or newer")
+        self.input_size = tuple(int(v) for v in input_size)
+        self.net = cv2.FaceDetectorYN.create(model, "", self.input_size, score_threshold, nms_threshold, top_k)
+        self.current_size = self.input_size
+    
+    def _detect(self, frame, gray):
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.input_size[0] / w, self.input_size[1] / h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        image = frame if scale == 1.0 else cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if size != self.current_size:
+            self.net.setInputSize(size)
+            self.current_size = size
+        _, faces = self.net.detect(image)
+        if faces is None:
+            return []
+        return self._keep([tuple(f[:4] / scale) for f in faces], w, h)
+
+BACKENDS = {"haar": HaarDetector, "dnn": DnnDetector, "yunet": YuNetDetector}
+
+def backend_settings(backend, detector_config=None):
+    """DETECTOR_DEFAULTS for a backend overlaid with its DETECTOR_CONFIG entry"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend {backend!r} - choose from {', '.join(BACKENDS)}")
+    return {**DETECTOR_DEFAULTS[backend], **(detector_config or {}).get(backend, {})}
+
+def create_detector(camera, detector_config=None):
+    """Build the face detector configured for a camera (see CAMERA_DEFAULTS)"""
+    backend = camera["detector"]
+    settings = backend_settings(backend, detector_config)
+    if backend == "haar":
+        return HaarDetector(min_size=camera["min_face"], pyramid=camera["detect_mode"] == "pyramid",
+                            coarse_scale=camera["detect_scale"], **settings)
+    return BACKENDS[backend](min_size=camera["min_face"], **settings)
@@ -1,18 +1,117 @@
 # enroll.py
-import cv2, os, time, sys
-name = sys.argv[1] if len(sys.argv)>1 else "you"
-cap = cv2.VideoCapture(0)
-face = cv2.CascadeClassifier(cv2.data.haarcascades+'haarcascade_frontalface_default.xml')
-os.makedirs(f"data/known/{name}", exist_ok=True)
-count=0
-while count<30:
-    ok,frame=cap.read();  gray=cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
-    faces=face.detectMultiScale(gray,1.2,5,minSize=(80,80))
-    for (x,y,w,h) in faces:
-        roi=cv2.resize(gray[y:y+h,x:x+w],(200,200))
-        cv2.imwrite(f"data/known/{name}/{int(time.time()*1000)}.png",roi)
-        count+=1; cv2.rectangle(frame,(x,y),(x+w,y+h),(0,255,0),2)
-    cv2.imshow("enroll",frame)
-    if cv2.waitKey(1)&0xFF==ord('q'):break
-cap.release(); cv2.destroyAllWindows()
-print("Saved",count,"images to",f"data/known/{name}")
+#   python enroll.py alice                     # 30 crops of one person from the webcam
+#   python enroll.py --bulk staff/             # staff/<name>/ holds videos and/or photos of each person
+#   python enroll.py --bulk staff/ --workers 8 --every 5
+import cv2, os, sys, time, glob, argparse
+import multiprocessing as mp
+
+CASCADE = cv2.data.haarcascades+'haarcascade_frontalface_default.xml'
+VIDEO_EXT = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+PHOTO_EXT = (".jpg", ".jpeg", ".png", ".bmp")
+PHOTO_BATCH = 32   # photos per pool job
+
+def crop(gray, faces):
+    """The same 200x200 grayscale crop SmartCam recognizes"""
+    x,y,w,h=faces
+    return cv2.resize(gray[y:y+h,x:x+w],(200,200))
+
+def enroll_live(name):
+    cap = cv2.VideoCapture(0)
+    face = cv2.CascadeClassifier(CASCADE)
+    os.makedirs(f"data/known/{name}", exist_ok=True)
+    count=0
+    while count<30:
+        ok,frame=cap.read();  gray=cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+        faces=face.detectMultiScale(gray,1.2,5,minSize=(80,80))
+        for (x,y,w,h) in faces:
+            cv2.imwrite(f"data/known/{name}/{int(time.time()*1000)}.png",crop(gray,(x,y,w,h)))
+            count+=1; cv2.rectangle(frame,(x,y),(x+w,y+h),(0,255,0),2)
+        cv2.imshow("enroll",frame)
+        if cv2.waitKey(1)&0xFF==ord('q'):break
+    cap.release(); cv2.destroyAllWindows()
+    print("Saved",count,"images to",f"data/known/{name}")
+
+# ----------------- bulk mode -----------------
+_face = None
+
+def _init_worker():
+    global _face
+    cv2.setNumThreads(1)  # scale with processes, not OpenCV's thread pool
+    _face = cv2.CascadeClassifier(CASCADE)
+
+def _save_largest(gray, out, stem):
+    """Write the largest face in the frame; returns 1 if one was found"""
+    faces=_face.detectMultiScale(gray,1.2,5,minSize=(80,80))
+    if len(faces)==0: return 0
+    cv2.imwrite(os.path.join(out, stem+".png"), crop(gray, max(faces,key=lambda r:r[2]*r[3])))
+    return 1
+
+def _enroll_job(job):
+    """One video or a batch of photos -> (name, frames read, crops written)"""
+    name, paths, every, out = job
+    os.makedirs(out, exist_ok=True)
+    frames=crops=0
+    for path in paths:
+        stem=os.path.basename(path).replace(".","_")  # keep the extension: alice.jpg and alice.png may share a folder
+        if path.lower().endswith(VIDEO_EXT):
+            cap=cv2.VideoCapture(path); i=0
+            while True:
+                if i%every:
+                    ok=cap.grab()  # skip without decoding
+                else:
+                    ok,frame=cap.read()
+                    if ok:
+                        frames+=1
+                        crops+=_save_largest(cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY), out, f"{stem}_{i:06d}")
+                if not ok: break
+                i+=1
+            cap.release()
+        else:
+            gray=cv2.imread(path,0)
+            if gray is None: continue
+            frames+=1
+            crops+=_save_largest(gray, out, stem)
+    return name, frames, crops
+
+def bulk_jobs(root, every, known="data/known"):
+    """One job per video and per PHOTO_BATCH photos, for every person folder under root"""
+    jobs=[]
+    for name in sorted(os.listdir(root)):
+        folder=os.path.join(root,name)
+        if not os.path.isdir(folder): continue
+        files=sorted(glob.glob(os.path.join(folder,"*")))
+        out=os.path.join(known,name)
+        photos=[f for f in files if f.lower().endswith(PHOTO_EXT)]
+        jobs+=[(name,[f],every,out) for f in files if f.lower().endswith(VIDEO_EXT)]
+        jobs+=[(name,photos[k:k+PHOTO_BATCH],every,out) for k in range(0,len(photos),PHOTO_BATCH)]
+    return jobs
+
+def enroll_bulk(root, workers, every):
+    jobs=bulk_jobs(root, every)
+    if not jobs: sys.exit(f"No videos or photos found in {root}/<name>/")
+    people={}
+    frames=crops=0
+    t0=time.time()
+    # Largest jobs (videos) first, so one long video doesn't finish last on its own
+    jobs.sort(key=lambda j: not j[1][0].lower().endswith(VIDEO_EXT))
+    with mp.Pool(workers, initializer=_init_worker) as pool:
+        for done,(name,f,c) in enumerate(pool.imap_unordered(_enroll_job, jobs),1):
+            frames+=f; crops+=c; people[name]=people.get(name,0)+c
+            elapsed=time.time()-t0
+            print(f"\r[{done}/{len(jobs)} jobs] {frames} frames, {crops} crops, {frames/elapsed:.0f} frames/s",end="",flush=True)
+    elapsed=time.time()-t0
+    print(f"\nEnrolled {len(people)} people: {crops} crops from {frames} frames in {elapsed:.1f}s "
+          f"({frames/elapsed:.0f} frames/s, {crops/elapsed:.0f} crops/s, {workers} workers)")
+    for name in sorted(people):
+        print(f"  {name}: {people[name]} crops" + ("  (no faces found!)" if not people[name] else ""))
+    print("Run train.py (with --prototypes to keep the gallery small) to use them")
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description="Enroll faces into data/known/<name>/")
+    parser.add_argument("name",nargs="?",default="you",help="person to enroll from the webcam")
+    parser.add_argument("--bulk",metavar="DIR",help="enroll everyone in DIR/<name>/ (videos and photos) instead")
+    parser.add_argument("--workers",type=int,default=os.cpu_count(),help="bulk worker processes")
+    parser.add_argument("--every",type=int,default=5,help="bulk: use every Nth video frame")
+    args=parser.parse_args()
+    if args.bulk: enroll_bulk(args.bulk, args.workers, max(1,args.every))
+    else: enroll_live(args.name)
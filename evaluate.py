@@ -0,0 +1,337 @@
+# evaluate.py - Offline evaluation of the LBPH face recognizer
+#
+# Runs stratified k-fold cross-validation over data/known and measures how
+# predict() latency grows with the gallery size. In every fold one identity is
+# left out of training entirely and its held-out images act as strangers, so
+# the confidence threshold can be judged on both sides: known people accepted
+# vs unknown people let through.
+#
+#   python evaluate.py                          # 5 folds, report in reports/
+#   python evaluate.py --folds 3 --sizes 100,200,400,800,1600 --threshold 70
+import os, glob, json, time, random, argparse, statistics
+from datetime import datetime
+import numpy as np
+import cv2
+from gallery import compact
+
+FACE_SIZE = (200, 200)   # crops are stored at this size by enroll.py
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def load_dataset(root="data/known"):
+    """{person: [grayscale 200x200 crops]} for every person folder with images"""
+    dataset = {}
+    for person in sorted(os.listdir(root)):
+        folder = os.path.join(root, person)
+        if not os.path.isdir(folder):
+            continue
+        images = []
+        for fn in sorted(glob.glob(os.path.join(folder, "*.png")) + glob.glob(os.path.join(folder, "*.jpg"))):
+            img = cv2.imread(fn, 0)
+            if img is None:
+                continue
+            if img.shape != FACE_SIZE[::-1]:
+                img = cv2.resize(img, FACE_SIZE)
+            images.append(img)
+        if images:
+            dataset[person] = images
+    return dataset
+
+def train(images, ids):
+    rec = cv2.face.LBPHFaceRecognizer_create()
+    rec.train(images, np.array(ids))
+    return rec
+
+def assign_folds(dataset, k, seed=0):
+    """Stratified folds: each person's images are shuffled and dealt round-robin"""
+    rng = random.Random(seed)
+    folds = {}
+    for person, images in dataset.items():
+        order = list(range(len(images)))
+        rng.shuffle(order)
+        folds[person] = {i: pos % k for pos, i in enumerate(order)}
+    return folds
+
+def cross_validate(dataset, k=5, seed=0, prototypes=None):
+    """Trials [{"person", "predicted", "confidence", "enrolled", "fold", "ms"}, ...] from k-fold evaluation
+
+    With prototypes=K each fold's training set is compacted to K medoids per person first.
+    """
+    people = sorted(dataset)
+    folds = assign_folds(dataset, k, seed)
+    trials = []
+    for fold in range(k):
+        # One person per fold is not enrolled - their test images are impostor trials
+        stranger = people[fold % len(people)] if len(people) > 1 else None
+        train_images, train_ids = [], []
+        for pid, person in enumerate(people):
+            if person == stranger:
+                continue
+            for i, img in enumerate(dataset[person]):
+                if folds[person][i] != fold:
+                    train_images.append(img); train_ids.append(pid)
+        if not train_images:
+            continue
+        if prototypes:
+            keep = compact(train_images, train_ids, prototypes, seed)
+            train_images = [train_images[i] for i in keep]; train_ids = [train_ids[i] for i in keep]
+        rec = train(train_images, train_ids)
+        for pid, person in enumerate(people):
+            for i, img in enumerate(dataset[person]):
+                if folds[person][i] != fold:
+                    continue
+                t0 = time.perf_counter()
+                pred, conf = rec.predict(img)
+                ms = (time.perf_counter() - t0) * 1000
+                trials.append({"person": person, "predicted": people[pred], "confidence": float(conf),
+                               "enrolled": person != stranger, "fold": fold, "ms": ms})
+    return trials
+
+def threshold_curve(trials, step=1.0):
+    """Rates at each threshold (a face is accepted when confidence < threshold)"""
+    genuine = [t for t in trials if t["enrolled"]]
+    impostor = [t for t in trials if not t["enrolled"]]
+    top = max([t["confidence"] for t in trials] + [1.0])
+    curve = []
+    threshold = 0.0
+    while threshold <= top + step:
+        accepted = [t for t in genuine if t["confidence"] < threshold]
+        correct = sum(1 for t in accepted if t["predicted"] == t["person"])
+        false_accepts = sum(1 for t in impostor if t["confidence"] < threshold)
+        curve.append({
+            "threshold": round(threshold, 2),
+            "identification_rate": correct / len(genuine) if genuine else 0.0,   # known and named correctly
+            "misidentification_rate": (len(accepted) - correct) / len(genuine) if genuine else 0.0,
+            "false_accept_rate": false_accepts / len(impostor) if impostor else 0.0,  # stranger accepted as someone
+        })
+        threshold += step
+    return curve
+
+def rate_at(curve, threshold):
+    return min(curve, key=lambda c: abs(c["threshold"] - threshold))
+
+def recommend_threshold(curve, max_far=0.01):
+    """Highest identification rate whose false accept rate stays within max_far"""
+    ok = [c for c in curve if c["false_accept_rate"] <= max_far and c["identification_rate"] > 0]
+    return max(ok, key=lambda c: (c["identification_rate"], -c["threshold"])) if ok else None
+
+def rank1(trials):
+    genuine = [t for t in trials if t["enrolled"]]
+    return sum(1 for t in genuine if t["predicted"] == t["person"]) / len(genuine) if genuine else 0.0
+
+def compare_compaction(dataset, k, prototypes, threshold, seed=0):
+    """Accuracy and predict latency of the full gallery vs K medoids per person, on the same folds"""
+    full = cross_validate(dataset, k, seed)
+    small = cross_validate(dataset, k, seed, prototypes)
+    result = {"prototypes": prototypes}
+    for name, trials in (("full", full), ("compact", small)):
+        at = rate_at(threshold_curve(trials), threshold)
+        result[name] = {"rank1_accuracy": rank1(trials), "identification_rate": at["identification_rate"],
+                        "false_accept_rate": at["false_accept_rate"],
+                        "predict_ms": statistics.mean(t["ms"] for t in trials)}
+    result["speedup"] = result["full"]["predict_ms"] / result["compact"]["predict_ms"] if result["compact"]["predict_ms"] else 0.0
+    result["accuracy_change"] = result["compact"]["identification_rate"] - result["full"]["identification_rate"]
+    return result
+
+def per_identity(trials, threshold):
+    rows = {}
+    for t in trials:
+        if not t["enrolled"]:
+            continue
+        r = rows.setdefault(t["person"], {"trials": 0, "rank1": 0, "accepted_correct": 0, "confidences": []})
+        r["trials"] += 1
+        r["confidences"].append(t["confidence"])
+        if t["predicted"] == t["person"]:
+            r["rank1"] += 1
+            if t["confidence"] < threshold:
+                r["accepted_correct"] += 1
+    return {person: {"trials": r["trials"],
+                     "rank1_accuracy": r["rank1"] / r["trials"],
+                     "accuracy_at_threshold": r["accepted_correct"] / r["trials"],
+                     "median_confidence": statistics.median(r["confidences"])}
+            for person, r in sorted(rows.items())}
+
+def gallery_latency(dataset, sizes, probes=50, repeats=3, seed=0):
+    """predict() latency for galleries of increasing size (images reused round-robin beyond the dataset)"""
+    rng = random.Random(seed)
+    pool = [(pid, img) for pid, person in enumerate(sorted(dataset)) for img in dataset[person]]
+    rng.shuffle(pool)
+    probe_images = [img for _, img in pool[:probes]]
+    results = []
+    for size in sizes:
+        gallery = [pool[i % len(pool)] for i in range(size)]
+        rec = train([img for _, img in gallery], [pid for pid, _ in gallery])
+        rec.predict(probe_images[0])  # warm-up
+        times = []
+        for _ in range(repeats):
+            for img in probe_images:
+                t0 = time.perf_counter()
+                rec.predict(img)
+                times.append((time.perf_counter() - t0) * 1000)
+        results.append({"gallery_size": size, "mean_ms": statistics.mean(times), "p95_ms": percentile(times, 95)})
+    if len(results) > 1:
+        # Least-squares slope: how much each extra enrolled image costs per predict
+        xs = [r["gallery_size"] for r in results]; ys = [r["mean_ms"] for r in results]
+        mx, my = statistics.mean(xs), statistics.mean(ys)
+        slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / (sum((x - mx) ** 2 for x in xs) or 1)
+        for r in results:
+            r["ms_per_100_images"] = slope * 100
+    return results
+
+# ----------------- report -----------------
+def svg_plot(series, xlabel, ylabel, width=520, height=300):
+    """Minimal inline SVG line chart; series = [(name, color, [(x, y), ...]), ...]"""
+    pad = 45
+    xs = [x for _, _, pts in series for x, _ in pts] or [0, 1]
+    ys = [y for _, _, pts in series for _, y in pts] or [0, 1]
+    x0, x1 = min(xs), max(xs) or 1
+    y0, y1 = min(0, min(ys)), max(ys) or 1
+    sx = lambda x: pad + (x - x0) / ((x1 - x0) or 1) * (width - 2 * pad)
+    sy = lambda y: height - pad - (y - y0) / ((y1 - y0) or 1) * (height - 2 * pad)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-size="11">',
+             f'<rect x="{pad}" y="{pad}" width="{width - 2 * pad}" height="{height - 2 * pad}" fill="none" stroke="#999"/>',
+             f'<text x="{width / 2}" y="{height - 8}" text-anchor="middle">{xlabel}</text>',
+             f'<text x="12" y="{height / 2}" transform="rotate(-90 12 {height / 2})" text-anchor="middle">{ylabel}</text>',
+             f'<text x="{pad}" y="{height - pad + 14}" text-anchor="middle">{x0:g}</text>',
+             f'<text x="{width - pad}" y="{height - pad + 14}" text-anchor="middle">{x1:.3g}</text>',
+             f'<text x="{pad - 4}" y="{height - pad}" text-anchor="end">{y0:g}</text>',
+             f'<text x="{pad - 4}" y="{pad + 4}" text-anchor="end">{y1:.3g}</text>']
+    for i, (name, color, pts) in enumerate(series):
+        path = " ".join(f"{sx(x):.1f},{sy(y):.1f}" for x, y in pts)
+        parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{path}"/>')
+        parts.append(f'<text x="{pad + 8}" y="{pad + 14 + 14 * i}" fill="{color}">{name}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+def write_html(report, path):
+    curve = report["threshold_curve"]
+    roc = svg_plot([("ROC", "#1f77b4", [(c["false_accept_rate"], c["identification_rate"]) for c in curve])],
+                   "false accept rate (strangers)", "identification rate (known)")
+    rates = svg_plot([("identification", "#2ca02c", [(c["threshold"], c["identification_rate"]) for c in curve]),
+                      ("false accept", "#d62728", [(c["threshold"], c["false_accept_rate"]) for c in curve]),
+                      ("misidentification", "#ff7f0e", [(c["threshold"], c["misidentification_rate"]) for c in curve])],
+                     "confidence threshold", "rate")
+    latency = svg_plot([("mean ms", "#9467bd", [(r["gallery_size"], r["mean_ms"]) for r in report["gallery_latency"]])],
+                       "gallery size (images)", "predict ms")
+    rows = "".join(f"<tr><td>{p}</td><td>{r['trials']}</td><td>{r['rank1_accuracy']:.1%}</td>"
+                   f"<td>{r['accuracy_at_threshold']:.1%}</td><td>{r['median_confidence']:.1f}</td></tr>"
+                   for p, r in report["per_identity"].items())
+    compaction = ""
+    if report.get("compaction"):
+        c = report["compaction"]
+        compaction = (f"<h2>Gallery compaction ({c['prototypes']} prototypes per person)</h2>"
+                      f"<table><tr><th></th><th>rank-1</th><th>identification</th><th>false accept</th><th>predict ms</th></tr>"
+                      + "".join(f"<tr><td>{name}</td><td>{c[name]['rank1_accuracy']:.1%}</td><td>{c[name]['identification_rate']:.1%}</td>"
+                                f"<td>{c[name]['false_accept_rate']:.1%}</td><td>{c[name]['predict_ms']:.2f}</td></tr>"
+                                for name in ("full", "compact"))
+                      + f"</table><p>Speedup {c['speedup']:.1f}x, identification change {c['accuracy_change']:+.1%}</p>")
+    lat_rows = "".join(f"<tr><td>{r['gallery_size']}</td><td>{r['mean_ms']:.2f}</td><td>{r['p95_ms']:.2f}</td></tr>"
+                       for r in report["gallery_latency"])
+    s = report["summary"]
+    rec = s["recommended"]
+    recommended = (f"{rec['threshold']:g} (identification {rec['identification_rate']:.1%}, "
+                   f"false accept {rec['false_accept_rate']:.1%})" if rec else "none meets the false accept target")
+    html = f"""<html><head><meta charset="utf-8"><title>SmartCam recognizer evaluation</title>
+<style>body{{font-family:sans-serif;margin:24px}} table{{border-collapse:collapse}} td,th{{border:1px solid #ccc;padding:4px 8px}}</style>
+</head><body>
+<h1>Recognizer evaluation</h1>
+<p>{report['generated']} - {s['identities']} identities, {s['images']} images, {s['folds']} folds, {s['trials']} trials</p>
+<p>At threshold {s['threshold']:g}: identification {s['at_threshold']['identification_rate']:.1%},
+false accept {s['at_threshold']['false_accept_rate']:.1%}, misidentification {s['at_threshold']['misidentification_rate']:.1%}</p>
+<p>Recommended threshold (false accept &le; {s['max_far']:.0%}): {recommended}</p>
+<h2>ROC</h2>{roc}
+<h2>Rates by threshold</h2>{rates}
+<h2>Per identity</h2>
+<table><tr><th>identity</th><th>trials</th><th>rank-1</th><th>accepted &amp; correct</th><th>median confidence</th></tr>{rows}</table>
+<h2>Predict latency vs gallery size</h2>{latency}
+<table><tr><th>gallery</th><th>mean ms</th><th>p95 ms</th></tr>{lat_rows}</table>
+{compaction}
+</body></html>"""
+    with open(path, "w") as f:
+        f.write(html)
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the LBPH recognizer on data/known")
+    parser.add_argument("--data", default="data/known", help="one folder of face crops per person")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=70, help="confidence threshold in use (CAMERAS confidence_threshold)")
+    parser.add_argument("--max-far", type=float, default=0.01, help="false accept target for the recommended threshold")
+    parser.add_argument("--sizes", default="50,100,200,400,800", help="gallery sizes for the latency sweep")
+    parser.add_argument("--probes", type=int, default=50, help="probe images per latency measurement")
+    parser.add_argument("--prototypes", type=int, default=0, help="also compare against a gallery compacted to K medoids per person")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="reports", help="directory for the JSON and HTML report")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.data)
+    if not dataset:
+        raise SystemExit(f"No face images found in {args.data}")
+    n_images = sum(len(v) for v in dataset.values())
+    folds = max(2, min(args.folds, min(len(v) for v in dataset.values())))
+    if folds != args.folds:
+        print(f"Using {folds} folds - the smallest identity has only {min(len(v) for v in dataset.values())} images")
+    if len(dataset) < 2:
+        print("Only one identity - no stranger trials, false accept rate can't be measured")
+
+    print(f"Evaluating {len(dataset)} identities, {n_images} images, {folds} folds...")
+    trials = cross_validate(dataset, folds, args.seed)
+    curve = threshold_curve(trials)
+    current = rate_at(curve, args.threshold)
+    recommended = recommend_threshold(curve, args.max_far)
+    identities = per_identity(trials, args.threshold)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    print(f"Measuring predict latency for gallery sizes {sizes}...")
+    latency = gallery_latency(dataset, sizes, args.probes, seed=args.seed)
+
+    compaction = None
+    if args.prototypes:
+        print(f"Comparing with a gallery of {args.prototypes} prototypes per person...")
+        compaction = compare_compaction(dataset, folds, args.prototypes, args.threshold, args.seed)
+
+    report = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "summary": {"identities": len(dataset), "images": n_images, "folds": folds, "trials": len(trials),
+                    "threshold": args.threshold, "at_threshold": current, "max_far": args.max_far,
+                    "recommended": recommended},
+        "per_identity": identities,
+        "threshold_curve": curve,
+        "gallery_latency": latency,
+        "compaction": compaction,
+        "trials": trials,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    json_path = os.path.join(args.out, f"recognizer_eval_{stamp}.json")
+    html_path = os.path.join(args.out, f"recognizer_eval_{stamp}.html")
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=2)
+    write_html(report, html_path)
+
+    print("\n=== RECOGNIZER EVALUATION ===")
+    print(f"At threshold {args.threshold:g}: identification {current['identification_rate']:.1%}, "
+          f"false accept {current['false_accept_rate']:.1%}, misidentification {current['misidentification_rate']:.1%}")
+    if recommended:
+        print(f"Recommended threshold (false accept <= {args.max_far:.0%}): {recommended['threshold']:g} "
+              f"-> identification {recommended['identification_rate']:.1%}")
+    print("\nPer identity (rank-1 / at threshold):")
+    for person, r in identities.items():
+        print(f"  {person}: {r['rank1_accuracy']:.1%} / {r['accuracy_at_threshold']:.1%} over {r['trials']} trials")
+    print("\nPredict latency:")
+    for r in latency:
+        print(f"  {r['gallery_size']:>6} images: {r['mean_ms']:.2f} ms mean, {r['p95_ms']:.2f} ms p95")
+    if latency and "ms_per_100_images" in latency[0]:
+        print(f"  ~{latency[0]['ms_per_100_images']:.3f} ms per 100 extra images")
+    if compaction:
+        full, small = compaction["full"], compaction["compact"]
+        print(f"\nCompacted to {args.prototypes} per person: predict {full['predict_ms']:.2f} -> {small['predict_ms']:.2f} ms "
+              f"({compaction['speedup']:.1f}x), identification {full['identification_rate']:.1%} -> {small['identification_rate']:.1%}, "
+              f"rank-1 {full['rank1_accuracy']:.1%} -> {small['rank1_accuracy']:.1%}")
+    print(f"\nReport: {html_path}\nData:   {json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# frame_ring.py - Zero-copy shared-memory frame ring between processes
+#
+# One capture process publishes BGR frames into a fixed set of slots in a
+# multiprocessing.shared_memory block; analysis processes map the same block
+# and read frames through NumPy views, so no frame is ever pickled.
+#
+# Ownership is explicit and kept in a small shared header:
+#   writer:  slot = ring.claim()        -> slot is the writer's until published
+#            ring.frame(slot)[:] = img  (or cap.read(image=ring.frame(slot)))
+#            ring.publish(slot)         -> gets the next sequence number
+#   reader:  lease = ring.acquire(after_seq)  -> (slot, seq, stamp) or None
+#            frame = ring.frame(lease[0])     -> read-only view, valid until release
+#            ring.release(lease[0])
+# The writer never claims a slot while a reader holds it, or the newest
+# published slot, so a leased view cannot change under the reader.
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+HEADER_ALIGN = 64
+
+def _attach(name):
+    """Attach to an existing block without letting a resource tracker unlink it under the owner"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    # Forked and spawned children talk to their parent's tracker, which already holds
+    # the block - unregistering there would make the owner's unlink() fail. Only a
+    # tracker this process starts for itself has to forget the block again.
+    own_tracker = getattr(resource_tracker._resource_tracker, "_fd", None) is None
+    shm = shared_memory.SharedMemory(name=name)
+    if own_tracker:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+class FrameRing:
+    def __init__(self, shape, slots=4, name=None, lock=None, create=True):
+        if slots < 2:
+            raise ValueError("FrameRing needs at least 2 slots")
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.frame_bytes = int(np.prod(self.shape))
+        # header: [latest_seq, latest_slot, next_seq, seq[slots], readers[slots]] + stamps[slots]
+        ints = 3 + 2 * slots
+        header_bytes = ints * 8 + slots * 8
+        self.data_offset = -(-header_bytes // HEADER_ALIGN) * HEADER_ALIGN
+        size = self.data_offset + slots * self.frame_bytes
+
+        self.owner = create
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size) if create else _attach(name)
+        self.name = self.shm.name
+        self.lock = lock if lock is not None else mp.Lock()
+
+        self._ints = np.ndarray((ints,), dtype=np.int64, buffer=self.shm.buf)
+        self._stamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf, offset=ints * 8)
+        self._seq = self._ints[3:3 + slots]
+        self._readers = self._ints[3 + slots:]
+        self._frames = [np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                                   offset=self.data_offset + i * self.frame_bytes) for i in range(slots)]
+        self._cursor = 0
+        if create:
+            self._ints[:] = 0
+            self._ints[0] = -1   # nothing published yet
+            self._ints[1] = -1
+            self._stamps[:] = 0
+
+    def handle(self):
+        """Arguments for FrameRing.attach() in another process (pass at Process creation)"""
+        return {"name": self.name, "shape": self.shape, "slots": self.slots, "lock": self.lock}
+
+    @classmethod
+    def attach(cls, name, shape, slots, lock):
+        return cls(shape, slots, name=name, lock=lock, create=False)
+
+    def frame(self, slot):
+        """NumPy view of a slot - no copy"""
+        return self._frames[slot]
+
+    # ----------------- writer side -----------------
+    def claim(self):
+        """Reserve a free slot for writing; returns None if every slot is leased (frame dropped)"""
+        with self.lock:
+            latest = self._ints[1]
+            for step in range(self.slots):
+                slot = (self._cursor + step) % self.slots
+                if slot != latest and self._readers[slot] == 0:
+                    self._seq[slot] = -1   # writing - not readable
+                    self._cursor = (slot + 1) % self.slots
+                    return slot
+        return None
+
+    def publish(self, slot, stamp=None):
+        """Make a claimed slot the newest frame and return its sequence number"""
+        with self.lock:
+            seq = int(self._ints[2])
+            self._ints[2] = seq + 1
+            self._seq[slot] = seq
+            self._stamps[slot] = time.time() if stamp is None else stamp
+            self._ints[0] = seq
+            self._ints[1] = slot
+        return seq
+
+    def write(self, image, stamp=None):
+        """Copy an image into a free slot and publish it (the one copy into shared memory)"""
+        slot = self.claim()
+        if slot is None:
+            return None
+        np.copyto(self._frames[slot], image)
+        return self.publish(slot, stamp)
+
+    # ----------------- reader side -----------------
+    def acquire(self, after_seq=-1):
+        """Lease the newest frame if it is newer than after_seq; returns (slot, seq, stamp) or None"""
+        with self.lock:
+            slot = int(self._ints[1])
+            seq = int(self._ints[0])
+            if slot < 0 or seq <= after_seq:
+                return None
+            self._readers[slot] += 1
+            return slot, seq, float(self._stamps[slot])
+
+    def release(self, slot):
+        with self.lock:
+            self._readers[slot] -= 1
+
+    @property
+    def latest_seq(self):
+        return int(self._ints[0])
+
+    def close(self):
+        # Drop our views first or SharedMemory.close() refuses to unmap
+        self._frames = []
+        self._ints = self._stamps = self._seq = self._readers = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
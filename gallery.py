@@ -0,0 +1,75 @@
+# gallery.py - Keep the LBPH gallery small
+#
+# LBPH predict() compares the probe against every training histogram, so its
+# cost grows with every enrolled crop. compact() keeps at most K medoid images
+# per person: each person's LBP histograms are clustered with k-medoids under
+# the chi-square distance LBPH itself uses, and the image at the centre of each
+# cluster is kept. The recognizer is then trained on those images only, so
+# the model file and SmartCam.py don't change.
+import numpy as np
+import cv2
+
+def lbp_histograms(images, ids):
+    """One LBPH histogram per image (same radius/grid settings SmartCam loads)"""
+    rec = cv2.face.LBPHFaceRecognizer_create()
+    rec.train(images, np.array(ids))
+    return np.array([h.ravel() for h in rec.getHistograms()], dtype=np.float32)
+
+def chi_square_matrix(hists):
+    """Pairwise chi-square distances, computed a row at a time to keep memory at n x bins"""
+    n = len(hists)
+    dist = np.zeros((n, n), dtype=np.float32)
+    for i in range(n):
+        a = hists[i]
+        dist[i] = ((hists - a) ** 2 / (hists + a + 1e-10)).sum(axis=1)
+    return dist
+
+def k_medoids(dist, k, iterations=20, seed=0):
+    """Indices of k medoids for a precomputed distance matrix (k-medoids++ start, then alternate)"""
+    n = len(dist)
+    if n <= k:
+        return list(range(n))
+    rng = np.random.default_rng(seed)
+    medoids = [int(np.argmin(dist.sum(axis=1)))]
+    while len(medoids) < k:
+        nearest = dist[:, medoids].min(axis=1)
+        weights = nearest ** 2
+        total = weights.sum()
+        pick = int(rng.choice(n, p=weights / total)) if total > 0 else int(rng.choice(n))
+        if pick in medoids:
+            break  # only duplicates left
+        medoids.append(pick)
+    for _ in range(iterations):
+        assign = np.argmin(dist[:, medoids], axis=1)
+        updated = []
+        for c in range(len(medoids)):
+            members = np.flatnonzero(assign == c)
+            if len(members) == 0:
+                updated.append(medoids[c])
+                continue
+            within = dist[np.ix_(members, members)].sum(axis=1)
+            updated.append(int(members[np.argmin(within)]))
+        if updated == medoids:
+            break
+        medoids = updated
+    return sorted(set(medoids))
+
+def compact(images, ids, k, seed=0, recognizer=None):
+    """Indices of the images to keep: at most k medoids per identity
+
+    Pass the recognizer already trained on images/ids to reuse its histograms.
+    """
+    if recognizer is not None:
+        hists = np.array([h.ravel() for h in recognizer.getHistograms()], dtype=np.float32)
+    else:
+        hists = lbp_histograms(images, ids)
+    ids = np.asarray(ids)
+    keep = []
+    for person in np.unique(ids):
+        members = np.flatnonzero(ids == person)
+        if len(members) <= k:
+            keep.extend(int(i) for i in members)
+            continue
+        medoids = k_medoids(chi_square_matrix(hists[members]), k, seed=seed)
+        keep.extend(int(members[m]) for m in medoids)
+    return sorted(keep)
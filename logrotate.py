@@ -0,0 +1,134 @@
+# logrotate.py - Compression and retention for the logs directory
+#
+# DataLogger starts a new CSV every day and whenever the current one passes
+# max_bytes. LogRotator runs in a background thread. It compresses CSV and
+# session files that are no longer written (gzip, or zstd when the zstandard
+# package is installed and chosen). Then it deletes the oldest files until the
+# directory fits the retention budget. open_log() reads plain and compressed
+# files alike as text streams, so nothing is ever decompressed to disk.
+# DataLogger runs a second LogRotator on snapshots/ with retention only.
+import os, io, re, gzip, glob, time, shutil, threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LOG_DEFAULTS = {
+    "max_bytes": 50 * 1024 * 1024,   # start a new CSV part once the current one is this large
+    "compression": "gzip",           # "gzip", "zstd" (needs the zstandard package) or None
+    "compress_after": 300,           # seconds a closed file must be untouched before compressing
+    "retention_days": 90,            # delete log files older than this (0 = keep)
+    "retention_bytes": 2 * 1024 ** 3,  # keep the logs directory under this size (0 = no limit)
+    "interval": 60,                  # seconds between maintenance passes
+    "session_events": 1000,          # newest events of each kind kept in the session JSON (0 = all; the CSV has every one)
+    "snapshot_retention_days": 30,   # delete snapshots/ images older than this (0 = keep)
+    "snapshot_retention_bytes": 1024 ** 3  # keep snapshots/ under this size (0 = no limit)
+}
+
+LOG_PATTERN = re.compile(r"^(smartcam_log_.*\.csv|session_.*\.json)(\.gz|\.zst)?$")
+SNAPSHOT_PATTERN = re.compile(r"^.*\.jpg$")
+
+def open_log(path):
+    """Text stream over a plain, .gz or .zst log file"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed - pip install zstandard to read it")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True), newline="")
+    return open(path, "r", newline="")
+
+def log_files(log_dir, prefix, ext):
+    """Paths of prefix*ext log files in log_dir, compressed or not, oldest name first"""
+    paths = []
+    for suffix in ("", ".gz", ".zst"):
+        paths.extend(glob.glob(os.path.join(log_dir, f"{prefix}*{ext}{suffix}")))
+    return sorted(paths)
+
+def compress_file(path, method="gzip"):
+    """Compress path next to itself, keep its mtime and remove the original; returns the new path"""
+    if method == "zstd" and zstandard is None:
+        method = "gzip"
+    target = path + (".zst" if method == "zstd" else ".gz")
+    tmp = target + ".tmp"
+    with open(path, "rb") as src, open(tmp, "wb") as raw:
+        if method == "zstd":
+            with zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        else:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+    stat = os.stat(path)
+    os.utime(tmp, (stat.st_atime, stat.st_mtime))
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+class LogRotator:
+    def __init__(self, log_dir="logs", active=None, compression="gzip", compress_after=300,
+                 retention_days=90, retention_bytes=2 * 1024 ** 3, interval=60, pattern=LOG_PATTERN):
+        self.log_dir = log_dir
+        self.pattern = pattern   # file names this rotator manages; anything else in log_dir is left alone
+        self.active = active or (lambda: ())   # callable -> paths still being written
+        self.compression = compression
+        self.compress_after = compress_after
+        self.retention_days = retention_days
+        self.retention_bytes = retention_bytes
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.compressed = 0
+        self.deleted = 0
+        self.bytes_saved = 0
+        if compression == "zstd" and zstandard is None:
+            print("⚠️  zstandard not installed - compressing logs with gzip")
+            self.compression = "gzip"
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="log-rotator", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except OSError as e:
+                print(f"Log rotation failed: {e}")
+            self.stop_event.wait(self.interval)
+
+    def run_once(self, now=None):
+        """One maintenance pass: compress closed files, then enforce retention"""
+        now = time.time() if now is None else now
+        active = {os.path.abspath(p) for p in self.active()}
+        files = [os.path.join(self.log_dir, f) for f in os.listdir(self.log_dir) if self.pattern.match(f)]
+
+        if self.compression:
+            for path in files:
+                if path.endswith((".gz", ".zst")) or os.path.abspath(path) in active:
+                    continue
+                if now - os.path.getmtime(path) < self.compress_after:
+                    continue  # may belong to another running process
+                before = os.path.getsize(path)
+                target = compress_file(path, self.compression)
+                self.compressed += 1
+                self.bytes_saved += before - os.path.getsize(target)
+            files = [os.path.join(self.log_dir, f) for f in os.listdir(self.log_dir) if self.pattern.match(f)]
+
+        # Oldest first; active files are never deleted
+        entries = sorted((os.path.getmtime(p), os.path.getsize(p), p) for p in files if os.path.abspath(p) not in active)
+        total = sum(os.path.getsize(p) for p in files)
+        for mtime, size, path in entries:
+            too_old = self.retention_days and now - mtime > self.retention_days * 86400
+            too_big = self.retention_bytes and total > self.retention_bytes
+            if not (too_old or too_big):
+                continue
+            os.remove(path)
+            total -= size
+            self.deleted += 1
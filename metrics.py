@@ -0,0 +1,203 @@
+# metrics.py - Live pipeline metrics in Prometheus text format
+#
+# Counters, gauges and fixed-bucket histograms. Updates are O(1) (a bucket
+# lookup over a short fixed list) so they can sit on the per-frame path.
+#
+#   from metrics import REGISTRY
+#   frames = REGISTRY.counter("smartcam_frames_total", "Frames captured")
+#   frames.inc()
+#   with REGISTRY.histogram("smartcam_stage_seconds", "Stage latency", stage="detect").time(): ...
+#
+# MetricsServer serves GET /metrics on a local port for Prometheus to scrape.
+import time, bisect, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Seconds - per-frame stages sit in the low buckets, network calls in the high ones
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def state(self):
+        return self.value
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.t0)
+        return False
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager that observes the elapsed wall time"""
+        return _Timer(self)
+
+    def state(self):
+        with self.lock:
+            return {"buckets": self.buckets, "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families = {}   # name -> (kind, help, {labels: metric})
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = self.families[name] = (cls.kind, help, {})
+            elif family[0] != cls.kind:
+                raise ValueError(f"metric {name} already registered as a {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = cls(**kwargs)
+            return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help="", **labels):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def reset(self):
+        """Forget every metric (forked camera processes start from zero)"""
+        # A fresh lock, never the inherited one: a thread of the parent (metrics server,
+        # notifier, log rotator) may have held it at fork time, and it would never be released
+        self.lock = threading.Lock()
+        self.families = {}
+
+    def snapshot(self):
+        """Plain-data copy of every metric, small enough to send between processes"""
+        with self.lock:
+            families = list(self.families.items())
+        return [(name, kind, help, [(labels, metric.state()) for labels, metric in list(children.items())])
+                for name, (kind, help, children) in families]
+
+    def render(self, remote=()):
+        """Prometheus text exposition of this registry plus (extra_labels, snapshot) pairs from other processes"""
+        return render_snapshots([({}, self.snapshot())] + list(remote))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def render_snapshots(sources):
+    merged = {}   # name -> (kind, help, [(labels, state)])
+    for extra, snapshot in sources:
+        for name, kind, help, samples in snapshot:
+            entry = merged.setdefault(name, (kind, help, []))
+            entry[2].extend((tuple(sorted({**dict(labels), **extra}.items())), state) for labels, state in samples)
+
+    lines = []
+    for name, (kind, help, samples) in sorted(merged.items()):
+        if help:
+            lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, state in samples:
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(state)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(state["buckets"]) + [float("inf")], state["counts"]):
+                cumulative += count
+                le = labels + (("le", _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {state['count']}")
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """Serves GET /metrics from a registry (plus optional remote snapshots) on a local port"""
+    def __init__(self, registry=None, host="127.0.0.1", port=9100, remote=None):
+        self.registry = registry or REGISTRY
+        self.host = host
+        self.port = port
+        self.remote = remote   # callable returning [(extra_labels, snapshot), ...]
+        self.httpd = None
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = server.registry.render(server.remote() if server.remote else ()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,114 @@
+# model_watch.py - Pick up a retrained recognizer without restarting
+#
+# ModelWatcher polls models/lbph.yml in a background thread. When the file
+# changes (new mtime, size or inode), it loads the model and its label names on
+# that thread and checks that they belong together. It then hands them over
+# with take(). CameraPipeline (and the recognition server) call take()
+# between frames and swap both in one assignment, so no frame ever sees a new
+# model with old labels. A model that fails validation is rejected and the
+# current one stays in use.
+#
+# train.py stores the label names inside lbph.yml (LBPH label info) and
+# renames the finished file into place, so model and names are published in
+# one step and can never be picked up as a mismatched pair. labels.txt is
+# only read for models trained before that.
+import os, time, threading
+import numpy as np
+import cv2
+from metrics import REGISTRY
+from tracing import TRACER
+
+def model_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def load_model(model_path, labels_path):
+    """Read and validate a model and its label names; raises ValueError when they don't fit together"""
+    rec = cv2.face.LBPHFaceRecognizer_create()
+    try:
+        rec.read(model_path)
+    except cv2.error as e:
+        raise ValueError(f"cannot read {model_path}: {e}")
+    ids = rec.getLabels().ravel() if rec.getLabels() is not None else np.array([])
+    if not len(rec.getHistograms()) or not len(ids):
+        raise ValueError(f"{model_path} has no training histograms")
+    labels = [rec.getLabelInfo(i) for i in range(int(ids.max()) + 1)]
+    if not any(labels):  # trained before names were stored in the model
+        with open(labels_path) as f:
+            labels = f.read().splitlines()
+    if not labels or ids.min() < 0 or ids.max() >= len(labels):
+        raise ValueError(f"{model_path} uses label ids up to {ids.max()} but {labels_path} lists {len(labels)} names")
+    rec.predict(np.zeros((200, 200), dtype=np.uint8))  # smoke test on a crop-sized input
+    return rec, labels
+
+class ModelWatcher:
+    def __init__(self, model_path="models/lbph.yml", labels_path="models/labels.txt", interval=2.0, name="local", signature=None):
+        self.model_path = model_path
+        self.labels_path = labels_path
+        self.interval = interval
+        # model_signature() of the model in use; default: the file as it is now
+        self.signature = model_signature(model_path) if signature is None else signature
+        self.pending = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.swaps = 0
+        self.load_seconds = REGISTRY.histogram("smartcam_model_load_seconds", "Time to load and validate a changed model", model=name)
+        self.loaded = REGISTRY.counter("smartcam_model_reloads_total", "Changed models seen by the watcher", model=name, result="loaded")
+        self.rejected = REGISTRY.counter("smartcam_model_reloads_total", "Changed models seen by the watcher", model=name, result="rejected")
+        self.swapped_at = REGISTRY.gauge("smartcam_model_swap_timestamp_seconds", "Unix time the recognizer was last swapped", model=name)
+        self.swap_delay = REGISTRY.gauge("smartcam_model_swap_delay_seconds", "From the model file changing to the swap taking effect", model=name)
+        self.labels_gauge = REGISTRY.gauge("smartcam_model_labels", "Identities in the recognizer in use", model=name)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="model-watch", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """Load the model if its file changed since the last check; returns True when one is ready"""
+        signature = model_signature(self.model_path)
+        if signature is None or signature == self.signature:
+            return False
+        self.signature = signature  # a broken file is reported once, not on every poll
+        t0 = time.perf_counter()
+        try:
+            rec, labels = load_model(self.model_path, self.labels_path)
+        except (OSError, ValueError) as e:
+            self.rejected.inc()
+            print(f"⚠️  New model rejected, keeping the current one: {e}")
+            return False
+        seconds = time.perf_counter() - t0
+        self.load_seconds.observe(seconds)
+        self.loaded.inc()
+        with self.lock:
+            self.pending = (rec, labels, signature[0] / 1e9, seconds)
+        return True
+
+    def take(self):
+        """(recognizer, labels) once after a new model was loaded, else None - call between frames"""
+        if self.pending is None:
+            return None
+        with self.lock:
+            rec, labels, changed, seconds = self.pending
+            self.pending = None
+        now = time.time()
+        self.swaps += 1
+        self.swapped_at.set(now)
+        self.swap_delay.set(max(0.0, now - changed))
+        self.labels_gauge.set(len(labels))
+        TRACER.instant("model_swap", cat="model", labels=len(labels), load_ms=round(seconds * 1000, 1))
+        print(f"🔄 Recognizer swapped: {len(labels)} labels, loaded in {seconds * 1000:.0f} ms")
+        return rec, labels
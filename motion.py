@@ -0,0 +1,136 @@
+# motion.py - Motion engines and the self-calibrating motion trigger
+#
+# Every engine has score(gray) -> fraction of the frame that changed (0..1),
+# so MotionTrigger and the per-camera motion_* settings work with any of them.
+# Each camera picks an engine with "motion_backend" in CAMERAS:
+#
+#   gate  running average (accumulateWeighted) with a fixed threshold - cheapest
+#   mog2  cv2.createBackgroundSubtractorMOG2 - per-pixel Gaussian mixture, ignores shadows
+#   knn   cv2.createBackgroundSubtractorKNN - per-pixel sample set, best with gradual light changes
+#
+# "motion_scale" downscales the gray frame before scoring (0.5 = a quarter of
+# the pixels) and "motion_learning_rate" sets how fast the background follows
+# the scene (None = backend default).
+import cv2
+
+# Per-backend defaults; a camera's motion_learning_rate overrides "learning_rate"
+MOTION_DEFAULTS = {
+    "gate": {"learning_rate": 0.02, "threshold": 25},
+    "mog2": {"learning_rate": -1, "history": 500, "var_threshold": 16, "shadows": True},   # -1 = 1/history
+    "knn": {"learning_rate": -1, "history": 500, "dist2_threshold": 400.0, "shadows": True}
+}
+
+class MotionEngine:
+    """Base class: downscales the gray frame and returns the changed fraction of it"""
+    name = "base"
+
+    def __init__(self, scale=1.0, learning_rate=None):
+        self.scale = scale
+        self.learning_rate = MOTION_DEFAULTS[self.name]["learning_rate"] if learning_rate is None else learning_rate
+
+    def mask(self, gray):
+        """Foreground mask at the engine's scale, None while the background is still being learned"""
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return self.foreground(gray)
+
+    def score(self, gray):
+        mask = self.mask(gray)
+        if mask is None:
+            return 0
+        return cv2.countNonZero(mask) / mask.size  # fraction of the frame that changed
+
+    def foreground(self, gray):
+        """Binary foreground mask (255 = moving) for a possibly downscaled gray frame, None while learning"""
+        raise NotImplementedError
+
+class Gate(MotionEngine):
+    """Running-average background with a fixed difference threshold"""
+    name = "gate"
+
+    def __init__(self, scale=1.0, learning_rate=None, threshold=25):
+        super().__init__(scale, learning_rate)
+        self.threshold = threshold
+        self.bg = None
+
+    def foreground(self, gray):
+        if self.bg is None:
+            self.bg = gray.astype("float")
+            return None
+        cv2.accumulateWeighted(gray, self.bg, self.learning_rate)
+        delta = cv2.absdiff(gray, cv2.convertScaleAbs(self.bg))
+        _, mask = cv2.threshold(delta, self.threshold, 255, cv2.THRESH_BINARY)
+        return mask
+
+class SubtractorEngine(MotionEngine):
+    """OpenCV background subtractor; shadow pixels (127) are not counted as motion"""
+    def __init__(self, subtractor, scale=1.0, learning_rate=None):
+        super().__init__(scale, learning_rate)
+        self.subtractor = subtractor
+        self.warmup = 10   # frames before the model is trusted - KNN reports everything as moving at first
+
+    def foreground(self, gray):
+        mask = self.subtractor.apply(gray, learningRate=self.learning_rate)
+        if self.warmup:
+            self.warmup -= 1
+            return None
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)
+        return mask
+
+class Mog2Gate(SubtractorEngine):
+    name = "mog2"
+
+    def __init__(self, scale=1.0, learning_rate=None, history=500, var_threshold=16, shadows=True):
+        super().__init__(cv2.createBackgroundSubtractorMOG2(history, var_threshold, shadows), scale, learning_rate)
+
+class KnnGate(SubtractorEngine):
+    name = "knn"
+
+    def __init__(self, scale=1.0, learning_rate=None, history=500, dist2_threshold=400.0, shadows=True):
+        super().__init__(cv2.createBackgroundSubtractorKNN(history, dist2_threshold, shadows), scale, learning_rate)
+
+BACKENDS = {"gate": Gate, "mog2": Mog2Gate, "knn": KnnGate}
+
+def create_motion(camera):
+    """Build the motion engine configured for a camera (see CAMERA_DEFAULTS)"""
+    backend = camera.get("motion_backend", "gate")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown motion backend {backend!r} - choose from {', '.join(BACKENDS)}")
+    settings = {**MOTION_DEFAULTS[backend]}
+    if camera.get("motion_learning_rate") is not None:
+        settings["learning_rate"] = camera["motion_learning_rate"]
+    return BACKENDS[backend](scale=camera.get("motion_scale", 1.0), **settings)
+
+class MotionTrigger:
+    """Motion trigger that calibrates itself from the scene's own noise level"""
+    def __init__(self, min_fraction=0.002, sigmas=4.0, release=0.6, adapt=0.01, warmup=30):
+        self.min_fraction = min_fraction
+        self.sigmas = sigmas
+        self.release = release
+        self.adapt = adapt
+        self.warmup = warmup
+        self.mean = 0.0
+        self.var = 0.0
+        self.samples = 0
+        self.active = False
+
+    @property
+    def threshold(self):
+        return max(self.min_fraction, self.mean + self.sigmas * self.var ** 0.5)
+
+    def update(self, score):
+        """Feed one motion score; returns True while motion is triggered"""
+        level = self.threshold
+        if self.active:
+            self.active = score >= level * self.release
+        else:
+            self.active = self.samples >= self.warmup and score > level
+
+        # Only quiet frames teach the noise model, so a person walking by doesn't raise the bar
+        if not self.active:
+            self.samples += 1
+            weight = max(self.adapt, 1.0 / self.samples)
+            delta = score - self.mean
+            self.mean += weight * delta
+            self.var = (1 - weight) * (self.var + weight * delta * delta)
+        return self.active
@@ -0,0 +1,365 @@
+# multicam.py - Run one SmartCam pipeline per camera in parallel processes
+#
+# Every camera listed in CAMERAS (config.py) gets its own process with its own
+# Gate, thresholds and location label. The supervisor process owns the single
+# DataLogger, NotificationManager and serial AlarmController; workers only send
+# small event dicts back over a queue, never frames.
+#
+# Camera processes are forked from a fork server (spawned on platforms without
+# one), never from the supervisor: its logger, notifier and metrics threads may
+# hold locks that a forked child would inherit locked. The fork server preloads
+# shared_model.py, so all cameras share one loaded model.
+#
+#   python multicam.py            # headless
+#   python multicam.py --show     # one preview window per camera
+#   python multicam.py --preview-port 8080   # MJPEG preview per camera on 8080, 8081, ...
+import os, time, queue, argparse
+import multiprocessing as mp
+import cv2, serial
+from SmartCam import (CAMERAS, DETECTOR_CONFIG, NOTIFICATION_CONFIG, ALARM_CONFIG, SPOOL_CONFIG, LOG_CONFIG, PORT, BAUD,
+                      CameraPipeline, DataLogger, NotificationManager, AlarmController, AlarmDecision, load_recognizer,
+                      camera_recognizer, draw_detection, save_snapshot)
+from preview import PreviewServer
+from metrics import REGISTRY, MetricsServer
+from detectors import create_detector
+from model_watch import ModelWatcher, model_signature
+from synthetic import PREFIX, open_source, parse_source
+
+RESTART_DELAY = 5       # seconds before restarting a crashed or lost camera; doubles while it keeps failing
+RESTART_MAX_DELAY = 300 # longest wait between restarts
+STABLE_AFTER = 60       # a camera that ran this long before failing starts again at RESTART_DELAY
+METRICS_INTERVAL = 5    # seconds between metric snapshots sent to the supervisor
+
+def finite_source(source):
+    """True for recordings that end (video files, synthetic scenes with frames=N); live cameras and streams don't"""
+    if not isinstance(source, str):
+        return False
+    if source.startswith(PREFIX):
+        return parse_source(source)[3]["frames"] > 0
+    return os.path.isfile(source)
+
+def _put(events, message, drop_ok=False, dropped=None):
+    """Send an event to the supervisor; per-frame events are dropped rather than stall capture"""
+    if drop_ok:
+        try:
+            events.put_nowait(message)
+        except queue.Full:
+            if dropped is not None:
+                dropped.inc()
+    else:
+        events.put(message)
+
+def camera_worker(index, camera, events, stop, show=False, preview_port=0, model_watch=0, shared=False):
+    """Capture and analyze one camera until its source ends or stop is set"""
+    cv2.setNumThreads(1)  # scale with processes, not OpenCV's thread pool
+    REGISTRY.reset()      # forked copy of the fork server's metrics
+    watcher = None
+    if camera["recognition_server"]:
+        rec, labels = camera_recognizer(camera)  # connects lazily, after the fork
+    else:
+        model = signature = None
+        if shared:
+            from shared_model import MODEL as model, SIGNATURE as signature  # preloaded by the fork server
+        rec, labels = model or load_recognizer()
+        if model_watch:
+            # A restarted worker still holds the fork server's model, so compare against that one
+            watcher = ModelWatcher(interval=model_watch, name=camera["location"], signature=signature if model else None).start()
+    pipeline = CameraPipeline(camera, create_detector(camera, DETECTOR_CONFIG), rec, labels, watcher)
+    cap = open_source(camera["source"])
+    if not cap.isOpened():
+        _put(events, ("error", index, {"message": f"cannot open source {camera['source']!r}"}))
+        return
+
+    decision = AlarmDecision(**ALARM_CONFIG)
+    frames = 0
+    ended = crashed = False   # ended: the source stopped delivering frames (end of a recording, or a lost camera)
+    started = last_metrics = time.time()
+    dropped = REGISTRY.counter("smartcam_events_dropped_total", "Per-frame events dropped because the supervisor queue was full",
+                               camera=pipeline.location)
+    window = f"SmartCam - {pipeline.location}"
+    preview = None
+    if preview_port:
+        preview = PreviewServer(port=preview_port + index, title=f"SmartCam - {pipeline.location}").start()
+        print(f"{pipeline.location} preview at {preview.url}")
+    try:
+        while not stop.is_set():
+            if time.time() - last_metrics >= METRICS_INTERVAL:
+                _put(events, ("metrics", index, REGISTRY.snapshot()), drop_ok=True)
+                last_metrics = time.time()
+            ok, frame = pipeline.read(cap)
+            if not ok:
+                ended = True
+                break
+            frames += 1
+            if frame is None:
+                # idle mode: grabbed only, but the alarm hold time still runs
+                if decision.update(False) == "OFF":
+                    _put(events, ("clear", index, {"motion": 0, "label": "none", "confidence": 0}))
+                continue
+            result = pipeline.analyze(frame)
+            event = {"motion": result["motion"], "label": result["label"], "confidence": result["confidence"]}
+
+            send_preview = preview is not None and preview.wants_frame()
+            if show or send_preview or result["label"] == "unknown":
+                draw_detection(frame, result)
+
+            if result["motion_event"]:
+                _put(events, ("motion", index, event), drop_ok=True, dropped=dropped)
+                if result["box"] is not None:
+                    if result["label"] == "unknown":
+                        event["snapshot"] = save_snapshot(frame, prefix=f"unknown_cam{index}")
+                        event["box"] = result["box"]
+                    _put(events, ("face", index, event))
+
+            change = decision.update(result["label"] == "unknown")
+            if change == "ON":
+                _put(events, ("alarm", index, event))
+            elif change == "OFF":
+                _put(events, ("clear", index, event))
+
+            if send_preview:
+                preview.publish(frame)
+            if show:
+                cv2.imshow(window, frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'): break
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        crashed = True
+        raise
+    finally:
+        cap.release()
+        if show: cv2.destroyWindow(window)
+        if preview is not None: preview.stop()
+        if watcher is not None: watcher.stop()
+        _put(events, ("metrics", index, REGISTRY.snapshot()))
+        _put(events, ("stopped", index, {"frames": frames, "seconds": time.time() - started, "ended": ended, "crashed": crashed,
+                                         "duty_cycle": pipeline.duty.report()}))
+
+class CameraSupervisor:
+    """Starts the camera processes and funnels their events into one logger, notifier and alarm"""
+    def __init__(self, cameras, logger, notifier, alarm, show=False, preview_port=0, model_watch=0):
+        # Never fork the supervisor itself: its threads' locks would be copied into the child held
+        self.shared = "forkserver" in mp.get_all_start_methods()
+        self.ctx = mp.get_context("forkserver" if self.shared else "spawn")
+        if self.shared:
+            self.ctx.set_forkserver_preload(["shared_model"])
+        self.cameras = cameras
+        self.logger = logger
+        self.notifier = notifier
+        self.alarm = alarm
+        self.show = show
+        self.preview_port = preview_port
+        self.model_watch = model_watch
+        self.events = self.ctx.Queue(maxsize=1000)
+        self.stop_event = self.ctx.Event()
+        self.workers = {}
+        self.finished = {}
+        self.restart_at = {}    # camera index -> time its failed process is started again
+        self.failures = {}      # camera index -> restarts in a row, for the backoff
+        self.started_at = {}    # camera index -> time its current process was started
+        self.totals = {}        # camera index -> frames and seconds over all its processes so far
+        self.active = set()     # cameras currently seeing an unknown person
+        self.on = False
+        self.camera_metrics = {}  # camera index -> latest metrics snapshot from its process
+        self.queue_depth = REGISTRY.gauge("smartcam_queue_depth", "Events waiting in the supervisor queue", queue="camera_events")
+        self.alarm_gauge = REGISTRY.gauge("smartcam_alarm_on", "1 while the Arduino alarm is on")
+
+    def start_worker(self, index):
+        proc = self.ctx.Process(target=camera_worker, name=f"camera-{index}",
+                                args=(index, self.cameras[index], self.events, self.stop_event, self.show, self.preview_port,
+                                      self.model_watch, self.shared),
+                                daemon=True)
+        proc.start()
+        self.workers[index] = proc
+        self.started_at[index] = time.time()
+
+    def start(self):
+        if not self.shared and not all(camera["recognition_server"] for camera in self.cameras):
+            print("⚠️  No fork server on this platform - every camera process loads its own copy of the model")
+        for index, camera in enumerate(self.cameras):
+            self.start_worker(index)
+            print(f"Started camera {index}: {camera['location']} (source {camera['source']!r})")
+
+    def run(self):
+        """Handle events until every camera has stopped"""
+        while len(self.finished) < len(self.cameras):
+            try:
+                self.queue_depth.set(self.events.qsize())
+            except NotImplementedError:
+                pass  # macOS has no sem_getvalue
+            self.check_workers()  # every pass: busy cameras must not keep a dead one from restarting
+            try:
+                kind, index, event = self.events.get(timeout=1)
+            except queue.Empty:
+                continue
+            self.handle(kind, index, event)
+
+    def check_workers(self):
+        """Schedule restarts for camera processes that died without reporting, and start them when due"""
+        now = time.time()
+        for index, proc in list(self.workers.items()):
+            if index in self.finished or self.stop_event.is_set():
+                continue
+            if index in self.restart_at:
+                if now >= self.restart_at[index]:
+                    del self.restart_at[index]
+                    self.start_worker(index)
+                continue
+            # exit code 0: the worker reported how it ended on the queue, handle() takes it from there
+            if proc.is_alive() or proc.exitcode == 0:
+                continue
+            self.schedule_restart(index, f"process exited with code {proc.exitcode}")
+
+    def schedule_restart(self, index, reason):
+        """Restart a failed camera after a delay that doubles while it keeps failing soon after starting"""
+        if index in self.restart_at:
+            return
+        if time.time() - self.started_at.get(index, 0) >= STABLE_AFTER:
+            self.failures[index] = 0
+        delay = min(RESTART_DELAY * 2 ** self.failures.get(index, 0), RESTART_MAX_DELAY)
+        self.failures[index] = self.failures.get(index, 0) + 1
+        print(f"Camera {index} ({self.cameras[index]['location']}): {reason} - restarting in {delay}s")
+        self.restart_at[index] = time.time() + delay
+        self.clear(index, 0)  # a dead camera sees nobody; don't leave the alarm on for it
+
+    def add_totals(self, index, event):
+        """Frames and seconds of this camera's processes so far, restarts included"""
+        totals = self.totals.setdefault(index, {"frames": 0, "seconds": 0})
+        totals["frames"] += event["frames"]
+        totals["seconds"] += event["seconds"]
+        return {**event, **totals}
+
+    def live(self, index):
+        """A live camera that stops delivering frames is restarted; a recording that ran out is done"""
+        return not finite_source(self.cameras[index]["source"])
+
+    def remote_metrics(self):
+        """Snapshots from the camera processes for MetricsServer"""
+        return [({}, snapshot) for snapshot in list(self.camera_metrics.values())]
+
+    def handle(self, kind, index, event):
+        location = self.cameras[index]["location"]
+        if kind == "metrics":
+            self.camera_metrics[index] = event
+        elif kind == "motion":
+            self.logger.log_event("motion", motion_score=event["motion"], alarm_state=self.on, camera=location)
+        elif kind == "face":
+            self.logger.log_event("face_detection", label=event["label"], confidence=event["confidence"],
+                                  motion_score=event["motion"], alarm_state=self.on, camera=location)
+            if event["label"] == "unknown":
+                self.notifier.notify_unknown_person(event["confidence"], event.get("snapshot"), location, event.get("box"))
+        elif kind == "alarm":
+            self.active.add(index)
+            if not self.on:
+                self.alarm.alarm(True); self.on = True
+                self.alarm_gauge.set(1)
+                self.logger.log_event("alarm", label="ON", motion_score=event["motion"], alarm_state=True, camera=location)
+                self.notifier.notify_alarm_state("ON", f"Unknown person detected by {location}")
+        elif kind == "clear":
+            self.clear(index, event["motion"])
+        elif kind == "error":
+            if not self.stop_event.is_set() and self.live(index):
+                self.schedule_restart(index, event["message"])
+            else:
+                print(f"Camera {index} ({location}): {event['message']}")
+                self.finished[index] = self.add_totals(index, {"frames": 0, "seconds": 0})
+        elif kind == "stopped":
+            self.logger.count_frame(event["frames"])
+            if "duty_cycle" in event:
+                self.logger.session_data.setdefault("duty_cycle", {})[location] = event["duty_cycle"]
+            if index in self.restart_at:
+                self.add_totals(index, event)   # crashed, restart already scheduled
+            elif not self.stop_event.is_set() and (event.get("crashed") or event.get("ended") and self.live(index)):
+                self.add_totals(index, event)
+                self.schedule_restart(index, "camera loop failed" if event.get("crashed") else "source stopped delivering frames")
+            else:
+                self.finished[index] = self.add_totals(index, event)
+                self.active.discard(index)
+
+    def clear(self, index, motion):
+        """Camera index no longer sees an unknown person; the alarm goes off once no camera does"""
+        self.active.discard(index)
+        if self.on and not self.active:
+            self.alarm.alarm(False); self.on = False
+            self.alarm_gauge.set(0)
+            self.logger.log_event("alarm", label="OFF", motion_score=motion, alarm_state=False, camera=self.cameras[index]["location"])
+            self.notifier.notify_alarm_state("OFF", "No unknown persons detected")
+
+    def stop(self):
+        self.stop_event.set()
+        for index in list(self.restart_at):   # waiting to restart: nothing left to hear from
+            del self.restart_at[index]
+            self.finished[index] = self.add_totals(index, {"frames": 0, "seconds": 0})
+        deadline = time.time() + 5
+        while len(self.finished) < len(self.workers) and time.time() < deadline:
+            try:
+                kind, index, event = self.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if kind in ("stopped", "error", "metrics"):
+                self.handle(kind, index, event)
+        for proc in self.workers.values():
+            proc.join(timeout=1)
+            if proc.is_alive(): proc.terminate()
+
+    def print_throughput(self):
+        print("\n=== CAMERA THROUGHPUT ===")
+        total = 0.0
+        for index, camera in enumerate(self.cameras):
+            info = self.finished.get(index, {"frames": 0, "seconds": 0})
+            fps = info["frames"] / info["seconds"] if info["seconds"] else 0.0
+            total += fps
+            print(f"{camera['location']}: {info['frames']} frames, {fps:.1f} fps")
+            duty = info.get("duty_cycle")
+            if duty:
+                print(f"  idle {duty['seconds']['idle']:.0f}s / active {duty['seconds']['active']:.0f}s, "
+                      f"CPU saved {duty['cpu_saved_seconds']:.1f}s ({duty['cpu_saved_percent']:.1f}%)")
+        print(f"Aggregate: {total:.1f} fps across {len(self.cameras)} cameras")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SmartCam on every camera in CAMERAS")
+    parser.add_argument("--show", action="store_true", help="open a preview window per camera")
+    parser.add_argument("--preview-port", type=int, default=0, help="first MJPEG preview port, one per camera (0 = off)")
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics for all cameras on this port (0 = off)")
+    parser.add_argument("--port", default=PORT, help="Arduino serial port")
+    parser.add_argument("--model-watch", type=float, default=2.0, metavar="SECONDS", help="check models/lbph.yml this often and swap in a retrained model (0 = off)")
+    args = parser.parse_args()
+
+    if not all(camera["recognition_server"] for camera in CAMERAS) and model_signature("models/lbph.yml") is None:
+        raise SystemExit("❌ models/lbph.yml not found - run train.py first")  # edge-only boxes don't need models/
+    logger = DataLogger(LOG_CONFIG)
+    notifier = NotificationManager(NOTIFICATION_CONFIG, SPOOL_CONFIG)
+
+    with serial.Serial(args.port, BAUD, timeout=1) as ser:
+        time.sleep(2)
+        alarm = AlarmController(ser)
+        alarm.arm(True)
+        supervisor = CameraSupervisor(CAMERAS, logger, notifier, alarm, show=args.show, preview_port=args.preview_port,
+                                      model_watch=args.model_watch)
+        metrics_server = None
+        if args.metrics_port:
+            metrics_server = MetricsServer(REGISTRY, port=args.metrics_port, remote=supervisor.remote_metrics).start()
+            print(f"Metrics at {metrics_server.url}")
+        supervisor.start()
+        print(f"SmartCam multi-camera started with {len(CAMERAS)} cameras - Ctrl+C to quit")
+        try:
+            supervisor.run()
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+        finally:
+            supervisor.stop()
+            if metrics_server is not None: metrics_server.stop()
+            if supervisor.on:
+                alarm.alarm(False)
+            alarm.arm(False)
+            notifier.close()
+            logger.save_session()
+            logger.close()
+            logger.print_stats()
+            supervisor.print_throughput()
+            print(f"Session data saved to: {logger.session_file}")
+            print(f"CSV log saved to: {logger.csv_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# notification_emulator.py - Local stand-ins for the notification services
+#
+# One HTTP server answers like the Discord webhook (204), a generic webhook
+# (200) and the Pushover API (200 + {"status": 1}); an SMTP sink accepts
+# mail without TLS or login. Both can add latency and fail a share of
+# requests (HTTP 500 / SMTP 451) so retries and drops can be exercised:
+#
+#   python notification_emulator.py --latency 0.2 --error-rate 0.05
+#   -> prints a NOTIFICATION_CONFIG pointing at the stand-ins
+#
+# notify_bench.py starts one itself and drives NotificationManager against it.
+import re, json, time, random, argparse, threading, socketserver
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SEQ_PATTERN = re.compile(rb"bench[ _+](\d+)", re.IGNORECASE)  # notify_bench.py tags each event's location
+
+class NotificationEmulator:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, host="127.0.0.1", seed=None):
+        self.latency = latency          # seconds before each reply
+        self.jitter = jitter            # plus up to this many seconds, uniformly random
+        self.error_rate = error_rate    # probability a request fails
+        self.host = host
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.deliveries = []            # (channel, event seq or None, perf_counter time, ok)
+        self.stats = {channel: {"requests": 0, "failed": 0, "bytes": 0} for channel in ("discord", "webhook", "pushover", "email")}
+        self.http = None
+        self.smtp = None
+
+    def _respond(self, channel, body):
+        """Wait out the configured latency, record the request and decide whether it fails"""
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            ok = self.random.random() >= self.error_rate
+        time.sleep(delay)
+        match = SEQ_PATTERN.search(body)
+        with self.lock:
+            stats = self.stats[channel]
+            stats["requests"] += 1
+            stats["bytes"] += len(body)
+            stats["failed"] += not ok
+            self.deliveries.append((channel, int(match.group(1)) if match else None, time.perf_counter(), ok))
+        return ok
+
+    def start(self):
+        emulator = self
+
+        class HttpHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                channel = self.path.strip("/").split("/")[0]
+                if channel not in ("discord", "webhook", "pushover"):
+                    return self._reply(404, b"")
+                if not emulator._respond(channel, body):
+                    return self._reply(500, b'{"error": "emulated failure"}')
+                if channel == "discord":
+                    return self._reply(204, b"")
+                if channel == "pushover":
+                    return self._reply(200, json.dumps({"status": 1, "request": "emulated"}).encode())
+                self._reply(200, b"ok")
+
+            def _reply(self, code, body):
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        class SmtpHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self._send("220 smartcam-emulator ESMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    verb = line[:4].upper()
+                    if verb == b"EHLO":
+                        self._send("250-smartcam-emulator\r\n250 8BITMIME")
+                    elif verb == b"DATA":
+                        self._send("354 End data with <CR><LF>.<CR><LF>")
+                        data = []
+                        for part in iter(self.rfile.readline, b""):
+                            if part in (b".\r\n", b".\n"):
+                                break
+                            data.append(part)
+                        ok = emulator._respond("email", b"".join(data))
+                        self._send("250 OK queued" if ok else "451 Emulated failure, try again later")
+                    elif verb == b"QUIT":
+                        self._send("221 Bye")
+                        return
+                    else:  # HELO, MAIL, RCPT, RSET, NOOP
+                        self._send("250 OK")
+
+            def _send(self, text):
+                self.wfile.write(text.encode() + b"\r\n")
+
+        class SmtpServer(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+            request_queue_size = 128
+
+        self.http = ThreadingHTTPServer((self.host, 0), HttpHandler)
+        self.http.daemon_threads = True
+        self.smtp = SmtpServer((self.host, 0), SmtpHandler)
+        for server in (self.http, self.smtp):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in (self.http, self.smtp):
+            if server:
+                server.shutdown()
+                server.server_close()
+
+    def config(self):
+        """NOTIFICATION_CONFIG with every channel pointed at the stand-ins"""
+        base = f"http://{self.host}:{self.http.server_address[1]}"
+        return {
+            "email": {"enabled": True, "smtp_server": self.host, "smtp_port": self.smtp.server_address[1], "use_tls": False,
+                      "sender_email": "smartcam@localhost", "sender_password": "", "recipient_email": "owner@localhost"},
+            "webhook": {"enabled": True, "url": f"{base}/webhook", "headers": {"Content-Type": "application/json"}},
+            "discord": {"enabled": True, "webhook_url": f"{base}/discord"},
+            "pushover": {"enabled": True, "user_key": "emulated", "api_token": "emulated", "api_url": f"{base}/pushover"}
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for Discord, webhook, Pushover and SMTP")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability a request fails")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    emu = NotificationEmulator(args.latency, args.jitter, args.error_rate, seed=args.seed).start()
+    print("Notification emulator running - use this in config.py:")
+    print("NOTIFICATION_CONFIG = " + json.dumps(emu.config(), indent=4).replace("true", "True").replace("false", "False"))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.stop()
+        print(json.dumps(emu.stats, indent=2))
+
+if __name__ == "__main__":
+    main()
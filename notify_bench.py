@@ -0,0 +1,165 @@
+# notify_bench.py - Alert throughput, latency and drops through NotificationManager
+#
+#   python notify_bench.py                                   # 10 alerts/s for 10 s, direct sends
+#   python notify_bench.py --rate 50 --latency 0.3 --error-rate 0.05
+#   python notify_bench.py --spool --spool-rate 20           # through the on-disk spool
+#   python notify_bench.py --channels discord,pushover
+#   python notify_bench.py --rate 50 --workers 16                # more sender threads
+#
+# Starts notification_emulator's stand-ins and raises unknown-person alerts
+# at a fixed rate. Each alert gets its own location ("Bench <n>"), so the
+# emulator can match every request to the alert it came from. Latency is
+# measured from the alert to the first successful delivery per channel. An
+# alert that never reaches a channel before the drain timeout counts as dropped.
+import os, time, shutil, tempfile, argparse, threading, statistics
+import numpy as np
+import cv2
+from SmartCam import NotificationManager, SPOOL_DEFAULTS
+from notification_emulator import NotificationEmulator
+
+CHANNELS = ("email", "discord", "webhook", "pushover")
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+def make_snapshot(path):
+    """A 1280x720 JPEG standing in for an incident snapshot"""
+    frame = np.random.default_rng(0).integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (31, 31), 0)
+    cv2.imwrite(path, frame)
+    return path
+
+class ThreadSampler:
+    """Samples the process thread count and the notification-thread gauge in the background"""
+    def __init__(self, manager, interval=0.02):
+        self.manager = manager
+        self.interval = interval
+        self.threads = []
+        self.sending = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.threads.append(threading.active_count())
+            self.sending.append(self.manager.threads_gauge.value)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+def drive(manager, rate, seconds, snapshot):
+    """Raise alerts at a fixed rate; returns {alert number: perf_counter time raised}"""
+    sent = {}
+    start = time.perf_counter()
+    for seq in range(int(rate * seconds)):
+        delay = start + seq / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sent[seq] = time.perf_counter()
+        manager.notify_unknown_person(60.0, snapshot, f"Bench {seq}", box=(540, 200, 200, 200))
+    return sent
+
+def drain(manager, emulator, sent, channels, timeout):
+    """Wait until every alert reached every channel, nothing is left to send, or timeout"""
+    expected = len(sent) * len(channels)
+    deadline = time.time() + timeout
+    time.sleep(0.5)  # let the last alert's thread start
+    while time.time() < deadline:
+        delivered = {(c, s) for c, s, _, ok in list(emulator.deliveries) if ok}
+        if len(delivered) >= expected:
+            return
+        idle = manager.outbox.unfinished_tasks == 0 and (manager.spool is None or not manager.spool.pending)
+        if idle:
+            return
+        time.sleep(0.1)
+
+def report(emulator, sent, channels, seconds, elapsed, sampler, manager):
+    print(f"\n=== NOTIFICATION LOAD ({len(sent)} alerts over {seconds:.0f}s at {len(sent) / seconds:.1f}/s, "
+          f"{'spool' if manager.spool else 'direct'}, done after {elapsed:.1f}s) ===")
+    rows = []
+    for channel in channels:
+        first, requests, failed = {}, 0, 0
+        for c, seq, t, ok in emulator.deliveries:
+            if c != channel or seq not in sent:
+                continue
+            requests += 1
+            failed += not ok
+            if ok and seq not in first:
+                first[seq] = t
+        ms = [(t - sent[seq]) * 1000 for seq, t in first.items()]
+        span = max(first.values()) - min(sent.values()) if first else 0
+        duplicates = requests - failed - len(first)
+        rows.append([channel, requests, failed, len(first), len(sent) - len(first), duplicates,
+                     f"{len(first) / span:.1f}" if span else "-", f"{percentile(ms, 50):.0f}", f"{percentile(ms, 95):.0f}",
+                     f"{percentile(ms, 99):.0f}", f"{max(ms):.0f}" if ms else "-"])
+    headers = ["channel", "requests", "failed", "delivered", "dropped", "dups", "per s", "p50 ms", "p95 ms", "p99 ms", "max ms"]
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+    if sampler.threads:
+        print(f"Threads: peak {max(sampler.threads)}, mean {statistics.mean(sampler.threads):.1f}; "
+              f"notification threads sending: peak {max(sampler.sending):.0f}, mean {statistics.mean(sampler.sending):.1f}")
+    if manager.dropped.value:
+        print(f"Dropped at the send queue (all {len(manager.workers)} sender threads busy): {manager.dropped.value:.0f}")
+    if manager.spool is not None:
+        print(f"Left in spool: {len(manager.spool.pending)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test NotificationManager against local stand-in services")
+    parser.add_argument("--rate", type=float, default=10, help="alerts per second")
+    parser.add_argument("--seconds", type=float, default=10, help="how long to raise alerts")
+    parser.add_argument("--channels", default=",".join(CHANNELS), help="comma-separated channels to enable")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in reply latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="extra random stand-in latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability a stand-in request fails")
+    parser.add_argument("--workers", type=int, default=4, help="NotificationManager sender threads")
+    parser.add_argument("--queue-size", type=int, default=100, help="alerts waiting for a sender before new ones are dropped")
+    parser.add_argument("--spool", action="store_true", help="deliver through a NotificationSpool in a temp directory")
+    parser.add_argument("--spool-rate", type=float, default=20, help="spool deliveries per second")
+    parser.add_argument("--spool-backoff", type=float, default=0.5, help="spool retry backoff in seconds")
+    parser.add_argument("--drain", type=float, default=30, help="seconds to wait for outstanding deliveries")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    channels = [c for c in args.channels.split(",") if c]
+    emulator = NotificationEmulator(args.latency, args.jitter, args.error_rate, seed=args.seed).start()
+    config = emulator.config()
+    for channel in CHANNELS:
+        config[channel]["enabled"] = channel in channels
+    workdir = tempfile.mkdtemp(prefix="notify_bench_")
+    spool_config = None
+    if args.spool:
+        spool_config = {**SPOOL_DEFAULTS, "enabled": True, "directory": os.path.join(workdir, "spool"), "rate": args.spool_rate,
+                        "backoff": args.spool_backoff, "max_backoff": args.spool_backoff * 8}
+    manager = NotificationManager(config, spool_config, args.workers, args.queue_size)
+    manager.notification_cooldown = 0
+    snapshot = make_snapshot(os.path.join(workdir, "snapshot.jpg"))
+    print(f"Stand-ins on {config['discord']['webhook_url'].rsplit('/', 1)[0]} (HTTP) and "
+          f"{config['email']['smtp_server']}:{config['email']['smtp_port']} (SMTP)")
+
+    sampler = ThreadSampler(manager).start()
+    try:
+        t0 = time.perf_counter()
+        sent = drive(manager, args.rate, args.seconds, snapshot)
+        drain(manager, emulator, sent, channels, args.drain)
+        elapsed = time.perf_counter() - t0
+    finally:
+        sampler.stop()
+        manager.close(timeout=0)
+        emulator.stop()
+    report(emulator, sent, channels, args.seconds, elapsed, sampler, manager)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# preview.py - On-demand MJPEG preview over local HTTP
+#
+# Replaces cv2.imshow on headless boxes. The camera loop asks wants_frame()
+# before drawing overlays; it is only True while a viewer is connected and the
+# preview frame-rate cap allows another frame. Each frame is resized and
+# JPEG-encoded once and the same bytes go to every connected viewer.
+#
+#   http://127.0.0.1:8080/          viewer page
+#   http://127.0.0.1:8080/stream    multipart MJPEG stream
+#   http://127.0.0.1:8080/snapshot.jpg
+import time, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import cv2
+
+BOUNDARY = "smartcamframe"
+
+class PreviewServer:
+    def __init__(self, host="127.0.0.1", port=8080, max_fps=5, max_width=640, quality=70, title="SmartCam"):
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.max_width = max_width
+        self.quality = quality
+        self.title = title
+        self.clients = 0
+        self.jpeg = None
+        self.seq = 0
+        self.last_publish = 0.0
+        self.frames_encoded = 0
+        self.cond = threading.Condition()
+        self.httpd = None
+        self.running = False
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass  # keep the console for SmartCam output
+
+            def do_GET(self):
+                if self.path in ("/", "/index.html"):
+                    body = (f"<html><head><title>{server.title}</title></head>"
+                            f"<body style='margin:0;background:#000'><img src='/stream' style='width:100%'></body></html>").encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif self.path == "/stream":
+                    server._stream(self)
+                elif self.path == "/snapshot.jpg":
+                    server._snapshot(self)
+                else:
+                    self.send_error(404)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.running = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        with self.cond:
+            self.cond.notify_all()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def wants_frame(self):
+        """True when someone is watching and the preview frame-rate cap allows a new frame"""
+        return self.clients > 0 and time.time() - self.last_publish >= self.interval
+
+    def publish(self, frame):
+        """Downscale and encode the frame once, then wake every viewer"""
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        with self.cond:
+            self.jpeg = buf.tobytes()
+            self.seq += 1
+            self.frames_encoded += 1
+            self.last_publish = time.time()
+            self.cond.notify_all()
+
+    def _stream(self, handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        with self.cond:
+            self.clients += 1
+            self.last_publish = 0.0  # new viewer gets a frame right away
+        seen = -1
+        try:
+            while self.running:
+                with self.cond:
+                    if self.seq == seen:
+                        self.cond.wait(timeout=5)
+                    if self.seq == seen or self.jpeg is None:
+                        continue
+                    jpeg, seen = self.jpeg, self.seq
+                handler.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                    f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            with self.cond:
+                self.clients -= 1
+
+    def _snapshot(self, handler):
+        with self.cond:
+            self.clients += 1
+            self.last_publish = 0.0
+            # Wait briefly for the camera loop to render a fresh frame
+            self.cond.wait(timeout=2)
+            jpeg = self.jpeg
+            self.clients -= 1
+        if jpeg is None:
+            handler.send_error(503, "No frame yet")
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "image/jpeg")
+        handler.send_header("Content-Length", str(len(jpeg)))
+        handler.end_headers()
+        handler.wfile.write(jpeg)
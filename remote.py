@@ -0,0 +1,309 @@
+# remote.py - Central face recognition server for low-power edge boxes
+#
+# In edge mode a camera runs only capture, the motion gate and face detection.
+# Each detected face goes to a central server as a 200x200 grayscale crop plus
+# a little metadata. The server owns the LBPH model. It batches crops from every
+# connected edge on one recognizer thread and replies with the label name and
+# distance. Messages are length-prefixed:
+#
+#   4-byte big-endian header length | JSON header | header["size"] payload bytes
+#
+#   python remote.py --listen 0.0.0.0:7070             # TCP
+#   python remote.py --listen unix:/tmp/smartcam.sock  # Unix socket, same box
+#
+# Edges point a camera at the server with "recognition_server" in CAMERAS.
+# Backpressure: the request queue is bounded. A connection whose request can't
+# be queued within busy_timeout gets a "busy" reply instead of a label. The edge
+# reconnects with exponential backoff. While the server is unreachable or
+# busy, faces are reported as unknown, so the alarm fails closed.
+import os, json, time, queue, socket, struct, argparse, threading, socketserver
+import numpy as np
+import cv2
+from metrics import REGISTRY, MetricsServer
+from model_watch import ModelWatcher, load_model
+
+CROP_SHAPE = (200, 200)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+def parse_address(address):
+    """'host:port' -> (AF_INET, (host, port)); 'unix:/path' -> (AF_UNIX, path)"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[5:]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+def send_message(sock, header, payload=b""):
+    head = json.dumps({**header, "size": len(payload)}).encode()
+    sock.sendall(struct.pack("!I", len(head)) + head + payload)
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            raise ConnectionError("connection closed")
+        got += k
+    return bytes(buf)
+
+def recv_message(sock):
+    """(header dict, payload bytes) of the next message"""
+    n, = struct.unpack("!I", _recv_exact(sock, 4))
+    header = json.loads(_recv_exact(sock, n))
+    return header, _recv_exact(sock, header.get("size", 0))
+
+class _Connection:
+    """Socket of one edge; replies come from the recognizer thread, so sends are locked"""
+    def __init__(self, sock, peer):
+        self.sock = sock
+        self.peer = peer
+        self.lock = threading.Lock()
+        self.alive = True
+
+    def reply(self, header):
+        if not self.alive:
+            return
+        try:
+            with self.lock:
+                send_message(self.sock, header)
+        except OSError:
+            self.alive = False
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog - many edges may reconnect at once
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+class RecognitionServer:
+    def __init__(self, address="127.0.0.1:7070", recognizer=None, labels=None, model="models/lbph.yml",
+                 labels_file="models/labels.txt", batch_size=16, max_wait=0.005, queue_size=64, busy_timeout=0.5, watcher=None):
+        if recognizer is None:
+            recognizer, labels = load_model(model, labels_file)
+        self.rec = recognizer
+        self.labels = labels
+        self.watcher = watcher   # ModelWatcher: retrained models are swapped in between batches
+        self.address = address
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.busy_timeout = busy_timeout
+        self.requests = queue.Queue(maxsize=queue_size)
+        self.server = None
+        self.running = False
+        self.live = set()
+        self.connections = REGISTRY.gauge("smartcam_remote_connections", "Connected edge sockets")
+        self.depth = REGISTRY.gauge("smartcam_remote_queue_depth", "Face crops waiting for the recognizer")
+        self.batches = REGISTRY.histogram("smartcam_remote_batch_size", "Crops recognized per batch", buckets=BATCH_BUCKETS)
+        self.latency = REGISTRY.histogram("smartcam_remote_server_seconds", "Time from receiving a crop to replying")
+        self.busy = REGISTRY.counter("smartcam_remote_busy_total", "Requests rejected because the queue stayed full")
+        self.recognized = REGISTRY.counter("smartcam_remote_recognized_total", "Crops recognized")
+
+    def start(self):
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._serve(self.request, self.client_address)
+
+        family, addr = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(addr):
+                os.remove(addr)  # stale socket from a previous run
+            self.server = _UnixServer(addr, Handler)
+        else:
+            self.server = _TCPServer(addr, Handler)
+        if family == socket.AF_INET:
+            self.address = f"{addr[0]}:{self.server.server_address[1]}"  # resolves port 0
+        self.running = True
+        threading.Thread(target=self.server.serve_forever, name="remote-accept", daemon=True).start()
+        threading.Thread(target=self._recognize, name="remote-recognizer", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            for conn in list(self.live):
+                try:
+                    conn.sock.shutdown(socket.SHUT_RDWR)  # edges notice right away instead of timing out
+                except OSError:
+                    pass
+            family, addr = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(addr):
+                os.remove(addr)
+
+    def _serve(self, sock, peer):
+        if sock.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = _Connection(sock, peer)
+        self.live.add(conn)
+        self.connections.inc()
+        try:
+            while self.running and conn.alive:
+                header, payload = recv_message(sock)
+                if len(payload) != CROP_SHAPE[0] * CROP_SHAPE[1]:
+                    conn.reply({"id": header.get("id"), "error": f"expected a {CROP_SHAPE[1]}x{CROP_SHAPE[0]} grayscale crop"})
+                    continue
+                crop = np.frombuffer(payload, dtype=np.uint8).reshape(CROP_SHAPE)
+                try:
+                    self.requests.put((conn, header, crop, time.perf_counter()), timeout=self.busy_timeout)
+                except queue.Full:
+                    self.busy.inc()
+                    conn.reply({"id": header.get("id"), "error": "busy"})
+                self.depth.set(self.requests.qsize())
+        except (ConnectionError, OSError, ValueError):
+            pass  # edge went away or sent garbage; it reconnects
+        finally:
+            conn.alive = False
+            self.live.discard(conn)
+            self.connections.dec()
+
+    def _recognize(self):
+        """Collect up to batch_size crops (waiting at most max_wait after the first), then answer them all"""
+        while self.running:
+            try:
+                batch = [self.requests.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            self.depth.set(self.requests.qsize())
+            self.batches.observe(len(batch))
+            if self.watcher is not None:
+                update = self.watcher.take()
+                if update is not None:
+                    self.rec, self.labels = update
+            for conn, header, crop, received in batch:
+                if not conn.alive:
+                    continue
+                pred, conf = self.rec.predict(crop)
+                label = self.labels[pred] if 0 <= pred < len(self.labels) else "unknown"
+                conn.reply({"id": header.get("id"), "label": label, "confidence": float(conf)})
+                self.latency.observe(time.perf_counter() - received)
+            self.recognized.inc(len(batch))
+
+UNAVAILABLE = -2   # label index RemoteRecognizer.predict returns when the server couldn't answer
+
+class RemoteRecognizer:
+    """Drop-in for the LBPH recognizer on an edge: predict(roi) asks the server
+
+    labels grows as the server reports names, so pass rec.labels to
+    CameraPipeline as its label list. When the server can't answer, predict
+    returns (UNAVAILABLE, 0.0): no verdict, which CameraPipeline skips.
+    """
+    def __init__(self, address, camera="", timeout=1.0, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.address = address
+        self.camera = camera
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.delay = reconnect_delay
+        self.retry_at = 0.0
+        self.sock = None
+        self.labels = []
+        self.next_id = 0
+        self.roundtrip = REGISTRY.histogram("smartcam_remote_roundtrip_seconds", "Edge-to-server recognition round trip", camera=camera)
+        self.failures = REGISTRY.counter("smartcam_remote_failures_total", "Faces left unrecognized because the server was down, busy or slow", camera=camera)
+
+    def _connect(self):
+        if time.time() < self.retry_at:
+            return None
+        family, addr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(addr)
+        except OSError as e:
+            sock.close()
+            self._backoff(f"cannot reach recognition server {self.address}: {e}")
+            return None
+        if family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.delay > self.reconnect_delay:
+            print(f"🔗 Reconnected to recognition server {self.address}")
+        self.delay = self.reconnect_delay
+        self.sock = sock
+        return sock
+
+    def _backoff(self, reason):
+        if self.delay == self.reconnect_delay:
+            print(f"⚠️  {reason} - faces are not recognized until it is back")
+        self.retry_at = time.time() + self.delay
+        self.delay = min(self.max_reconnect_delay, self.delay * 2)
+
+    def _label_index(self, name):
+        if name not in self.labels:
+            self.labels.append(name)
+        return self.labels.index(name)
+
+    def predict(self, roi):
+        """(label index, distance); -1 for a face the server doesn't know, UNAVAILABLE when it can't answer"""
+        sock = self.sock or self._connect()
+        if sock is None:
+            self.failures.inc()
+            return UNAVAILABLE, 0.0
+        self.next_id += 1
+        header = {"id": self.next_id, "camera": self.camera, "ts": time.time(), "shape": list(roi.shape)}
+        t0 = time.perf_counter()
+        try:
+            send_message(sock, header, np.ascontiguousarray(roi, dtype=np.uint8).tobytes())
+            reply, _ = recv_message(sock)
+            if reply.get("id") != self.next_id:
+                raise ValueError(f"reply {reply.get('id')} for request {self.next_id}")
+        except (OSError, ConnectionError, ValueError) as e:
+            sock.close()
+            self.sock = None
+            self._backoff(f"recognition server {self.address} lost: {e}")
+            self.failures.inc()
+            return UNAVAILABLE, 0.0
+        self.roundtrip.observe(time.perf_counter() - t0)
+        if "error" in reply:
+            self.failures.inc()
+            return UNAVAILABLE, 0.0
+        if reply["label"] == "unknown":
+            return -1, reply["confidence"]
+        return self._label_index(reply["label"]), reply["confidence"]
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartCam central face recognition server")
+    parser.add_argument("--listen", default="127.0.0.1:7070", help="host:port or unix:/path/to.sock")
+    parser.add_argument("--batch-size", type=int, default=16, help="most crops recognized per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="how long a batch waits to fill up")
+    parser.add_argument("--queue-size", type=int, default=64, help="crops queued before edges are told the server is busy")
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics on this local port (0 = off)")
+    parser.add_argument("--model-watch", type=float, default=2.0, metavar="SECONDS", help="check models/lbph.yml this often and swap in a retrained model (0 = off)")
+    args = parser.parse_args()
+
+    watcher = ModelWatcher(interval=args.model_watch, name="server").start() if args.model_watch else None
+    server = RecognitionServer(args.listen, batch_size=args.batch_size, max_wait=args.max_wait_ms / 1000,
+                               queue_size=args.queue_size, watcher=watcher).start()
+    print(f"🧠 Recognition server on {server.address} ({len(server.labels)} labels)")
+    if args.metrics_port:
+        print(f"Metrics at {MetricsServer(REGISTRY, port=args.metrics_port).start().url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if watcher is not None:
+            watcher.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# scale_bench.py - How many cameras and faces can this box keep up with?
+#
+#   python scale_bench.py                                   # 1, 2, 4, 8 cameras with 1 face each, 720p at 15 fps
+#   python scale_bench.py --cameras 1,2,4,8,12 --faces 1,4 --resolution 1920x1080 --fps 30
+#   python scale_bench.py --unknown 1 --seconds 30 --max-drop 1
+#
+# Every camera is a synthetic scene (synthetic.py) running in its own process
+# through CameraPipeline, like multicam.py, with the camera settings of
+# CAMERAS[0] in config.py. The scenes deliver frames in real time, so a
+# camera process that falls behind loses frames. For each face count the
+# camera count goes up until more than --max-drop percent of the frames are
+# dropped. The last step below that is what the box sustains. Notifications
+# and snapshots are not part of the loop (notify_bench.py measures those).
+import os, time, queue, argparse, statistics
+import multiprocessing as mp
+import numpy as np
+import cv2
+from SmartCam import CAMERAS, DETECTOR_CONFIG, CameraPipeline, load_recognizer
+from detectors import create_detector, iou
+from metrics import REGISTRY
+from synthetic import SyntheticCapture, load_people, drawn_face
+
+WARMUP = 5.0   # seconds for the motion triggers to calibrate on the empty scene before counting
+
+# Loaded once in main(); forked camera processes inherit it (spawn platforms load their own)
+_model = None
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+def scale_model(known="data/known"):
+    """The trained model, or a throwaway one on data/known (or drawn faces) when models/ is empty"""
+    if os.path.exists("models/lbph.yml"):
+        return load_recognizer()
+    people = load_people(known) or [(f"person{i}", [drawn_face(np.random.default_rng(100 + i))]) for i in range(3)]
+    print(f"⚠️  No models/lbph.yml - training a throwaway model on {len(people)} people for the benchmark")
+    rec = cv2.face.LBPHFaceRecognizer_create()
+    rec.train([c for _, crops in people for c in crops], np.array([i for i, (_, crops) in enumerate(people) for _ in crops]))
+    return rec, [name for name, _ in people]
+
+def _expected(truth, box):
+    """Name of the synthetic face the detected box is on, None for a false detection"""
+    best = max(truth, key=lambda t: iou(t[1], box), default=None)
+    return best[0] if best is not None and iou(best[1], box) >= 0.3 else None
+
+def _camera(index, camera, seconds, results):
+    """One camera process: report its stats, or the error that stopped it"""
+    try:
+        results.put((index, _measure(camera, seconds)))
+    except Exception as e:
+        results.put((index, {"error": f"{type(e).__name__}: {e}"}))
+
+def _measure(camera, seconds):
+    """Warm up, then count frames, drops and recognitions for seconds"""
+    cv2.setNumThreads(1)  # scale with processes, not OpenCV's thread pool
+    REGISTRY.reset()
+    rec, labels = _model or scale_model()
+    pipeline = CameraPipeline(camera, create_detector(camera, DETECTOR_CONFIG), rec, labels)
+    cap = SyntheticCapture(camera["source"])
+    stats = {"frames": 0, "dropped": 0, "analyzed": 0, "faces": 0, "correct": 0, "false": 0, "ms": []}
+    t0 = time.perf_counter()
+    cpu0, delivered0, dropped0 = time.process_time(), 0, 0
+    counting = False
+    while True:
+        now = time.perf_counter()
+        if not counting and now - t0 >= WARMUP:
+            counting, t0, cpu0 = True, now, time.process_time()
+            delivered0, dropped0 = cap.delivered, cap.dropped
+        if counting and now - t0 >= seconds:
+            break
+        ok, frame = pipeline.read(cap)
+        if not ok: break
+        if frame is None: continue
+        t = time.perf_counter()
+        result = pipeline.analyze(frame)
+        if not counting: continue
+        stats["analyzed"] += 1
+        stats["ms"].append((time.perf_counter() - t) * 1000)
+        if result["box"] is not None:
+            expected = _expected(cap.truth, result["box"])
+            stats["faces"] += 1
+            stats["false"] += expected is None
+            stats["correct"] += expected is not None and expected == result["label"]
+    stats["seconds"] = time.perf_counter() - t0
+    stats["cpu"] = time.process_time() - cpu0
+    stats["frames"] = cap.delivered - delivered0
+    stats["dropped"] = cap.dropped - dropped0
+    cap.release()
+    return stats
+
+def run_step(ctx, base, source, cameras, seconds):
+    """Run cameras synthetic cameras side by side; returns their stats"""
+    results = ctx.Queue()
+    procs = []
+    for index in range(cameras):
+        camera = {**base, "location": f"Scale {index}", "source": f"{source},seed={index}", "idle_after": 0}
+        proc = ctx.Process(target=_camera, args=(index, camera, seconds, results), daemon=True)
+        proc.start()
+        procs.append(proc)
+    stats, deadline = {}, time.time() + WARMUP + seconds + 60
+    while len(stats) < cameras:
+        try:
+            index, result = results.get(timeout=1)
+        except queue.Empty:
+            # A camera killed or crashed in native code never reports (a clean exit has already put its result)
+            dead = [i for i, proc in enumerate(procs) if i not in stats and proc.exitcode not in (None, 0)]
+            if dead:
+                raise SystemExit(f"❌ Camera {dead[0]} died with exit code {procs[dead[0]].exitcode}")
+            if time.time() > deadline:
+                raise SystemExit(f"❌ No stats from cameras {sorted(set(range(cameras)) - set(stats))} "
+                                 f"after {WARMUP + seconds + 60:.0f}s")
+            continue
+        if "error" in result:
+            raise SystemExit(f"❌ Camera {index} failed: {result['error']}")
+        stats[index] = result
+    for proc in procs:
+        proc.join(timeout=5)
+    return [stats[i] for i in range(cameras)]
+
+def main():
+    global _model
+    parser = argparse.ArgumentParser(description="Find how many synthetic cameras and faces this box sustains without dropping frames")
+    parser.add_argument("--cameras", default="1,2,4,8", help="comma-separated camera counts to try, in order")
+    parser.add_argument("--faces", default="1", help="comma-separated faces per scene to try")
+    parser.add_argument("--unknown", type=int, default=0, help="how many faces per scene are strangers")
+    parser.add_argument("--resolution", default="1280x720", help="WIDTHxHEIGHT of every camera")
+    parser.add_argument("--fps", type=float, default=15, help="frame rate of every camera")
+    parser.add_argument("--size", type=int, default=160, help="face size in pixels")
+    parser.add_argument("--seconds", type=float, default=15, help="measured seconds per step (after a short warm-up)")
+    parser.add_argument("--max-drop", type=float, default=1.0, help="percent of dropped frames a step may have and still pass")
+    parser.add_argument("--all", action="store_true", help="keep going after the first failing step")
+    args = parser.parse_args()
+
+    methods = mp.get_all_start_methods()
+    ctx = mp.get_context("fork" if "fork" in methods else methods[0])
+    _model = scale_model()
+    base = CAMERAS[0]
+    counts = [int(c) for c in args.cameras.split(",")]
+    print(f"=== SCALE TEST ({args.resolution} @ {args.fps:g} fps, {base['detector']} detector, "
+          f"{base['motion_backend']} motion, {os.cpu_count()} CPUs) ===")
+    rows, sustained = [], {}
+    for faces in [int(f) for f in args.faces.split(",")]:
+        source = (f"synthetic:{args.resolution}@{args.fps:g},faces={faces},unknown={min(args.unknown, faces)},"
+                  f"size={args.size}")
+        for cameras in counts:
+            stats = run_step(ctx, base, source, cameras, args.seconds)
+            frames = sum(s["frames"] for s in stats)
+            dropped = sum(s["dropped"] for s in stats)
+            drop = dropped / (frames + dropped) * 100 if frames + dropped else 0.0
+            ms = [m for s in stats for m in s["ms"]]
+            found = sum(s["faces"] for s in stats)
+            fps = statistics.mean(s["frames"] / s["seconds"] for s in stats)
+            cores = sum(s["cpu"] for s in stats) / max(s["seconds"] for s in stats)
+            ok = drop <= args.max_drop
+            rows.append([cameras, faces, f"{fps:.1f}", f"{drop:.1f}", f"{percentile(ms, 50):.1f}", f"{percentile(ms, 95):.1f}",
+                         f"{cores:.2f}", found, f"{sum(s['correct'] for s in stats) / found * 100:.0f}" if found else "-",
+                         sum(s["false"] for s in stats), "ok" if ok else "DROPS"])
+            print(f"{cameras} cameras x {faces} faces: {fps:.1f} fps per camera, {drop:.1f}% dropped")
+            if ok:
+                sustained[faces] = cameras
+            elif not args.all:
+                break
+    print()
+    print_table(["cameras", "faces", "fps/cam", "drop %", "p50 ms", "p95 ms", "cores", "faces seen", "correct %", "false", ""], rows)
+    for faces in sorted({row[1] for row in rows}):
+        if faces in sustained:
+            print(f"Sustained with {faces} face(s) per scene: {sustained[faces]} cameras "
+                  f"({args.resolution} @ {args.fps:g} fps, <= {args.max_drop:g}% dropped)")
+        else:
+            print(f"Sustained with {faces} face(s) per scene: not even {counts[0]} camera(s)")
+
+if __name__ == "__main__":
+    main()
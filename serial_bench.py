@@ -0,0 +1,89 @@
+# serial_bench.py - Alarm round-trip latency and throughput through SmartCam's serial path
+#
+#   python serial_bench.py                       # against arduino_emulator on a pty
+#   python serial_bench.py --drop 0.02 --delay 0.003
+#   python serial_bench.py --port COM3           # against real hardware
+import time, argparse, statistics
+import serial
+from SmartCam import AlarmController, BAUD
+from arduino_emulator import ArduinoEmulator
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+def measure_latency(alarm, cycles):
+    """Toggle the alarm `cycles` times and time each ALARM:ON/OFF round trip"""
+    latencies, failures = [], 0
+    for i in range(cycles):
+        on = i % 2 == 0
+        t0 = time.perf_counter()
+        state = alarm.alarm(on)
+        latencies.append(time.perf_counter() - t0)
+        if state != ("ALARM" if on else "ARMED"):
+            failures += 1
+            alarm.arm(True)  # resync after a lost reply or a button press
+    return latencies, failures
+
+def measure_throughput(alarm, seconds):
+    """Send back-to-back STATUS commands for `seconds` and count completed round trips"""
+    done = failed = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if alarm.send("STATUS") is None:
+            failed += 1
+        else:
+            done += 1
+    return done, failed
+
+def report(latencies, failures, done, failed, seconds, alarm):
+    ms = [l * 1000 for l in latencies]
+    print("\n=== SERIAL ROUND-TRIP LATENCY ===")
+    print(f"Alarm commands: {len(ms)}  failed/resynced: {failures}")
+    if ms:
+        print(f"mean {statistics.mean(ms):.2f} ms  p50 {percentile(ms, 50):.2f} ms  "
+              f"p95 {percentile(ms, 95):.2f} ms  p99 {percentile(ms, 99):.2f} ms  max {max(ms):.2f} ms")
+    print("\n=== SERIAL THROUGHPUT ===")
+    print(f"Completed round trips: {done} in {seconds:.1f}s ({done / seconds:.1f} cmd/s), timeouts: {failed}")
+    print(f"Protocol errors seen by AlarmController: {alarm.errors}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure alarm latency/throughput through AlarmController")
+    parser.add_argument("--port", help="real serial port; omit to start the pty emulator")
+    parser.add_argument("--cycles", type=int, default=500, help="ALARM:ON/OFF commands to time")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of the throughput phase")
+    parser.add_argument("--timeout", type=float, default=1.0, help="AlarmController reply timeout")
+    parser.add_argument("--delay", type=float, default=0.0, help="emulator reply delay in seconds")
+    parser.add_argument("--drop", type=float, default=0.0, help="emulator line drop probability")
+    parser.add_argument("--garble", type=float, default=0.0, help="emulator line garble probability")
+    parser.add_argument("--button-every", type=float, default=0.0, help="emulator mean seconds between button presses")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    emu = None
+    port = args.port
+    if port is None:
+        emu = ArduinoEmulator(args.delay, args.drop, args.garble, args.button_every, BAUD, args.seed)
+        port = emu.start()
+        print(f"Started Arduino emulator on {port}")
+
+    try:
+        with serial.Serial(port, BAUD, timeout=min(1, args.timeout)) as ser:
+            if emu is None:
+                time.sleep(2)  # the real board resets when the port opens
+            alarm = AlarmController(ser, reply_timeout=args.timeout)
+            alarm.arm(True)
+            latencies, failures = measure_latency(alarm, args.cycles)
+            done, failed = measure_throughput(alarm, args.seconds)
+            alarm.arm(False)
+            report(latencies, failures, done, failed, args.seconds, alarm)
+    finally:
+        if emu is not None:
+            emu.stop()
+            print(f"Emulator stats: {emu.stats}")
+
+if __name__ == "__main__":
+    main()
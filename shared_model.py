@@ -0,0 +1,20 @@
+# shared_model.py - The recognizer every camera process of multicam.py shares
+#
+# multicam.py preloads this module into its fork server: a fresh process with
+# no threads, started before the supervisor's own. The model is read there once
+# and every camera process forked from the server - restarts included - gets
+# the same copy-on-write model instead of loading one of its own.
+from SmartCam import CAMERAS, load_recognizer
+from model_watch import model_signature
+
+MODEL = None        # (recognizer, labels), or None when the cameras don't need one
+SIGNATURE = None    # model_signature() of that model, so workers know when a newer one appears
+
+if not all(camera["recognition_server"] for camera in CAMERAS):  # edge-only boxes don't need models/
+    try:
+        SIGNATURE = model_signature("models/lbph.yml")
+        MODEL = load_recognizer()
+    except Exception as e:
+        # Never take the fork server down: camera processes load the model themselves and report the error
+        print(f"⚠️  Fork server could not load the model ({e})")
+        SIGNATURE = None
@@ -0,0 +1,277 @@
+# soak.py - Hours-long soak test with memory and resource leak detection
+#
+#   python soak.py --hours 4                                  # synthetic scene, as fast as it runs
+#   python soak.py --source footage/porch.mp4 --hours 8 --speed 10
+#   python soak.py --hours 1 --interval 10 --samples soak.csv --max-slope rss_mb=20
+#
+# Replays footage through SmartCam.process_frame, the per-frame step of
+# SmartCam.py's main loop, starting over when it ends: CameraPipeline,
+# DataLogger, snapshots, AlarmDecision and NotificationManager. Notifications go to notification_emulator's local
+# stand-ins, in a child process so their threads and sockets aren't counted;
+# there is no serial port. Everything is written to a temporary work
+# directory. Every --interval seconds it samples:
+#
+#   rss_mb          resident memory of the process
+#   traced_mb       Python allocations tracemalloc sees (--tracemalloc 0 = off)
+#   threads         live threads
+#   fds             open file descriptors (Linux and macOS)
+#   disk_mb         logs/, snapshots/ and spool/ in the work directory
+#   session_events  events DataLogger keeps in memory for the session JSON
+#
+# The first part of the run ("warmup") is skipped. The rest is cut in thirds,
+# and each series gets a slope per hour from the median of the first third
+# to the median of the last. So a burst of sends or one allocator step
+# doesn't count as a trend. A slope above its limit in SOAK_CONFIG fails the
+# run (exit code 1). The allocation sites that grew most since the warm-up
+# are printed either way. Judge hours, not minutes: short runs stretch any
+# step into a steep slope per hour.
+import os, sys, csv, time, shutil, argparse, tempfile, threading, tracemalloc
+import multiprocessing as mp
+import numpy as np
+import cv2
+from SmartCam import (CAMERAS, DETECTOR_CONFIG, LOG_CONFIG, ALARM_CONFIG, SPOOL_DEFAULTS, CameraPipeline, DataLogger,
+                      NotificationManager, AlarmDecision, process_frame)
+from detectors import create_detector
+from notification_emulator import NotificationEmulator
+from scale_bench import scale_model
+from synthetic import open_source
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SOAK_DEFAULTS = {
+    "warmup": 0.25,          # fraction of the run left out of the trend fit (caches filling, budgets not reached yet)
+    "min_samples": 10,       # fewer samples after the warm-up than this: report, but don't judge
+    "limits": {              # largest upward slope per hour that still passes
+        "rss_mb": 10.0,
+        "traced_mb": 5.0,
+        "threads": 0.5,
+        "fds": 1.0,
+        "disk_mb": 20.0,
+        "session_events": 100.0
+    },
+    # LOG_CONFIG overrides for the run: small budgets so every cap is reached within minutes
+    "log_config": {"max_bytes": 1024 ** 2, "compress_after": 30, "interval": 10, "retention_bytes": 5 * 1024 ** 2,
+                   "snapshot_retention_bytes": 10 * 1024 ** 2, "session_events": 20}
+}
+try:
+    from config import SOAK_CONFIG
+except ImportError:
+    SOAK_CONFIG = {}
+SOAK_CONFIG = {**SOAK_DEFAULTS, **SOAK_CONFIG,
+               "limits": {**SOAK_DEFAULTS["limits"], **SOAK_CONFIG.get("limits", {})},
+               "log_config": {**SOAK_DEFAULTS["log_config"], **SOAK_CONFIG.get("log_config", {})}}
+
+METRICS = ("rss_mb", "traced_mb", "threads", "fds", "disk_mb", "session_events")
+
+def rss_mb():
+    """Resident memory now (Linux), or the peak so far where /proc is missing"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def open_fds():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path)) - 1  # minus the listing's own descriptor
+    return 0
+
+def disk_mb(paths):
+    total = 0
+    for path in paths:
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass  # rotated away while walking
+    return total / 1024 ** 2
+
+class Sampler:
+    """Takes one row of resource readings at a time"""
+    def __init__(self, logger, workdir):
+        self.logger = logger
+        self.dirs = [os.path.join(workdir, d) for d in ("logs", "snapshots", "spool")]
+        self.t0 = time.time()
+        self.rows = []
+
+    def sample(self, frames):
+        session = self.logger.session_data
+        row = {"seconds": time.time() - self.t0, "frames": frames, "rss_mb": rss_mb(),
+               "traced_mb": tracemalloc.get_traced_memory()[0] / 1024 ** 2 if tracemalloc.is_tracing() else 0.0,
+               "threads": threading.active_count(), "fds": open_fds(), "disk_mb": disk_mb(self.dirs),
+               "session_events": sum(len(session[k]) for k in ("detections", "motion_events", "alarm_events"))}
+        self.rows.append(row)
+        return row
+
+def slope_per_hour(hours, values):
+    """Median of the last third minus median of the first third, per hour between them"""
+    third = len(values) // 3
+    if third == 0:
+        return 0.0
+    span = np.median(hours[-third:]) - np.median(hours[:third])
+    return float((np.median(values[-third:]) - np.median(values[:third])) / span) if span > 0 else 0.0
+
+def trends(rows, warmup, limits, min_samples):
+    """[(metric, first, last, peak, slope per hour, limit, verdict)] over the rows after the warm-up"""
+    if not rows:
+        return []
+    start = rows[-1]["seconds"] * warmup
+    kept = [r for r in rows if r["seconds"] >= start]
+    hours = np.array([r["seconds"] / 3600 for r in kept])
+    result = []
+    for metric in METRICS:
+        values = np.array([r[metric] for r in kept], dtype=float)
+        slope = slope_per_hour(hours, values)
+        if len(kept) < min_samples:
+            verdict = "too few samples"
+        else:
+            verdict = "ok" if slope <= limits[metric] else "LEAK?"
+        result.append((metric, values[0], values[-1], values.max(), slope, limits[metric], verdict))
+    return result
+
+def top_growth(baseline, count=10):
+    """The allocation sites that grew most since baseline"""
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+    stats = snapshot.compare_to(baseline.filter_traces(ignore), "lineno")
+    return [s for s in stats if s.size_diff > 0][:count]
+
+def _emulator(conn, latency, jitter):
+    """Child process: run the notification stand-ins until the parent says stop"""
+    emulator = NotificationEmulator(latency, jitter).start()
+    conn.send(emulator.config())
+    conn.recv()
+    emulator.stop()
+
+def report(sampler, results, growth, frames, loops, notifier):
+    elapsed = sampler.rows[-1]["seconds"] if sampler.rows else 0
+    print(f"\n=== SOAK TEST ({elapsed / 3600:.2f} h, {frames} frames, {frames / max(elapsed, 1e-9):.0f} fps, "
+          f"source replayed {loops + 1}x, {len(sampler.rows)} samples, first {SOAK_CONFIG['warmup']:.0%} left out) ===")
+    headers = ["metric", "first", "last", "peak", "slope/h", "limit/h", ""]
+    rows = [[m, f"{a:.1f}", f"{b:.1f}", f"{p:.1f}", f"{s:+.2f}", f"{lim:g}", v] for m, a, b, p, s, lim, v in results]
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
+    print(f"Notifications dropped at the send queue: {notifier.dropped.value:.0f}")
+    if growth:
+        print("\nLargest allocation growth since the warm-up:")
+        for stat in growth:
+            frame = stat.traceback[0]
+            print(f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  {frame.filename}:{frame.lineno}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay footage for hours and fail on upward resource trends")
+    parser.add_argument("--source", default="synthetic:1280x720@15,faces=2,unknown=1,realtime=0",
+                        help="video file or camera source to replay (default: a synthetic scene)")
+    parser.add_argument("--hours", type=float, default=1.0, help="how long to run")
+    parser.add_argument("--speed", type=float, default=0, help="replay at this multiple of the source frame rate (0 = as fast as possible)")
+    parser.add_argument("--interval", type=float, default=30, help="seconds between samples")
+    parser.add_argument("--tracemalloc", type=int, default=1, metavar="FRAMES", help="traceback depth for tracemalloc (0 = off; it slows the loop)")
+    parser.add_argument("--cooldown", type=float, default=5, help="seconds between notifications of one kind")
+    parser.add_argument("--spool", action="store_true", help="deliver notifications through the on-disk spool")
+    parser.add_argument("--max-slope", action="append", default=[], metavar="METRIC=PER_HOUR", help="override a limit, e.g. rss_mb=20")
+    parser.add_argument("--samples", metavar="FILE", help="also write every sample to this CSV file")
+    parser.add_argument("--workdir", help="directory for logs/, snapshots/ and spool/ (default: a temp dir, removed afterwards)")
+    args = parser.parse_args()
+    limits = dict(SOAK_CONFIG["limits"])
+    for item in args.max_slope:
+        name, _, value = item.partition("=")
+        if name not in limits:
+            parser.error(f"unknown metric {name!r} (choose from {', '.join(METRICS)})")
+        limits[name] = float(value)
+
+    if args.tracemalloc:
+        tracemalloc.start(args.tracemalloc)
+    source = os.path.abspath(args.source) if os.path.exists(args.source) else args.source
+    samples = os.path.abspath(args.samples) if args.samples else None
+    camera = {**CAMERAS[0], "source": source, "location": "Soak"}
+    rec, labels = scale_model()
+    pipeline = CameraPipeline(camera, create_detector(camera, DETECTOR_CONFIG), rec, labels)
+    conn, child = mp.Pipe()
+    emulator = mp.Process(target=_emulator, args=(child, 0.05, 0.05), daemon=True)
+    emulator.start()
+    notify_config = conn.recv()
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="smartcam_soak_"))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)  # logs/, snapshots/ and spool/ are relative to the working directory
+    spool_config = {**SPOOL_DEFAULTS, "enabled": True, "directory": "spool"} if args.spool else None
+    logger = DataLogger({**LOG_CONFIG, **SOAK_CONFIG["log_config"]})
+    notifier = NotificationManager(notify_config, spool_config)
+    notifier.notification_cooldown = args.cooldown
+    decision = AlarmDecision(**ALARM_CONFIG)
+    sampler = Sampler(logger, workdir)
+    print(f"Soak test for {args.hours:g} h on {source!r} in {workdir} - Ctrl+C to stop early")
+
+    cap = open_source(source)
+    if not cap.isOpened():
+        sys.exit(f"Cannot open {source!r}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 15
+    frames = loops = 0
+    baseline = None
+    start = time.time()
+    end = start + args.hours * 3600
+    next_sample = start
+    try:
+        while time.time() < end:
+            ok, _, _, _ = process_frame(pipeline, cap, logger, notifier, decision)
+            if not ok:
+                cap.release()  # footage ended: replay it through a fresh capture, as a camera reconnect would
+                cap = open_source(source)
+                loops += 1
+                if not cap.isOpened():
+                    sys.exit(f"Cannot reopen {source!r}")
+                continue
+            frames += 1
+
+            now = time.time()
+            if now >= next_sample:
+                row = sampler.sample(frames)
+                next_sample = now + args.interval
+                print(f"[{row['seconds'] / 60:6.1f} min] {frames} frames  rss {row['rss_mb']:.0f} MB  traced {row['traced_mb']:.1f} MB  "
+                      f"threads {row['threads']}  fds {row['fds']}  disk {row['disk_mb']:.1f} MB  session events {row['session_events']}")
+                if baseline is None and tracemalloc.is_tracing() and now - start >= (end - start) * SOAK_CONFIG["warmup"]:
+                    baseline = tracemalloc.take_snapshot()
+            if args.speed:
+                delay = start + frames / (fps * args.speed) - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+    except KeyboardInterrupt:
+        print("\nStopped early")
+    finally:
+        cap.release()
+    sampler.sample(frames)
+    growth = top_growth(baseline) if baseline is not None else []
+    results = trends(sampler.rows, SOAK_CONFIG["warmup"], limits, SOAK_CONFIG["min_samples"])
+    notifier.close(timeout=2)
+    logger.save_session()
+    logger.close()
+    conn.send("stop")
+    emulator.join(timeout=5)
+    report(sampler, results, growth, frames, loops, notifier)
+    if samples:
+        with open(samples, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(sampler.rows[0]))
+            writer.writeheader()
+            writer.writerows(sampler.rows)
+        print(f"Samples written to {samples}")
+    if not args.workdir:
+        os.chdir(os.path.dirname(workdir))
+        shutil.rmtree(workdir, ignore_errors=True)
+    failed = [r[0] for r in results if r[-1] == "LEAK?"]
+    if failed:
+        print(f"❌ Upward trend beyond the limit: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ No resource grew faster than its limit")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# spool.py - Durable outbound queue for notifications
+#
+# Every notification is written to the spool directory as one JSON file before
+# anything is sent. A single drainer thread delivers them in order at a capped
+# rate, retries failures with exponential backoff (per channel, so one dead
+# service doesn't hold up the others) and deletes a file only once delivery
+# succeeded. Files left over from a previous run are picked up at start, so
+# alerts raised during an outage or just before a restart still go out. Jobs
+# for a channel that has been disabled since are dropped when picked up.
+#
+# The spool is opt-in ("enabled": True in SPOOL_CONFIG): without it,
+# notifications go straight to the sender threads as they always did.
+#
+#   spool/1700000000123_0001.json   pending
+#   spool/failed/...                gave up after max_attempts
+import os, json, time, glob, itertools, threading
+from metrics import REGISTRY
+
+SPOOL_DEFAULTS = {
+    "enabled": False,
+    "directory": "spool",
+    "rate": 10.0,          # deliveries per second at most; high enough not to hold back an alert burst
+    "max_attempts": 10,    # then the job moves to spool/failed
+    "backoff": 5.0,        # seconds before the first retry, doubled per attempt
+    "max_backoff": 600.0
+}
+
+class NotificationSpool:
+    def __init__(self, directory="spool", rate=10.0, max_attempts=10, backoff=5.0, max_backoff=600.0, enabled=False):
+        self.directory = directory
+        self.failed_dir = os.path.join(directory, "failed")
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        os.makedirs(self.failed_dir, exist_ok=True)
+        self.pending = []           # [(file name, job)] oldest first
+        self.channel_wait = {}      # channel -> time before which it is not retried
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.backlog = REGISTRY.gauge("smartcam_notification_spool_backlog", "Notifications waiting in the spool")
+        self.oldest = REGISTRY.gauge("smartcam_notification_spool_oldest_seconds", "Age of the oldest spooled notification")
+        self._load()
+
+    def _load(self):
+        """Pick up jobs left by a previous run"""
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            try:
+                with open(path) as f:
+                    self.pending.append((os.path.basename(path), json.load(f)))
+            except (OSError, ValueError) as e:
+                print(f"Spool: skipping unreadable {path}: {e}")
+        if self.pending:
+            print(f"📮 Resuming {len(self.pending)} spooled notifications")
+        self._update_gauges()
+
+    def _write(self, name, job):
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "w") as f:
+            json.dump(job, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def put(self, channel, kwargs):
+        """Persist one delivery (send_<channel>(**kwargs)) and wake the drainer"""
+        job = {"channel": channel, "kwargs": kwargs, "created": time.time(), "attempts": 0, "next_try": 0}
+        name = f"{int(job['created'] * 1000)}_{next(self.seq) % 10000:04d}.json"
+        self._write(name, job)
+        with self.cond:
+            self.pending.append((name, job))
+            self._update_gauges()
+            self.cond.notify()
+
+    def _update_gauges(self):
+        self.backlog.set(len(self.pending))
+        self.oldest.set(time.time() - self.pending[0][1]["created"] if self.pending else 0)
+
+    def start(self, deliver, wanted=None):
+        """deliver(channel, kwargs) -> bool runs on the drainer thread; jobs for a channel wanted(channel) rejects are dropped"""
+        self.deliver = deliver
+        self.wanted = wanted
+        self.running = True
+        self.thread = threading.Thread(target=self._drain, name="notification-spool", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Keep delivering for up to timeout seconds, then stop; undelivered jobs stay on disk"""
+        deadline = time.time() + timeout
+        while self.ready() and time.time() < deadline:
+            time.sleep(0.1)
+        self.running = False
+        with self.cond:
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=max(0.1, deadline - time.time()) + 1)
+        if self.pending:
+            print(f"📮 {len(self.pending)} notifications left in {self.directory} for the next run")
+
+    def ready(self):
+        now = time.time()
+        with self.cond:
+            return any(self._due(job, now) for _, job in self.pending)
+
+    def _due(self, job, now):
+        return job["next_try"] <= now and self.channel_wait.get(job["channel"], 0) <= now
+
+    def _next(self):
+        """Oldest job that is due, waiting until one is"""
+        with self.cond:
+            while self.running:
+                now = time.time()
+                for entry in self.pending:
+                    if self._due(entry[1], now):
+                        return entry
+                waits = [max(entry[1]["next_try"], self.channel_wait.get(entry[1]["channel"], 0)) for entry in self.pending]
+                self.cond.wait(timeout=max(0.05, min(waits) - now) if waits else 1.0)
+                self._update_gauges()
+        return None
+
+    def _drain(self):
+        while self.running:
+            entry = self._next()
+            if entry is None:
+                break
+            name, job = entry
+            if self.wanted is not None and not self.wanted(job["channel"]):
+                self._drop(entry)
+                continue
+            try:
+                ok = self.deliver(job["channel"], job["kwargs"])
+            except Exception as e:
+                print(f"Spool: {job['channel']} delivery raised {e}")
+                ok = False
+            with self.cond:
+                if ok:
+                    self.pending.remove(entry)
+                    self._remove(name)
+                    self.channel_wait.pop(job["channel"], None)
+                else:
+                    self._retry(entry)
+                self._update_gauges()
+            if self.interval:
+                time.sleep(self.interval)
+
+    def _drop(self, entry):
+        """Forget a job for a channel that is no longer enabled"""
+        name, job = entry
+        with self.cond:
+            self.pending.remove(entry)
+            self._remove(name)
+            self.channel_wait.pop(job["channel"], None)
+            self._update_gauges()
+        REGISTRY.counter("smartcam_notification_spool_dropped_total", "Spooled notifications dropped because their channel is disabled",
+                         channel=job["channel"]).inc()
+        print(f"Spool: dropping {job['channel']} notification, the channel is disabled ({name})")
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def _retry(self, entry):
+        name, job = entry
+        job["attempts"] += 1
+        channel = job["channel"]
+        if job["attempts"] >= self.max_attempts:
+            self.pending.remove(entry)
+            os.replace(os.path.join(self.directory, name), os.path.join(self.failed_dir, name))
+            REGISTRY.counter("smartcam_notification_spool_failed_total", "Notifications given up after max_attempts",
+                             channel=channel).inc()
+            print(f"Spool: giving up on {channel} notification after {job['attempts']} attempts ({name})")
+            return
+        delay = min(self.max_backoff, self.backoff * 2 ** (job["attempts"] - 1))
+        job["next_try"] = time.time() + delay
+        self.channel_wait[channel] = job["next_try"]   # later jobs for this channel wait too, keeping order
+        self._write(name, job)
+        REGISTRY.counter("smartcam_notification_spool_retries_total", "Notification delivery retries", channel=channel).inc()
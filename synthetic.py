@@ -0,0 +1,279 @@
+# synthetic.py - Synthetic camera scenes for scale testing
+#
+# A camera whose "source" starts with "synthetic:" gets a SyntheticCapture
+# instead of a cv2.VideoCapture. It renders a scene of moving faces live:
+#
+#   "synthetic:1280x720@15"                          # 1 known face, 720p at 15 fps
+#   "synthetic:1920x1080@30,faces=4,unknown=2,seed=3"
+#   "synthetic:640x480@10,faces=2,unseen=data/unseen,background=porch.jpg"
+#
+# Options (comma-separated key=value after the resolution):
+#   faces       faces in the scene                           (1)
+#   unknown     how many of them are people the model has never seen (0)
+#   size        face size in pixels; each face is 1-1.5x this (160)
+#   speed       face speed in pixels per second              (120)
+#   visible     seconds a face stays in view before walking off (8)
+#   away        seconds it is gone before it comes back       (4)
+#   known       folder of <name>/*.png crops the model was trained on (data/known)
+#   unseen      same layout, people NOT in the model; default: drawn faces
+#   background  image to use instead of a generated backdrop
+#   noise       sensor noise standard deviation               (2)
+#   frames      stop after this many frames, 0 = never        (0)
+#   realtime    1 = frames come at the frame rate whether or not they are read,
+#               like a live camera; 0 = as fast as they are read (1)
+#   seed        random seed for face paths and identities     (0)
+#
+# In realtime mode a reader that falls behind gets the newest frame and the
+# ones in between count as dropped. So the same CameraPipeline counters
+# (smartcam_frames_dropped_total) show when a box can no longer keep up.
+# scale_bench.py ramps cameras and faces to find that point.
+import os, glob, time, argparse
+import numpy as np
+import cv2
+
+PREFIX = "synthetic:"
+SYNTHETIC_DEFAULTS = {
+    "faces": 1, "unknown": 0, "size": 160, "speed": 120.0, "visible": 8.0, "away": 4.0, "known": "data/known", "unseen": None,
+    "background": None, "noise": 2.0, "frames": 0, "realtime": 1, "seed": 0
+}
+CROPS_PER_PERSON = 20    # crops loaded per person; a face steps through them to vary its look
+CROP_PERIOD = 0.5        # seconds each crop is shown
+NOISE_FRAMES = 4         # noisy copies of the background, cycled
+EMPTY_START = 3.0        # seconds of empty scene first, so motion triggers calibrate on the background
+
+def parse_source(source):
+    """"synthetic:WxH@FPS,key=value,..." -> (width, height, fps, options)"""
+    spec = source[len(PREFIX):]
+    mode, _, rest = spec.partition(",")
+    size, _, fps = mode.partition("@")
+    width, height = (int(v) for v in size.lower().split("x"))
+    options = dict(SYNTHETIC_DEFAULTS)
+    for item in filter(None, rest.split(",")):
+        key, _, value = item.partition("=")
+        if key not in options:
+            raise ValueError(f"unknown synthetic source option {key!r} in {source!r}")
+        default = SYNTHETIC_DEFAULTS[key]
+        options[key] = type(default)(value) if default is not None and not isinstance(default, str) else value
+    return width, height, float(fps or 15), options
+
+def open_source(source):
+    """cv2.VideoCapture for real cameras, files and streams; SyntheticCapture for "synthetic:..." sources"""
+    if isinstance(source, str) and source.startswith(PREFIX):
+        return SyntheticCapture(source)
+    return cv2.VideoCapture(source)
+
+def load_people(folder, limit=CROPS_PER_PERSON):
+    """[(name, [200x200 gray crops]), ...] from folder/<name>/*.png"""
+    people = []
+    if not folder or not os.path.isdir(folder):
+        return people
+    for name in sorted(os.listdir(folder)):
+        crops = [cv2.imread(fn, 0) for fn in sorted(glob.glob(os.path.join(folder, name, "*.png")))[:limit]]
+        crops = [cv2.resize(c, (200, 200)) for c in crops if c is not None]
+        if crops:
+            people.append((name, crops))
+    return people
+
+def drawn_face(rng):
+    """A 200x200 gray cartoon face with random proportions - a stranger no model was trained on"""
+    face = np.full((200, 200), int(rng.integers(60, 110)), np.uint8)
+    skin = int(rng.integers(140, 210))
+    cv2.ellipse(face, (100, 105), (int(rng.integers(62, 76)), int(rng.integers(82, 94))), 0, 0, 360, skin, -1)
+    eye_y, eye_dx = int(rng.integers(82, 96)), int(rng.integers(24, 34))
+    for side in (-1, 1):
+        cx = 100 + side * eye_dx
+        cv2.ellipse(face, (cx, eye_y), (int(rng.integers(10, 15)), int(rng.integers(5, 8))), 0, 0, 360, 40, -1)
+        cv2.line(face, (cx - 14, eye_y - 16), (cx + 14, eye_y - int(rng.integers(14, 20))), 50, int(rng.integers(3, 6)))
+    cv2.line(face, (100, eye_y + 8), (100 + int(rng.integers(-6, 7)), eye_y + 38), skin - 50, 3)
+    cv2.ellipse(face, (100, eye_y + 58), (int(rng.integers(18, 28)), int(rng.integers(5, 10))), 0, 0, 180, 60, -1)
+    noise = rng.normal(0, 6, face.shape)
+    return cv2.GaussianBlur(np.clip(face + noise, 0, 255).astype(np.uint8), (5, 5), 0)
+
+def make_background(width, height, rng, image=None):
+    """The backdrop: an image scaled to the frame, or a textured gradient 'room'"""
+    if image:
+        frame = cv2.imread(image)
+        if frame is None:
+            raise ValueError(f"cannot read background image {image}")
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :, None]
+    frame = 60 + 80 * y + 40 * x * np.array([0.8, 1.0, 1.2], np.float32)
+    texture = cv2.resize(rng.normal(0, 18, (height // 8 + 1, width // 8 + 1, 3)).astype(np.float32), (width, height))
+    frame = np.clip(frame + texture, 0, 255).astype(np.uint8)
+    for _ in range(6):  # furniture-like blocks give the detector something that isn't a face
+        x0, y0 = int(rng.integers(0, width)), int(rng.integers(height // 3, height))
+        color = tuple(int(c) for c in rng.integers(30, 200, 3))
+        cv2.rectangle(frame, (x0, y0), (x0 + int(rng.integers(60, width // 4)), y0 + int(rng.integers(40, height // 3))), color, -1)
+    return frame
+
+def _bounce(position, span):
+    """Position along a line of length span, reflecting off both ends"""
+    if span <= 0:
+        return 0
+    position %= 2 * span
+    return int(position if position < span else 2 * span - position)
+
+class SyntheticFace:
+    """One person walking a straight line that bounces off the frame edges"""
+    def __init__(self, name, crops, size, speed, visible, away, width, height, rng):
+        self.name = name      # training label, or "unknown"
+        self.crops = crops
+        self.visible, self.period = visible, visible + away
+        self.enter = rng.uniform(0, self.period)   # staggered, so faces don't all come and go together
+        self.size = int(size * rng.uniform(1.0, 1.5))
+        angle = rng.uniform(0, 2 * np.pi)
+        self.velocity = (speed * np.cos(angle), speed * np.sin(angle))
+        self.start = (rng.uniform(0, width), rng.uniform(0, height))
+        self.phase = rng.uniform(0, 2 * np.pi)
+        self.offset = int(rng.integers(0, len(crops)))
+        self.width, self.height = width, height
+
+    def present(self, t):
+        return t >= EMPTY_START and (t - EMPTY_START + self.enter) % self.period < self.visible
+
+    def box(self, t):
+        """(x, y, w, h) at t seconds; the face grows and shrinks a little as it 'walks'"""
+        size = min(int(self.size * (1 + 0.1 * np.sin(t + self.phase))), self.width, self.height)
+        x = _bounce(self.start[0] + self.velocity[0] * t, self.width - size)
+        y = _bounce(self.start[1] + self.velocity[1] * t, self.height - size)
+        return x, y, size, size
+
+    def crop(self, t):
+        return self.crops[(self.offset + int(t / CROP_PERIOD)) % len(self.crops)]
+
+class SyntheticCapture:
+    """Renders a synthetic scene; drop-in for the cv2.VideoCapture calls SmartCam makes"""
+    def __init__(self, source):
+        self.source = source
+        self.width, self.height, self.fps, self.options = parse_source(source)
+        opts = self.options
+        rng = np.random.default_rng(opts["seed"])
+        known = load_people(opts["known"])
+        unseen = load_people(opts["unseen"])
+        if opts["unseen"] and not unseen:
+            raise ValueError(f"no <name>/*.png crops in unseen folder {opts['unseen']}")
+        if not known and opts["faces"] > opts["unknown"]:
+            print(f"⚠️  No crops in {opts['known']}/<name>/ - every synthetic face will be a stranger")
+        strangers = unseen or [(f"stranger{i}", [drawn_face(rng) for _ in range(4)]) for i in range(max(1, opts["unknown"]))]
+        self.faces = []
+        for i in range(opts["faces"]):
+            if i < opts["unknown"] or not known:
+                _, crops = strangers[i % len(strangers)]
+                name = "unknown"
+            else:
+                name, crops = known[int(rng.integers(0, len(known)))]
+            self.faces.append(SyntheticFace(name, crops, opts["size"], opts["speed"], opts["visible"], opts["away"],
+                                            self.width, self.height, rng))
+        background = make_background(self.width, self.height, rng, opts["background"])
+        if opts["noise"] > 0:
+            self.backgrounds = [np.clip(background + rng.normal(0, opts["noise"], background.shape), 0, 255).astype(np.uint8)
+                                for _ in range(NOISE_FRAMES)]
+        else:
+            self.backgrounds = [background]
+        self.realtime = bool(opts["realtime"])
+        self.limit = opts["frames"]
+        self.index = 0          # next frame number
+        self.delivered = 0      # frames returned by read() or grab()
+        self.dropped = 0        # realtime frames that went by while nobody was reading
+        self.truth = []         # (name, box) of every face in the last rendered frame
+        self.started = None
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.limit)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.index)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def _advance(self):
+        """Frame number to deliver next, waiting for it in realtime mode; None once the limit is reached"""
+        if not self.opened:
+            return None
+        index = self.index
+        if self.realtime:
+            now = time.perf_counter()
+            if self.started is None:
+                self.started = now
+            due = int((now - self.started) * self.fps)
+            if self.limit:
+                due = min(due, self.limit)
+            if due > index:
+                self.dropped += due - index  # the camera moved on without us
+                index = due
+            else:
+                time.sleep(max(0.0, self.started + index / self.fps - now))
+        if self.limit and index >= self.limit:
+            return None
+        self.index = index + 1
+        self.delivered += 1
+        return index
+
+    def grab(self):
+        return self._advance() is not None
+
+    def read(self):
+        index = self._advance()
+        if index is None:
+            return False, None
+        return True, self.render(index / self.fps, index)
+
+    def render(self, t, index=0):
+        """The scene at t seconds as a BGR frame"""
+        frame = self.backgrounds[index % len(self.backgrounds)].copy()
+        self.truth = []
+        for face in self.faces:
+            if not face.present(t):
+                continue
+            x, y, w, h = face.box(t)
+            crop = cv2.resize(face.crop(t), (w, h), interpolation=cv2.INTER_AREA if w < 200 else cv2.INTER_LINEAR)
+            frame[y:y + h, x:x + w] = crop[:, :, None]
+            self.truth.append((face.name, (x, y, w, h)))
+        return frame
+
+    def release(self):
+        self.opened = False
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a synthetic camera scene")
+    parser.add_argument("source", nargs="?", default="synthetic:1280x720@15,faces=3,unknown=1",
+                        help='"synthetic:WxH@FPS,key=value,..." (see the top of synthetic.py)')
+    parser.add_argument("--save", metavar="FILE", help="write --frames frames to a video file instead of showing them")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+    cap = SyntheticCapture(args.source)
+    writer = None
+    if args.save:
+        writer = cv2.VideoWriter(args.save, cv2.VideoWriter_fourcc(*"mp4v"), cap.fps, (cap.width, cap.height))
+        cap.realtime = False
+    for _ in range(args.frames):
+        ok, frame = cap.read()
+        if not ok: break
+        if writer is not None:
+            writer.write(frame)
+            continue
+        for name, (x, y, w, h) in cap.truth:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(frame, name, (x, y - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        cv2.imshow("synthetic", frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'): break
+    if writer is not None:
+        writer.release()
+        print(f"Wrote {cap.delivered} frames to {args.save}")
+    cap.release()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# test_alarm.py - AlarmDecision replayed on synthetic sighting streams
+#
+#   python test_alarm.py              # or: python -m pytest test_alarm.py
+#
+# One scene - an unknown person in view from 10 s to 14 s and again from 15 s
+# to 20 s - is sampled at 5, 15 and 30 fps, with frames dropped at random and
+# with idle-mode duty cycling. The alarm must go ON and OFF at the same
+# wall-clock times in every stream, give or take the longest gap between two
+# frames the engine actually saw.
+import sys, random
+from SmartCam import AlarmDecision
+
+VISIBLE = [(10.0, 14.0), (15.0, 20.0)]   # seconds the unknown person is in view
+END = 30.0
+HOLD = 2.0
+ON_AT, OFF_AT = VISIBLE[0][0], VISIBLE[-1][1] + HOLD
+
+def in_view(t):
+    return any(start <= t <= end for start, end in VISIBLE)
+
+def stream(fps, drop=0.0, every=1, seed=0, stray=None):
+    """(timestamp, unknown) frames of the scene at fps
+
+    drop: share of frames that never arrive (the loop fell behind)
+    every: only every Nth frame is analyzed, like idle mode; the others arrive as unknown=False
+    stray: timestamp of a one-frame false sighting
+    """
+    rng = random.Random(seed)
+    frames = []
+    for i in range(int(END * fps)):
+        if rng.random() < drop:
+            continue
+        t = i / fps
+        analyzed = i % every == 0
+        frames.append((t, analyzed and (in_view(t) or stray is not None and abs(t - stray) < 0.5 / fps)))
+    return frames
+
+def slack(frames, every=1, fps=None):
+    """How late the engine can see a change: the longest gap between frames it saw, or between analyzed frames"""
+    gaps = [b[0] - a[0] for a, b in zip(frames, frames[1:])]
+    return max(max(gaps), every / fps if fps else 0) + 1e-9
+
+def check(frames, tolerance, decision=None):
+    changes = (decision or AlarmDecision(1, 2.0, HOLD)).replay(frames)
+    assert [kind for _, kind in changes] == ["ON", "OFF"], changes
+    (on, _), (off, _) = changes
+    assert ON_AT <= on <= ON_AT + tolerance, f"ON at {on:.3f}s, expected {ON_AT}s (+{tolerance:.3f})"
+    assert abs(off - OFF_AT) <= tolerance, f"OFF at {off:.3f}s, expected {OFF_AT}s (±{tolerance:.3f})"
+    return changes
+
+def test_frame_rate():
+    for fps in (5, 15, 30):
+        frames = stream(fps)
+        check(frames, slack(frames))
+
+def test_dropped_frames():
+    for fps in (5, 15, 30):
+        for seed in range(5):
+            frames = stream(fps, drop=0.3, seed=seed)
+            check(frames, slack(frames))
+
+def test_duty_cycle():
+    for fps in (15, 30):
+        for every in (2, 5):
+            frames = stream(fps, every=every)
+            check(frames, slack(frames, every, fps))
+
+def test_duty_cycle_with_drops():
+    frames = stream(30, drop=0.2, every=5, seed=1)
+    check(frames, slack(frames, 5, 30))
+
+def test_gap_shorter_than_hold():
+    # the person is out of view for 1 s between 14 s and 15 s: with a 2 s hold the alarm stays on
+    for fps in (5, 15, 30):
+        changes = AlarmDecision(1, 2.0, HOLD).replay(stream(fps))
+        assert not any(VISIBLE[0][1] < t < VISIBLE[1][0] + HOLD for t, _ in changes), changes
+
+def test_trigger_evidence():
+    # 3 sightings within 1 s: a one-frame false sighting never sounds the alarm, a person in view does
+    for fps in (5, 15, 30):
+        frames = stream(fps, stray=5.0)
+        check(frames, 3 / fps, AlarmDecision(3, 1.0, HOLD))
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in [(n, f) for n, f in globals().items() if n.startswith("test_")]:
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
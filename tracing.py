@@ -0,0 +1,198 @@
+# tracing.py - Per-frame stage tracing in Chrome trace format
+#
+# Opt-in: TRACER records nothing until enable() is called. Spans go into a
+# fixed-size ring buffer (oldest entries are overwritten), so a long run keeps
+# only the most recent stretch and never grows. dump() writes Chrome trace JSON
+# that opens in chrome://tracing or https://ui.perfetto.dev.
+#
+#   from tracing import TRACER
+#   with TRACER.span("detect", camera="Front Camera"): ...
+#   TRACER.dump("trace.json")
+#
+# SamplingProfiler adds sampled Python call stacks of every thread to the same
+# trace (category "sample") and counts the hottest functions.
+import os, sys, json, time, itertools, threading
+from collections import Counter
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "t0")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.t0, cat=self.cat, **self.args)
+        return False
+
+class Tracer:
+    def __init__(self, capacity=200000):
+        self.capacity = capacity
+        self.enabled = False
+        self.events = [None] * capacity
+        self.counter = itertools.count()   # next() is atomic under the GIL - no lock on the hot path
+        self.written = 0
+        self.thread_names = {}
+        self.pid = os.getpid()
+
+    def enable(self, capacity=None):
+        if capacity and capacity != self.capacity:
+            self.capacity = capacity
+            self.events = [None] * capacity
+        self.pid = os.getpid()
+        self.enabled = True
+        return self
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, cat="stage", **args):
+        """Context manager recording one complete event; free when tracing is off"""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, cat, args)
+
+    def complete(self, name, t0, t1=None, cat="stage", tid=None, **args):
+        """Record an event that started at perf_counter() value t0 and ends at t1 (default now)"""
+        if not self.enabled:
+            return
+        end = time.perf_counter() if t1 is None else t1
+        if tid is None:
+            tid = threading.get_ident()
+            if tid not in self.thread_names:
+                self.thread_names[tid] = threading.current_thread().name
+        i = next(self.counter)
+        self.events[i % self.capacity] = (name, cat, t0, end - t0, tid, args)
+        self.written = i + 1
+
+    def instant(self, name, cat="mark", **args):
+        self.complete(name, time.perf_counter(), cat=cat, **args)
+
+    def recorded(self):
+        """Events still in the ring, oldest first"""
+        n = self.written
+        if n <= self.capacity:
+            return [e for e in self.events[:n] if e is not None]
+        start = n % self.capacity
+        return [e for e in self.events[start:] + self.events[:start] if e is not None]
+
+    def to_chrome(self):
+        trace = []
+        names = dict(self.thread_names)
+        names.update((t.ident, t.name) for t in threading.enumerate() if t.ident is not None)
+        for tid, name in names.items():
+            trace.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}})
+        for name, cat, t0, dur, tid, args in self.recorded():
+            event = {"name": name, "cat": cat, "ph": "X", "ts": round(t0 * 1e6, 1), "dur": round(dur * 1e6, 1),
+                     "pid": self.pid, "tid": tid}
+            if args:
+                event["args"] = args
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms",
+                "otherData": {"recorded": self.written, "kept": min(self.written, self.capacity)}}
+
+    def dump(self, path):
+        """Write the ring buffer as Chrome trace JSON; returns the number of events written"""
+        data = self.to_chrome()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        return len(data["traceEvents"])
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval.
+
+    Consecutive samples that share a frame are merged into one span, so the
+    trace shows a flame chart per thread next to the stage spans.
+    """
+    def __init__(self, tracer, interval=0.005, max_depth=40):
+        self.tracer = tracer
+        self.interval = interval
+        self.max_depth = max_depth
+        self.hot = Counter()       # (function, file, line) -> samples on top of the stack
+        self.samples = 0
+        self.open = {}             # tid -> [(frame key, start), ...] outermost first
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+        now = time.perf_counter()
+        for tid in list(self.open):
+            self._close(tid, 0, now)
+
+    def _run(self):
+        me = threading.get_ident()
+        while self.running:
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for tid, frame in frames.items():
+                if tid != me:
+                    self._sample(tid, frame, now)
+            for tid in [t for t in self.open if t not in frames]:
+                self._close(tid, 0, now)   # thread finished
+                del self.open[tid]
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def _sample(self, tid, frame, now):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        if stack:
+            self.hot[stack[-1]] += 1
+        current = self.open.setdefault(tid, [])
+        common = 0
+        while common < len(current) and common < len(stack) and current[common][0] == stack[common]:
+            common += 1
+        self._close(tid, common, now)
+        current.extend((key, now) for key in stack[common:])
+
+    def _close(self, tid, keep, now):
+        current = self.open.get(tid, [])
+        while len(current) > keep:
+            (name, filename, line), start = current.pop()
+            self.tracer.complete(name, start, now, cat="sample", tid=tid, file=f"{filename}:{line}")
+
+    def top(self, n=15):
+        """[(function, file:line, share of samples), ...] for the functions most often on top of a stack"""
+        total = sum(self.hot.values()) or 1
+        return [(name, f"{filename}:{line}", count / total) for (name, filename, line), count in self.hot.most_common(n)]
+
+    def print_report(self, n=15):
+        print("\n=== HOT FUNCTIONS (sampled) ===")
+        print(f"{self.samples} samples every {self.interval * 1000:.1f} ms")
+        for name, where, share in self.top(n):
+            print(f"{share:6.1%}  {name}  ({where})")
+
+TRACER = Tracer()
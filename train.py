@@ -1,15 +1,48 @@
 # train.py
-import cv2, os, numpy as np, glob
+#   python train.py                  # every enrolled crop
+#   python train.py --prototypes 20  # at most 20 medoid crops per person (see gallery.py)
+import cv2, os, numpy as np, glob, argparse
+from gallery import compact
+from evaluate import compare_compaction
+parser=argparse.ArgumentParser(description="Train the LBPH recognizer on data/known")
+parser.add_argument("--prototypes",type=int,default=0,help="keep at most K representative crops per person (0 = all)")
+parser.add_argument("--folds",type=int,default=3,help="with --prototypes, folds for the held-out full vs compacted comparison")
+parser.add_argument("--threshold",type=float,default=70,help="confidence threshold the comparison is scored at")
+args=parser.parse_args()
 X, y, labels = [], [], []
-for i,person in enumerate(sorted(os.listdir("data/known"))):
+for person in sorted(os.listdir("data/known")):
     p=f"data/known/{person}"
     if not os.path.isdir(p): continue
     for fn in glob.glob(p+"/*.png"):
-        X.append(cv2.imread(fn,0)); y.append(i)
+        X.append(cv2.imread(fn,0)); y.append(len(labels))  # label id = position in labels
     labels.append(person)
 rec=cv2.face.LBPHFaceRecognizer_create()
 rec.train(X, np.array(y))
+if args.prototypes:
+    keep=compact(X, y, args.prototypes, recognizer=rec)
+    rec=cv2.face.LBPHFaceRecognizer_create()
+    rec.train([X[k] for k in keep], np.array([y[k] for k in keep]))
+    print(f"Gallery compacted: {len(X)} -> {len(keep)} images")
+    # Full gallery vs K prototypes on held-out crops, with evaluate.py's k-fold split
+    dataset={person:[X[k] for k in range(len(X)) if y[k]==i] for i,person in enumerate(labels)}
+    dataset={person:crops for person,crops in dataset.items() if crops}
+    folds=min(args.folds, min(len(crops) for crops in dataset.values()))
+    if folds<2:
+        print("Too few crops per person to compare the galleries on held-out crops")
+    else:
+        c=compare_compaction(dataset, folds, args.prototypes, args.threshold)
+        print(f"Held-out comparison ({folds} folds, threshold {args.threshold:g}):")
+        print(f"  {'gallery':<16}{'rank-1':>8}{'identified':>12}{'false accept':>14}{'predict ms':>12}")
+        for name,title in (("full","full"),("compact",f"{args.prototypes} per person")):
+            r=c[name]
+            print(f"  {title:<16}{r['rank1_accuracy']:>8.1%}{r['identification_rate']:>12.1%}{r['false_accept_rate']:>14.1%}{r['predict_ms']:>12.2f}")
+        print(f"  {c['speedup']:.1f}x faster predict, identification {c['accuracy_change']:+.1%}")
 os.makedirs("models",exist_ok=True)
-rec.write("models/lbph.yml")
-open("models/labels.txt","w").write("\n".join(labels))
+# The names go inside the model, so one rename publishes model and labels together:
+# a running SmartCam swaps the model in as soon as lbph.yml changes
+for i,person in enumerate(labels): rec.setLabelInfo(i,person)
+rec.write("models/lbph.tmp.yml")
+os.replace("models/lbph.tmp.yml","models/lbph.yml")
+open("models/labels.tmp.txt","w").write("\n".join(labels))  # for people and older tools; not read for this model
+os.replace("models/labels.tmp.txt","models/labels.txt")
 print("Labels:",labels)
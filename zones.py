@@ -0,0 +1,185 @@
+# zones.py - Detection zones and ignore masks per camera
+#
+# A camera's "zones" list holds polygons in frame pixel coordinates:
+#
+#   {"name": "porch", "points": [[100, 200], [600, 200], [600, 720], [100, 720]],
+#    "min_fraction": 0.01, "schedule": ["22:00-06:00"]}
+#   {"name": "tv", "points": [[900, 100], [1200, 100], [1200, 300], [900, 300]], "ignore": True}
+#
+# Polygons are rasterized once, on the first frame, into masks. Motion is
+# scored only in the bounding box of the watch zones, and each zone has its
+# own motion trigger, so its sensitivity can differ from its neighbours'.
+# Face detection runs only on the bounding box of the zones that triggered.
+# Faces whose centre is inside an ignore zone are dropped. A zone with a
+# schedule is only watched during its "HH:MM-HH:MM" windows in local time.
+# Windows may wrap past midnight. Zones are clipped to the frame; a zone with
+# no pixels inside it (e.g. 1080p coordinates on a 720p camera) is a config
+# error.
+import time
+import numpy as np
+import cv2
+from motion import MotionTrigger
+
+def parse_schedule(schedule):
+    """["22:00-06:00", ...] -> [(start minute, end minute), ...]; None = always"""
+    if not schedule:
+        return None
+    if isinstance(schedule, str):
+        schedule = [schedule]
+    windows = []
+    for window in schedule:
+        start, end = window.split("-")
+        h1, m1 = map(int, start.split(":")); h2, m2 = map(int, end.split(":"))
+        windows.append((h1 * 60 + m1, h2 * 60 + m2))
+    return windows
+
+def in_schedule(windows, now=None):
+    """True if the local time of now falls inside one of the windows"""
+    if windows is None:
+        return True
+    t = time.localtime(now)
+    minute = t.tm_hour * 60 + t.tm_min
+    for start, end in windows:
+        if start <= end and start <= minute < end:
+            return True
+        if start > end and (minute >= start or minute < end):
+            return True
+    return False
+
+class Zone:
+    def __init__(self, name, points, trigger, schedule=None):
+        self.name = name
+        self.points = np.array(points, dtype=np.int32)
+        self.trigger = trigger
+        self.schedule = parse_schedule(schedule)
+        self.mask = None      # motion-resolution mask, None = whole scored area
+        self.area = 0
+        self.rect = None      # (x0, y0, x1, y1) bounding box in frame pixels
+        self.active = True
+        self.triggered = False
+
+class ZoneMap:
+    """Per-zone motion triggers and the regions face detection should look at"""
+    def __init__(self, camera, margin=None):
+        settings = (camera["motion_min_fraction"], camera["motion_sigmas"], camera["motion_release"], camera["motion_adapt"])
+        self.margin = camera["min_face"] // 2 if margin is None else margin  # faces straddling a zone edge
+        self.location = camera["location"]
+        self.zones = []
+        self.ignore = []
+        for i, spec in enumerate(camera.get("zones") or []):
+            if spec.get("ignore"):
+                self.ignore.append(np.array(spec["points"], dtype=np.int32))
+                continue
+            trigger = MotionTrigger(spec.get("min_fraction", settings[0]), spec.get("sigmas", settings[1]), *settings[2:])
+            self.zones.append(Zone(spec.get("name", f"zone{i + 1}"), spec["points"], trigger, spec.get("schedule")))
+        self.implicit = not self.zones
+        if self.implicit:  # only ignore zones (or none): watch the whole frame
+            self.zones.append(Zone("frame", [], MotionTrigger(*settings)))
+        self.shape = None
+        self.crop = None          # (x0, y0, x1, y1) area handed to the motion engine
+        self.ignore_mask = None   # full-resolution, 255 = ignored
+        self.last = self.zones[0]
+
+    @property
+    def threshold(self):
+        return self.last.trigger.threshold
+
+    def _fill(self, shape, polygons):
+        mask = np.zeros(shape, dtype=np.uint8)
+        if polygons:
+            cv2.fillPoly(mask, polygons, 255)
+        return mask
+
+    def prepare(self, shape):
+        """Rasterize the zone polygons for this frame size (done once per resolution)"""
+        h, w = shape[:2]
+        self.shape = shape[:2]
+        self.ignore_mask = self._fill((h, w), self.ignore) if self.ignore else None
+        if self.implicit:
+            self.crop = (0, 0, w, h)
+            self.zones[0].rect = self.crop
+        else:
+            for zone in self.zones:
+                # Bounding box of the part of the polygon inside the frame
+                x, y, zw, zh = cv2.boundingRect(self._fill((h, w), [zone.points]))
+                if not zw or not zh:
+                    raise ValueError(f"zone {zone.name!r} of {self.location} has no area inside the {w}x{h} frame "
+                                     f"- zone points are frame pixels, check them against the camera resolution")
+                zone.rect = (x, y, x + zw, y + zh)
+                px, py, pw, ph = cv2.boundingRect(zone.points)
+                if px < 0 or py < 0 or px + pw > w or py + ph > h:
+                    print(f"⚠️  Zone {zone.name!r} of {self.location} reaches outside the {w}x{h} frame - only the part inside is watched")
+            self.crop = (min(z.rect[0] for z in self.zones), min(z.rect[1] for z in self.zones),
+                         max(z.rect[2] for z in self.zones), max(z.rect[3] for z in self.zones))
+        for zone in self.zones:
+            zone.mask = None  # resized to the engine's resolution on the first scored frame
+
+    def _zone_masks(self, size):
+        """Zone masks cropped and scaled to the motion engine's mask size"""
+        x0, y0, x1, y1 = self.crop
+        ignore = None
+        if self.ignore_mask is not None:
+            ignore = cv2.resize(self.ignore_mask[y0:y1, x0:x1], size, interpolation=cv2.INTER_NEAREST)
+        for zone in self.zones:
+            full = self._fill(self.shape, [zone.points]) if not self.implicit else np.full(self.shape, 255, np.uint8)
+            mask = cv2.resize(full[y0:y1, x0:x1], size, interpolation=cv2.INTER_NEAREST)
+            if ignore is not None:
+                mask[ignore > 0] = 0
+            zone.mask = mask
+            zone.area = max(1, cv2.countNonZero(mask))
+
+    def score(self, engine, gray, now=None):
+        """Run the motion engine on the watched area; returns (score, triggered) of the most excited zone"""
+        if self.shape != gray.shape[:2]:
+            self.prepare(gray.shape)
+        x0, y0, x1, y1 = self.crop
+        fg = engine.mask(gray[y0:y1, x0:x1])
+        if fg is not None and self.zones[0].mask is None:
+            self._zone_masks((fg.shape[1], fg.shape[0]))
+
+        best, best_ratio, best_score = None, -1.0, 0.0
+        for zone in self.zones:
+            zone.active = in_schedule(zone.schedule, now)
+            if not zone.active:
+                zone.triggered = False
+                continue
+            if fg is None:
+                s = 0
+            elif self.implicit and self.ignore_mask is None:
+                s = cv2.countNonZero(fg) / fg.size
+            else:
+                s = cv2.countNonZero(cv2.bitwise_and(fg, zone.mask)) / zone.area
+            zone.triggered = zone.trigger.update(s)
+            ratio = s / zone.trigger.threshold
+            if ratio > best_ratio:
+                best, best_ratio, best_score = zone, ratio, s
+        if best is None:  # every zone is outside its schedule
+            return 0.0, False
+        self.last = best
+        return best_score, any(z.triggered for z in self.zones)
+
+    def detect_region(self):
+        """(x0, y0, x1, y1) covering the zones that triggered, padded by margin"""
+        rects = [z.rect for z in self.zones if z.triggered]
+        h, w = self.shape
+        return (max(0, min(r[0] for r in rects) - self.margin), max(0, min(r[1] for r in rects) - self.margin),
+                min(w, max(r[2] for r in rects) + self.margin), min(h, max(r[3] for r in rects) + self.margin))
+
+    def ignored(self, box):
+        """True if the centre of a face box lies in an ignore zone"""
+        if self.ignore_mask is None:
+            return False
+        x, y, w, h = box
+        cy, cx = min(self.shape[0] - 1, int(y + h / 2)), min(self.shape[1] - 1, int(x + w / 2))
+        return self.ignore_mask[cy, cx] > 0
+
+    def draw(self, frame):
+        """Outline the zones: red = ignored, green = watching, yellow = triggered, grey = off schedule"""
+        for polygon in self.ignore:
+            cv2.polylines(frame, [polygon], True, (0, 0, 255), 1)
+        if self.implicit:
+            return
+        for zone in self.zones:
+            color = (0, 255, 255) if zone.triggered else (0, 255, 0) if zone.active else (128, 128, 128)
+            cv2.polylines(frame, [zone.points], True, color, 1)
+            cv2.putText(frame, zone.name, tuple(int(v) for v in zone.points[0]), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)